@@ -0,0 +1,50 @@
+"""Active schedules index
+
+Revision ID: 6499b2553dbc
+Revises: 1b143abe90e5
+Create Date: 2026-10-18 10:12:41.118304
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6499b2553dbc'
+down_revision: Union[str, None] = '1b143abe90e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # primary keys are indexed already, the name and frequency indexes serve no query
+    op.drop_index(op.f('ix_schedules_medication_name'), table_name='schedules')
+    op.drop_index(op.f('ix_schedules_id'), table_name='schedules')
+    op.drop_index(op.f('ix_schedules_frequency'), table_name='schedules')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.create_index(
+        'ix_schedules_user_id_start_date_end_date',
+        'schedules',
+        ['user_id', 'start_date', 'end_date'],
+        unique=False,
+        postgresql_include=['id', 'frequency'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_schedules_user_id_start_date_end_date', table_name='schedules')
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(
+        op.f('ix_schedules_frequency'), 'schedules', ['frequency'], unique=False
+    )
+    op.create_index(op.f('ix_schedules_id'), 'schedules', ['id'], unique=False)
+    op.create_index(
+        op.f('ix_schedules_medication_name'),
+        'schedules',
+        ['medication_name'],
+        unique=False,
+    )
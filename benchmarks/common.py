@@ -0,0 +1,72 @@
+import logging
+import os
+import random
+import timeit
+from datetime import date, timedelta
+from typing import Callable, List, Sequence
+
+import structlog
+
+from aibolit.core.logger import configure_logging
+from aibolit.models.schedules import MedicationScheduleOrm
+from aibolit.models.users import UserOrm  # noqa: F401  (resolves the MedicationScheduleOrm.user relationship)
+
+
+def silence_logs() -> None:
+    """Drop every log event so that benchmarks measure only the code under test."""
+    logging.disable(logging.CRITICAL)
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+
+
+def log_to_devnull() -> None:
+    """
+    The app logging setup with its handlers writing to /dev/null, so that benchmarks pay for logging but not I/O.
+    The handler owns the file and shutdown_logging closes it, at exit at the latest.
+    """
+    configure_logging(handlers=[logging.FileHandler(os.devnull, encoding="utf-8")])
+
+
+def make_db_schedules(count: int, user_id: int = 1, seed: int = 0) -> List[MedicationScheduleOrm]:
+    """Transient ORM rows with random frequencies, shaped like ScheduleRepo.get_all_user_schedules results."""
+    rnd = random.Random(seed)
+    today = date.today()
+    schedules = []
+    for schedule_id in range(1, count + 1):
+        duration_days = rnd.choice([None, 7, 30, 365])
+        start_date = today - timedelta(days=rnd.randint(0, 5))
+        schedules.append(
+            MedicationScheduleOrm(
+                id=schedule_id,
+                medication_name=f"Medication {schedule_id}",
+                frequency=rnd.randint(1, 15),
+                duration_days=duration_days,
+                start_date=start_date,
+                end_date=start_date + timedelta(days=duration_days) if duration_days else None,
+                user_id=user_id,
+            )
+        )
+    return schedules
+
+
+class FakeScheduleRepo:
+    """In-memory stand-in for ScheduleRepo, so that benchmarks run without a database."""
+
+    def __init__(self, db_schedules: Sequence[MedicationScheduleOrm]) -> None:
+        self._db_schedules = db_schedules
+
+    async def get_all_user_schedules(self, user_id: int) -> Sequence[MedicationScheduleOrm]:
+        return self._db_schedules
+
+    async def get_all_user_schedule_ids(self, user_id: int) -> Sequence[int]:
+        return [db_schedule.id for db_schedule in self._db_schedules]
+
+
+def per_call_us(func: Callable[[], object], number: int, repeat: int = 5) -> float:
+    """Best-of-`repeat` time of one `func` call in microseconds."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def rss_mb() -> float:
+    """Resident memory of this process in MB."""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * 4096 / 2**20
@@ -0,0 +1,70 @@
+"""
+Per-schedule cost of building schedules with their daily plans and of ScheduleService.get_user_next_takings
+with daily plans built per row (before) and looked up in the precomputed plan table (after).
+
+    uv run python -m benchmarks.daily_plans --schedules 10 100 1000
+"""
+
+import argparse
+import asyncio
+from datetime import date, datetime, timedelta
+from functools import partial
+from typing import List
+
+from aibolit.core.config import settings
+from aibolit.schemas.openapi_generated import MedicationSchedule
+from aibolit.services.schedules import ScheduleService
+from benchmarks.common import FakeScheduleRepo, make_db_schedules, per_call_us, silence_logs
+
+
+class PerRowPlanScheduleService(ScheduleService):
+    """ScheduleService with the daily plan rebuilt for every row, as it was before the plan table."""
+
+    def _one_schedule_with_plan(self, db_schedule) -> MedicationSchedule:
+        daily_plan = self._legacy_daily_plan(db_schedule.frequency)
+        schedule = MedicationSchedule(**db_schedule.__dict__, daily_plan=daily_plan)
+        return MedicationSchedule.model_validate(schedule)
+
+    def _legacy_daily_plan(self, frequency: int) -> List[str]:
+        start_day = datetime.combine(date.today(), settings.TIME_DAY_START)
+        end_day = datetime.combine(date.today(), settings.TIME_DAY_END)
+        if frequency == 1:
+            return [start_day.strftime("%H:%M")]
+        interval = (end_day - start_day) / (frequency - 1)
+        return [self._legacy_round(start_day + i * interval).strftime("%H:%M") for i in range(frequency)]
+
+    @staticmethod
+    def _legacy_round(dt: datetime) -> datetime:
+        interval = settings.TIME_ROUNDING_INTERVAL
+        rounded_minutes = (dt.minute + (interval - 1)) // interval * interval
+        if rounded_minutes == 60:
+            return dt.replace(minute=0, second=0) + timedelta(hours=1)
+        return dt.replace(minute=rounded_minutes, second=0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schedules", type=int, nargs="+", default=[10, 100, 1000], help="schedules per user")
+    parser.add_argument("--number", type=int, default=20, help="calls per measurement")
+    args = parser.parse_args()
+    silence_logs()
+
+    print(f"{'measure':<24}{'schedules':>10}{'before, us':>14}{'after, us':>14}{'speedup':>10}")
+    with asyncio.Runner() as runner:
+        for count in args.schedules:
+            repo = FakeScheduleRepo(make_db_schedules(count))
+            before, after = PerRowPlanScheduleService(repo), ScheduleService(repo)
+            measures = {
+                "schedules with plans": lambda service, db_schedules=repo._db_schedules: [
+                    service._one_schedule_with_plan(db_schedule) for db_schedule in db_schedules
+                ],
+                "get_user_next_takings": lambda service: runner.run(service.get_user_next_takings(1)),
+            }
+            for name, measure in measures.items():
+                before_us = per_call_us(partial(measure, before), args.number) / count
+                after_us = per_call_us(partial(measure, after), args.number) / count
+                print(f"{name:<24}{count:>10}{before_us:>14.2f}{after_us:>14.2f}{before_us / after_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Per-RPC cost of building and serializing GetUserSchedule and GetUserNextTakings responses
+through Pydantic models (before) and straight from rows with grpc.adapters.mappers (after).
+
+    uv run python -m benchmarks.grpc_mappers --schedules 10
+"""
+
+import argparse
+from datetime import date, datetime, time
+
+from google.protobuf.timestamp_pb2 import Timestamp
+
+from aibolit.grpc.adapters.mappers import next_takings_to_proto, schedule_to_proto
+from aibolit.grpc.generated import schedules_pb2
+from aibolit.schemas.openapi_generated import NextTakingsMedications, NextTakingsMedicationsResponse
+from aibolit.schemas.schedules import MedicationSchedule
+from aibolit.services.daily_plans import daily_plans
+from aibolit.services.next_takings import NextTakingsWindow
+from aibolit.services.schedules import ScheduleService
+from benchmarks.common import make_db_schedules, per_call_us
+
+
+def to_timestamp(dt: date) -> Timestamp:
+    ts = Timestamp()
+    ts.FromDatetime(datetime.combine(dt, time.min))
+    return ts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schedules", type=int, default=10, help="schedules of the user for next takings")
+    parser.add_argument("--number", type=int, default=2000, help="calls per measurement")
+    args = parser.parse_args()
+
+    service = ScheduleService(None)  # type: ignore[arg-type]
+    # the previous adapter failed on schedules without an end date, so only ones with it are compared
+    db_schedule = next(row for row in make_db_schedules(50) if row.end_date and row.frequency > 10)
+    db_schedules = make_db_schedules(args.schedules)
+    window = NextTakingsWindow(datetime.combine(date.today(), time(12)))
+    rows = tuple(
+        (row.id, row.medication_name, times) for row in db_schedules if (times := window.select(row.frequency))
+    )
+
+    def schedule_before() -> bytes:
+        schedule = service._one_schedule_with_plan(db_schedule)
+        schedule_dict = MedicationSchedule(**schedule.model_dump(mode="python")).model_dump(mode="python")
+        start_date, end_date = schedule_dict.pop("start_date"), schedule_dict.pop("end_date")
+        return schedules_pb2.MedicationSchedule(
+            **schedule_dict, start_date=to_timestamp(start_date), end_date=to_timestamp(end_date)
+        ).SerializeToString()
+
+    def schedule_after() -> bytes:
+        return schedule_to_proto(db_schedule, daily_plans.get(db_schedule.frequency)).SerializeToString()
+
+    def next_takings_before() -> bytes:
+        response = NextTakingsMedicationsResponse(
+            user_id=1,
+            next_takings=[
+                NextTakingsMedications(schedule_id=schedule_id, schedule_name=name, schedule_times=list(times))
+                for schedule_id, name, times in rows
+            ],
+        )
+        next_takings = [
+            schedules_pb2.NextTakingsMedications(**next_taking.model_dump(mode="python"))
+            for next_taking in response.next_takings
+        ]
+        return schedules_pb2.GetUserNextTakingsResponse(user_id=1, next_takings=next_takings).SerializeToString()
+
+    def next_takings_after() -> bytes:
+        return next_takings_to_proto(1, rows).SerializeToString()
+
+    print(f"{'rpc':<26}{'before, us':>14}{'after, us':>14}{'speedup':>10}")
+    for name, before, after in (
+        ("GetUserSchedule", schedule_before, schedule_after),
+        (f"GetUserNextTakings ({len(rows)})", next_takings_before, next_takings_after),
+    ):
+        assert before() == after(), f"{name}: responses differ"
+        before_us = per_call_us(before, args.number)
+        after_us = per_call_us(after, args.number)
+        print(f"{name:<26}{before_us:>14.2f}{after_us:>14.2f}{before_us / after_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
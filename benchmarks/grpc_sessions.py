@@ -0,0 +1,127 @@
+"""
+gRPC GetAllSchedules load test: throughput by client concurrency and process memory over time,
+with one session shared by every call (before) and a pooled session per call (after).
+
+The database is simulated: a query holds one of --pool-size connections for --latency-ms, and
+a session runs one query at a time and keeps every loaded row in its identity map, as AsyncSession
+does. With --db the per-call setup of the app runs against the configured database instead.
+
+    uv run python -m benchmarks.grpc_sessions --concurrency 1 4 16 64 --rounds 5
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager, nullcontext
+from typing import AsyncIterator, Dict, List, Sequence, Tuple
+
+import grpc
+
+from aibolit.core.config import settings
+from aibolit.core.dependencies import ServiceScope, schedule_service_scope
+from aibolit.grpc.adapters.schedules import GrpcScheduleService
+from aibolit.grpc.generated import schedules_pb2, schedules_pb2_grpc
+from aibolit.grpc.server import ConcurrencyLimitInterceptor
+from aibolit.services.schedules import ScheduleService
+from benchmarks.common import rss_mb, silence_logs
+
+
+class SimulatedSession:
+    def __init__(self, connections: asyncio.Semaphore, latency: float) -> None:
+        self._connections = connections
+        self._latency = latency
+        self._lock = asyncio.Lock()
+        self.identity_map: Dict[Tuple[int, int], object] = {}
+
+    async def load(self, user_id: int, schedule_ids: Sequence[int]) -> None:
+        async with self._lock, self._connections:
+            await asyncio.sleep(self._latency)
+        for schedule_id in schedule_ids:
+            self.identity_map[(user_id, schedule_id)] = object()
+
+
+class SimulatedScheduleRepo:
+    def __init__(self, session: SimulatedSession, schedules_per_user: int) -> None:
+        self._session = session
+        self._schedule_ids = list(range(1, schedules_per_user + 1))
+
+    async def get_all_user_schedule_ids(self, user_id: int) -> Sequence[int]:
+        await self._session.load(user_id, self._schedule_ids)
+        return self._schedule_ids
+
+
+def simulated_scopes(args: argparse.Namespace) -> Dict[str, ServiceScope[ScheduleService]]:
+    connections = asyncio.Semaphore(args.pool_size)
+    latency = args.latency_ms / 1000
+    shared = ScheduleService(SimulatedScheduleRepo(SimulatedSession(connections, latency), args.schedules))
+
+    @asynccontextmanager
+    async def per_call() -> AsyncIterator[ScheduleService]:
+        yield ScheduleService(SimulatedScheduleRepo(SimulatedSession(connections, latency), args.schedules))
+
+    return {"shared session": lambda: nullcontext(shared), "session per call": per_call}
+
+
+async def run_load(
+    stub: schedules_pb2_grpc.SchedulesServiceStub, concurrency: int, requests: int, users: int
+) -> Tuple[float, List[float]]:
+    """Requests per second and latencies (ms) of `requests` calls made by `concurrency` clients."""
+    latencies: List[float] = []
+    remaining = requests
+
+    async def client() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            await stub.GetAllSchedules(schedules_pb2.GetAllSchedulesRequest(user_id=random.randint(1, users)))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start), latencies
+
+
+async def bench(name: str, scope: ServiceScope[ScheduleService], args: argparse.Namespace) -> None:
+    server = grpc.aio.server(interceptors=[ConcurrencyLimitInterceptor(settings.GRPC_MAX_CONCURRENT_RPCS, 0)])
+    schedules_pb2_grpc.add_SchedulesServiceServicer_to_server(GrpcScheduleService(scope), server)
+    port = server.add_insecure_port("localhost:0")
+    await server.start()
+    try:
+        async with grpc.aio.insecure_channel(f"localhost:{port}") as channel:
+            stub = schedules_pb2_grpc.SchedulesServiceStub(channel)
+            await run_load(stub, 1, 10, args.users)
+            for concurrency in args.concurrency:
+                rps, latencies = await run_load(stub, concurrency, args.requests, args.users)
+                latencies.sort()
+                p99 = latencies[int(len(latencies) * 0.99)]
+                print(f"{name:<18}{concurrency:>12}{rps:>12.0f}{p99:>12.1f}{rss_mb():>10.1f}")
+            for round_number in range(1, args.rounds + 1):
+                await run_load(stub, max(args.concurrency), args.requests, args.users)
+                print(f"{name:<18}{'round ' + str(round_number):>12}{'':>24}{rss_mb():>10.1f}")
+    finally:
+        await server.stop(0)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64], help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=2000, help="calls per measurement")
+    parser.add_argument("--rounds", type=int, default=5, help="rounds at the highest concurrency to watch memory")
+    parser.add_argument("--users", type=int, default=100_000, help="distinct users requested")
+    parser.add_argument("--schedules", type=int, default=10, help="schedules per user")
+    parser.add_argument("--pool-size", type=int, default=30, help="simulated pool connections")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="simulated query latency")
+    parser.add_argument("--db", action="store_true", help="use the app sessions and the configured database")
+    args = parser.parse_args()
+    silence_logs()
+
+    scopes = {"session per call": schedule_service_scope} if args.db else simulated_scopes(args)
+    print(f"{'mode':<18}{'concurrency':>12}{'rps':>12}{'p99, ms':>12}{'rss, MB':>10}")
+    for name, scope in scopes.items():
+        await bench(name, scope, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
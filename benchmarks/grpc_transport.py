@@ -0,0 +1,142 @@
+"""
+Sweep of the gRPC transport settings against a local server: GetUsers pages of --page-size users
+(in memory, no database) by --concurrency clients over one channel, for every combination of
+compression, initial HTTP/2 stream window and max concurrent streams given.
+
+Traffic goes through a local TCP proxy that counts the bytes sent to the client, so the wire size
+of a response is shown next to throughput and p99 latency. Keepalive settings do not change these
+numbers; set them with --set to check a server starts with them.
+
+    uv run python -m benchmarks.grpc_transport --compression none gzip --set GRPC_KEEPALIVE_TIME_MS=30000
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Tuple
+
+import grpc
+
+from aibolit.core.config import Settings, settings
+from aibolit.grpc.adapters.users import GrpcUserService
+from aibolit.grpc.generated import users_pb2, users_pb2_grpc
+from aibolit.grpc.server import create_server
+from benchmarks.common import silence_logs
+
+
+class InMemoryUserService:
+    async def get_user_ids(self, after_id: int, page_size: int) -> List[int]:
+        return list(range(after_id + 1, after_id + page_size + 1))
+
+
+@asynccontextmanager
+async def in_memory_user_service() -> AsyncIterator[InMemoryUserService]:
+    yield InMemoryUserService()
+
+
+class CountingProxy:
+    """Forwards local connections to `port` and counts the bytes sent back to the clients."""
+
+    def __init__(self, port: int) -> None:
+        self._port = port
+        self.bytes_down = 0
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "localhost", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self._server.close()
+
+    async def _handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter) -> None:
+        server_reader, server_writer = await asyncio.open_connection("localhost", self._port)
+        await asyncio.gather(
+            self._pipe(client_reader, server_writer, count=False),
+            self._pipe(server_reader, client_writer, count=True),
+            return_exceptions=True,
+        )
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, count: bool) -> None:
+        try:
+            while data := await reader.read(65536):
+                if count:
+                    self.bytes_down += len(data)
+                writer.write(data)
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+async def run_load(
+    stub: users_pb2_grpc.UserServiceStub, concurrency: int, requests: int, page_size: int
+) -> Tuple[float, List[float]]:
+    """Requests per second and latencies (ms) of `requests` calls made by `concurrency` clients."""
+    latencies: List[float] = []
+    remaining = requests
+
+    async def client() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            await stub.GetUsers(users_pb2.GetAllUsersRequest(after_id=remaining, page_size=page_size))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start), latencies
+
+
+async def bench(config: Settings, args: argparse.Namespace) -> Tuple[float, float, float]:
+    """Requests per second, p99 latency (ms) and KB on the wire per response with `config`."""
+    server = create_server(config)
+    users_pb2_grpc.add_UserServiceServicer_to_server(GrpcUserService(in_memory_user_service), server)
+    proxy = CountingProxy(server.add_insecure_port("localhost:0"))
+    await server.start()
+    proxy_port = await proxy.start()
+    try:
+        async with grpc.aio.insecure_channel(f"localhost:{proxy_port}") as channel:
+            stub = users_pb2_grpc.UserServiceStub(channel)
+            await run_load(stub, 1, 10, args.page_size)
+            proxy.bytes_down = 0
+            rps, latencies = await run_load(stub, args.concurrency, args.requests, args.page_size)
+    finally:
+        await proxy.stop()
+        await server.stop(0)
+    latencies.sort()
+    return rps, latencies[int(len(latencies) * 0.99)], proxy.bytes_down / args.requests / 1024
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--compression", nargs="+", default=["none", "deflate", "gzip"], help="GRPC_COMPRESSION")
+    parser.add_argument("--window", type=int, nargs="+", default=[0, 1 << 20], help="GRPC_HTTP2_STREAM_WINDOW")
+    parser.add_argument("--streams", type=int, nargs="+", default=[0], help="GRPC_MAX_CONCURRENT_STREAMS")
+    parser.add_argument("--set", nargs="*", default=[], metavar="NAME=VALUE", help="other settings for every run")
+    parser.add_argument("--page-size", type=int, default=10_000, help="users per response")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="calls per measurement")
+    args = parser.parse_args()
+    silence_logs()
+
+    overrides: Dict[str, str] = dict(item.split("=", 1) for item in args.set)
+    base = settings.model_dump()
+    print(f"{'compression':<13}{'window':>10}{'streams':>9}{'rps':>10}{'p99, ms':>10}{'KB/response':>13}")
+    for compression, window, streams in itertools.product(args.compression, args.window, args.streams):
+        config = Settings.model_validate(
+            {
+                **base,
+                **overrides,
+                "GRPC_COMPRESSION": compression,
+                "GRPC_HTTP2_STREAM_WINDOW": window,
+                "GRPC_MAX_CONCURRENT_STREAMS": streams,
+            }
+        )
+        rps, p99, kb = await bench(config, args)
+        print(f"{compression:<13}{window:>10}{streams:>9}{rps:>10.0f}{p99:>10.1f}{kb:>13.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
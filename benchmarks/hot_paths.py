@@ -0,0 +1,177 @@
+"""
+Microbenchmarks of the schedule planning hot paths, offline with no database, compared against a saved baseline:
+- plan/build: daily plan generation per frequency (build_daily_plan, what the plan table runs on settings changes);
+- plan/select: next takings selection of one plan per frequency (NextTakingsWindow.select at a fixed noon);
+- rows/orm_to_pydantic: MedicationSchedule models with daily plans from ORM rows, per schedules count;
+- rows/to_proto: GetUserSchedule MedicationSchedule messages from ORM rows, serialized, per schedules count;
+- next_takings/to_proto: GetUserNextTakingsResponse from next takings rows, serialized, per schedules count;
+- next_takings/json: GET /next_takings response body rendered from the response model, per schedules count.
+
+Every case is timed as the best of --rounds runs of enough calls to last --min-time seconds, in us per call.
+--save writes the results to --baseline; otherwise they are compared with it and the run fails when a case is
+slower than its baseline by more than --threshold. Baselines are per machine, so save one before changing code:
+
+    uv run python -m benchmarks.hot_paths --save
+    uv run python -m benchmarks.hot_paths --threshold 0.1
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from pydantic import TypeAdapter
+
+from aibolit.core.config import settings
+from aibolit.grpc.adapters.mappers import next_takings_to_proto, schedule_to_proto
+from aibolit.schemas.openapi_generated import MedicationSchedule, NextTakingsMedicationsResponse
+from aibolit.services.daily_plans import MAX_FREQUENCY, MIN_FREQUENCY, build_daily_plan, daily_plans
+from aibolit.services.next_takings import NextTakingsWindow
+from aibolit.services.schedules import schedule_mapper
+from benchmarks.common import make_db_schedules, silence_logs
+
+DEFAULT_BASELINE = Path(".benchmarks/hot_paths.json")
+
+Case = Tuple[str, Callable[[], object]]
+
+
+def plan_cases(frequencies: List[int]) -> List[Case]:
+    day_start, day_end, rounding = settings.TIME_DAY_START, settings.TIME_DAY_END, settings.TIME_ROUNDING_INTERVAL
+    window = NextTakingsWindow(datetime.combine(date.today(), time(12)))
+    cases: List[Case] = []
+    for frequency in frequencies:
+        cases.append(
+            (f"plan/build[f={frequency}]", lambda f=frequency: build_daily_plan(f, day_start, day_end, rounding))
+        )
+    for frequency in frequencies:
+        cases.append((f"plan/select[f={frequency}]", lambda f=frequency: window.select(f)))
+    return cases
+
+
+def row_cases(schedule_counts: List[int]) -> List[Case]:
+    window = NextTakingsWindow(datetime.combine(date.today(), time(12)))
+    render = TypeAdapter(NextTakingsMedicationsResponse).dump_json
+    cases: List[Case] = []
+    for count in schedule_counts:
+        db_schedules = make_db_schedules(count)
+        next_takings = tuple(
+            (row.id, row.medication_name, times) for row in db_schedules if (times := window.select(row.frequency))
+        )
+        response = NextTakingsMedicationsResponse.model_validate(
+            {
+                "user_id": 1,
+                "next_takings": [
+                    {"schedule_id": schedule_id, "schedule_name": name, "schedule_times": list(times)}
+                    for schedule_id, name, times in next_takings
+                ],
+            }
+        )
+
+        def rows_to_pydantic(db_schedules=db_schedules) -> List[MedicationSchedule]:
+            return [schedule_mapper(row, daily_plan=list(daily_plans.get(row.frequency))) for row in db_schedules]
+
+        def rows_to_proto(db_schedules=db_schedules) -> List[bytes]:
+            return [schedule_to_proto(row, daily_plans.get(row.frequency)).SerializeToString() for row in db_schedules]
+
+        cases += [
+            (f"rows/orm_to_pydantic[n={count}]", rows_to_pydantic),
+            (f"rows/to_proto[n={count}]", rows_to_proto),
+            (
+                f"next_takings/to_proto[n={count}]",
+                lambda rows=next_takings: next_takings_to_proto(1, rows).SerializeToString(),
+            ),
+            (f"next_takings/json[n={count}]", lambda response=response: render(response)),
+        ]
+    return cases
+
+
+def calibrate(func: Callable[[], object], min_time: float) -> int:
+    """Calls of `func` lasting about `min_time`."""
+    number = 1
+    while (elapsed := timeit.timeit(func, number=number)) < min_time / 10:
+        number *= 10
+    return max(1, round(number * min_time / elapsed))
+
+
+def measure(cases: List[Case], rounds: int, min_time: float) -> Dict[str, float]:
+    """
+    Best time of one call of every case in us, over `rounds` rounds timing each case once. Rounds go through all the
+    cases so that a busy moment of the machine slows one round of many cases rather than every run of one case.
+    """
+    numbers = {name: calibrate(func, min_time) for name, func in cases}
+    results = {name: float("inf") for name, _ in cases}
+    for _ in range(rounds):
+        for name, func in cases:
+            number = numbers[name]
+            results[name] = min(results[name], timeit.timeit(func, number=number) / number * 1e6)
+    return results
+
+
+def load_baseline(path: Path) -> Dict[str, float]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())["cases"]
+
+
+def save_baseline(path: Path, results: Dict[str, float]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    baseline = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "saved_at": datetime.now().isoformat(timespec="seconds"),
+        "cases": results,
+    }
+    path.write_text(json.dumps(baseline, indent=2) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--frequencies",
+        type=int,
+        nargs="+",
+        default=list(range(MIN_FREQUENCY, MAX_FREQUENCY + 1)),
+        help="frequencies of the plan cases",
+    )
+    parser.add_argument("--schedules", type=int, nargs="+", default=[1, 10, 100, 1000], help="schedules per user")
+    parser.add_argument("--filter", default="", help="run only the cases whose name contains this")
+    parser.add_argument("--rounds", type=int, default=10, help="runs of every case, the best one counts")
+    parser.add_argument("--min-time", type=float, default=0.02, help="seconds of calls per run")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="baseline file")
+    parser.add_argument("--save", action="store_true", help="save the results as the baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.1, help="largest accepted slowdown against the baseline")
+    args = parser.parse_args()
+    silence_logs()
+
+    baseline = {} if args.save else load_baseline(args.baseline)
+    cases = [case for case in plan_cases(args.frequencies) + row_cases(args.schedules) if args.filter in case[0]]
+    results = measure(cases, args.rounds, args.min_time)
+    regressions = []
+    print(f"{'case':<34}{'baseline, us':>14}{'current, us':>14}{'change':>10}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<34}{'-':>14}{current:>14.3f}")
+            continue
+        change = current / base - 1
+        regressed = change > args.threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<34}{base:>14.3f}{current:>14.3f}{change:>10.1%}{'  REGRESSED' if regressed else ''}")
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"baseline saved to {args.baseline}")
+    elif not baseline:
+        print(f"no baseline at {args.baseline}, save one with --save")
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+Load test of a running app, REST and gRPC, to find the load a single instance saturates at. Start the app and
+the database first (just db-start, just app), then:
+
+    uv run python -m benchmarks.load_test --rates 100 200 400 800 --duration 30 --output before.json
+    uv run python -m benchmarks.load_test --rates 100 200 400 800 --duration 30 --compare before.json
+
+--users users with --schedules schedules each are created first, through the REST API. Then every stage sends
+the operations of --mix, picked at random by weight, for --duration seconds:
+- --rates: open loop, requests start at the given rate whether or not the earlier ones are done, at most
+  --max-in-flight at once. Latency counts from the time a request was due, so that a slow app is not hidden by
+  requests waiting to start;
+- --concurrency: closed loop, that many clients each sending their next request once the previous one is done.
+
+Per stage and operation the throughput, errors and p50/p95/p99/p999 latencies are printed and, with --output,
+written as JSON. --compare prints the throughput and p99 changes against such a file. A stage is marked
+saturated when its throughput stays below 95% of the offered rate or more than 1% of its requests fail. The load
+generator runs in one process: when it keeps the CPU busy most of the stage, the numbers are its limit, not the
+app's, and a warning is printed.
+
+Operations: rest.create_schedule (POST /schedule), rest.get_schedule (GET /schedule), rest.get_schedules
+(GET /schedules), rest.next_takings (GET /next_takings) and the unary SchedulesService RPCs grpc.CreateSchedule,
+grpc.GetUserSchedule, grpc.GetAllSchedules and grpc.GetUserNextTakings.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import grpc
+import httpx
+
+from aibolit.core.config import settings
+from aibolit.grpc.generated import schedules_pb2, schedules_pb2_grpc
+
+DEFAULT_MIX = (
+    "rest.next_takings=30,rest.get_schedules=10,rest.get_schedule=10,rest.create_schedule=2,"
+    "grpc.GetUserNextTakings=30,grpc.GetAllSchedules=8,grpc.GetUserSchedule=8,grpc.CreateSchedule=2"
+)
+PERCENTILES = {"p50_ms": 0.5, "p95_ms": 0.95, "p99_ms": 0.99, "p999_ms": 0.999}
+
+# (user id, schedule ids) of the seeded users
+SeededUser = Tuple[int, List[int]]
+Operation = Callable[[random.Random], Awaitable[None]]
+
+
+class RequestFailed(Exception):
+    """A response with an error status, named by its HTTP status or gRPC code."""
+
+
+class Operations:
+    """The operations of the load, on seeded users, by name."""
+
+    def __init__(self, http: httpx.AsyncClient, stub: schedules_pb2_grpc.SchedulesServiceStub) -> None:
+        self._http = http
+        self._stub = stub
+        self.users: List[SeededUser] = []
+
+    async def seed(self, users: int, schedules: int, concurrency: int = 32) -> None:
+        rnd = random.Random(0)
+        slots = asyncio.Semaphore(concurrency)
+
+        async def seed_user() -> SeededUser:
+            async with slots:
+                user_id = (await self._post("/users", {})).json()["id"]
+                schedule_ids: List[int] = []
+                # POST /schedules:batch takes at most SCHEDULES_BATCH_MAX_SIZE schedules
+                for start in range(0, schedules, settings.SCHEDULES_BATCH_MAX_SIZE):
+                    count = min(settings.SCHEDULES_BATCH_MAX_SIZE, schedules - start)
+                    batch = [self._schedule(user_id, rnd) for _ in range(count)]
+                    schedule_ids += (await self._post("/schedules:batch", batch)).json()["schedule_ids"]
+                return user_id, schedule_ids
+
+        self.users = list(await asyncio.gather(*(seed_user() for _ in range(users))))
+
+    def by_name(self) -> Dict[str, Operation]:
+        return {
+            "rest.create_schedule": self.rest_create_schedule,
+            "rest.get_schedule": self.rest_get_schedule,
+            "rest.get_schedules": self.rest_get_schedules,
+            "rest.next_takings": self.rest_next_takings,
+            "grpc.CreateSchedule": self.grpc_create_schedule,
+            "grpc.GetUserSchedule": self.grpc_get_user_schedule,
+            "grpc.GetAllSchedules": self.grpc_get_all_schedules,
+            "grpc.GetUserNextTakings": self.grpc_get_user_next_takings,
+        }
+
+    @staticmethod
+    def _schedule(user_id: int, rnd: random.Random) -> Dict[str, Any]:
+        return {
+            "user_id": user_id,
+            "medication_name": f"Load test {rnd.randint(1, 999)}",
+            "frequency": rnd.randint(1, 15),
+        }
+
+    def _user_schedule(self, rnd: random.Random) -> Tuple[int, int]:
+        user_id, schedule_ids = rnd.choice(self.users)
+        return user_id, rnd.choice(schedule_ids) if schedule_ids else 0
+
+    async def _post(self, path: str, body: Any) -> httpx.Response:
+        return self._checked(await self._http.post(path, json=body))
+
+    async def _get(self, path: str, **params: Any) -> httpx.Response:
+        return self._checked(await self._http.get(path, params=params))
+
+    @staticmethod
+    def _checked(response: httpx.Response) -> httpx.Response:
+        if response.status_code >= 400:
+            raise RequestFailed(f"HTTP {response.status_code}")
+        return response
+
+    async def _call(self, rpc: Callable[..., Awaitable[Any]], request: Any) -> None:
+        try:
+            await rpc(request)
+        except grpc.aio.AioRpcError as e:
+            raise RequestFailed(e.code().name) from e
+
+    async def rest_create_schedule(self, rnd: random.Random) -> None:
+        await self._post("/schedule", self._schedule(rnd.choice(self.users)[0], rnd))
+
+    async def rest_get_schedule(self, rnd: random.Random) -> None:
+        user_id, schedule_id = self._user_schedule(rnd)
+        await self._get("/schedule", user_id=user_id, schedule_id=schedule_id)
+
+    async def rest_get_schedules(self, rnd: random.Random) -> None:
+        await self._get("/schedules", user_id=rnd.choice(self.users)[0])
+
+    async def rest_next_takings(self, rnd: random.Random) -> None:
+        await self._get("/next_takings", user_id=rnd.choice(self.users)[0])
+
+    async def grpc_create_schedule(self, rnd: random.Random) -> None:
+        request = schedules_pb2.CreateScheduleRequest(**self._schedule(rnd.choice(self.users)[0], rnd))
+        await self._call(self._stub.CreateSchedule, request)
+
+    async def grpc_get_user_schedule(self, rnd: random.Random) -> None:
+        user_id, schedule_id = self._user_schedule(rnd)
+        request = schedules_pb2.GetUserScheduleRequest(user_id=user_id, schedule_id=schedule_id)
+        await self._call(self._stub.GetUserSchedule, request)
+
+    async def grpc_get_all_schedules(self, rnd: random.Random) -> None:
+        await self._call(
+            self._stub.GetAllSchedules, schedules_pb2.GetAllSchedulesRequest(user_id=rnd.choice(self.users)[0])
+        )
+
+    async def grpc_get_user_next_takings(self, rnd: random.Random) -> None:
+        request = schedules_pb2.GetUserNextTakingsRequest(user_id=rnd.choice(self.users)[0])
+        await self._call(self._stub.GetUserNextTakings, request)
+
+
+def parse_mix(mix: str, operations: Dict[str, Operation]) -> Dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in operations:
+            raise SystemExit(f"unknown operation {name!r} in --mix, one of: {', '.join(operations)}")
+        weights[name.strip()] = float(weight or 1)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+class StageRecorder:
+    """Latencies and errors of one stage, per operation."""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+
+    async def run(self, name: str, operation: Operation, rnd: random.Random, due: float) -> None:
+        try:
+            await operation(rnd)
+        except RequestFailed as e:
+            self.errors[name][str(e)] += 1
+        except httpx.HTTPError as e:
+            self.errors[name][type(e).__name__] += 1
+        else:
+            self.latencies[name].append(time.perf_counter() - due)
+
+    def result(self, load: Dict[str, int], elapsed: float, cpu: float) -> Dict[str, Any]:
+        operations = {}
+        total_ok = total_errors = 0
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            latencies = sorted(self.latencies[name])
+            errors = sum(self.errors[name].values())
+            total_ok += len(latencies)
+            total_errors += errors
+            operations[name] = {
+                "requests": len(latencies) + errors,
+                "errors": errors,
+                "error_kinds": dict(self.errors[name]),
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                **{key: percentile_ms(latencies, q) for key, q in PERCENTILES.items()},
+                "max_ms": round(latencies[-1] * 1000, 3) if latencies else None,
+            }
+        throughput = total_ok / elapsed
+        error_rate = total_errors / max(total_ok + total_errors, 1)
+        offered = load.get("rate")
+        return {
+            "load": load,
+            "duration_s": round(elapsed, 3),
+            "throughput_rps": round(throughput, 2),
+            "error_rate": round(error_rate, 5),
+            "saturated": error_rate > 0.01 or (offered is not None and throughput < 0.95 * offered),
+            "generator_cpu": round(cpu, 3),
+            "operations": operations,
+        }
+
+
+def percentile_ms(latencies: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted `latencies` in ms, None when there are none."""
+    if not latencies:
+        return None
+    return round(latencies[min(len(latencies) - 1, max(math.ceil(q * len(latencies)) - 1, 0))] * 1000, 3)
+
+
+def pick(weights: Dict[str, float], operations: Dict[str, Operation], rnd: random.Random) -> Tuple[str, Operation]:
+    (name,) = rnd.choices(list(weights), weights=list(weights.values()))
+    return name, operations[name]
+
+
+async def open_loop(
+    rate: int, duration: float, max_in_flight: int, weights: Dict[str, float], operations: Dict[str, Operation]
+) -> StageRecorder:
+    recorder = StageRecorder()
+    rnd = random.Random(rate)
+    slots = asyncio.Semaphore(max_in_flight)
+    tasks = set()
+
+    async def send(name: str, operation: Operation, due: float) -> None:
+        async with slots:
+            await recorder.run(name, operation, rnd, due)
+
+    start = time.perf_counter()
+    for i in range(int(rate * duration)):
+        due = start + i / rate
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(send(*pick(weights, operations, rnd), due))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    await asyncio.gather(*tasks)
+    return recorder
+
+
+async def closed_loop(
+    concurrency: int, duration: float, weights: Dict[str, float], operations: Dict[str, Operation]
+) -> StageRecorder:
+    recorder = StageRecorder()
+    deadline = time.perf_counter() + duration
+
+    async def client(rnd: random.Random) -> None:
+        while time.perf_counter() < deadline:
+            await recorder.run(*pick(weights, operations, rnd), rnd, time.perf_counter())
+
+    await asyncio.gather(*(client(random.Random(i)) for i in range(concurrency)))
+    return recorder
+
+
+async def run_stage(load: Dict[str, int], args: argparse.Namespace, weights, operations) -> Dict[str, Any]:
+    start, cpu_start = time.perf_counter(), time.process_time()
+    if "rate" in load:
+        recorder = await open_loop(load["rate"], args.duration, args.max_in_flight, weights, operations)
+    else:
+        recorder = await closed_loop(load["concurrency"], args.duration, weights, operations)
+    elapsed = time.perf_counter() - start
+    return recorder.result(load, elapsed, (time.process_time() - cpu_start) / elapsed)
+
+
+def load_name(load: Dict[str, int]) -> str:
+    return f"{load['rate']} rps" if "rate" in load else f"{load['concurrency']} clients"
+
+
+def print_stage(stage: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> None:
+    flags = []
+    if stage["saturated"]:
+        flags.append("SATURATED")
+    if stage["generator_cpu"] > 0.8:
+        flags.append(f"load generator at {stage['generator_cpu']:.0%} CPU")
+    print(f"\n{load_name(stage['load'])}: {stage['throughput_rps']:.1f} rps, {stage['error_rate']:.2%} errors")
+    if flags:
+        print("  " + ", ".join(flags))
+    print(
+        f"  {'operation':<26}{'rps':>9}{'errors':>8}{'p50, ms':>10}{'p95, ms':>10}{'p99, ms':>10}{'p999, ms':>10}",
+        end="",
+    )
+    print(f"{'rps vs prev':>13}{'p99 vs prev':>13}" if previous else "")
+    for name, op in stage["operations"].items():
+        line = f"  {name:<26}{op['throughput_rps']:>9.1f}{op['errors']:>8}"
+        line += "".join(f"{op[key]:>10.2f}" if op[key] is not None else f"{'-':>10}" for key in PERCENTILES)
+        before = (previous or {}).get("operations", {}).get(name)
+        if before:
+            line += f"{change(before['throughput_rps'], op['throughput_rps']):>13}"
+            line += f"{change(before['p99_ms'], op['p99_ms']):>13}"
+        print(line)
+
+
+def change(before: Optional[float], after: Optional[float]) -> str:
+    if not before or after is None:
+        return "-"
+    return f"{after / before - 1:+.1%}"
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    loads = parser.add_mutually_exclusive_group()
+    loads.add_argument("--rates", type=int, nargs="+", help="requests per second of the open loop stages")
+    loads.add_argument("--concurrency", type=int, nargs="+", help="clients of the closed loop stages")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per stage")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of unrecorded load before the stages")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation=weight,... of the requests sent")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="requests at once in open loop stages")
+    parser.add_argument("--users", type=int, default=1000, help="users created before the load")
+    parser.add_argument("--schedules", type=int, default=10, help="schedules created per user")
+    parser.add_argument("--rest-url", default=f"http://{settings.APP_HOST}:{settings.APP_PORT}", help="REST API")
+    parser.add_argument("--grpc-target", default=f"localhost:{settings.GRPC_PORT}", help="gRPC server")
+    parser.add_argument("--output", type=Path, help="write the results as JSON to this file")
+    parser.add_argument("--compare", type=Path, help="results JSON of an earlier run to compare with")
+    args = parser.parse_args()
+    if not args.rates and not args.concurrency:
+        args.rates = [50, 100, 200, 400]
+
+    previous = {}
+    if args.compare:
+        previous = {load_name(stage["load"]): stage for stage in json.loads(args.compare.read_text())["stages"]}
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    async with httpx.AsyncClient(base_url=args.rest_url, limits=limits, timeout=30) as http:
+        channel = grpc.aio.insecure_channel(args.grpc_target)
+        ops = Operations(http, schedules_pb2_grpc.SchedulesServiceStub(channel))
+        operations = ops.by_name()
+        weights = parse_mix(args.mix, operations)
+        print(f"seeding {args.users} users with {args.schedules} schedules each")
+        await ops.seed(args.users, args.schedules)
+
+        stage_loads = [{"rate": rate} for rate in args.rates or []]
+        stage_loads += [{"concurrency": concurrency} for concurrency in args.concurrency or []]
+        if args.warmup:
+            warmup = argparse.Namespace(**{**vars(args), "duration": args.warmup})
+            await run_stage(stage_loads[0], warmup, weights, operations)
+        stages = []
+        for load in stage_loads:
+            stage = await run_stage(load, args, weights, operations)
+            stages.append(stage)
+            print_stage(stage, previous.get(load_name(load)))
+        await channel.close()
+
+    saturated = next((stage for stage in stages if stage["saturated"]), None)
+    if saturated:
+        print(f"\nsaturated at {load_name(saturated['load'])}")
+    if args.output:
+        results = {
+            "started_at": started_at,
+            "git_commit": git_commit(),
+            "args": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+            "stages": stages,
+        }
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Cost of one log call on the calling thread, up to the record put on the logging queue, for every
+LOG_PROFILE: an info event, a warning (callsite info in "production"), and calls of a hot-path
+logger filtered out by LOG_HOT_PATH_LEVEL=WARNING, with keyword arguments and with an f-string.
+
+    uv run python -m benchmarks.log_calls --number 20000
+"""
+
+import argparse
+import logging
+import queue
+import time
+from typing import Callable, Dict
+
+import structlog
+
+from aibolit.core.config import settings
+from aibolit.core.logger import (
+    LOG_PROFILES,
+    BoundedQueueHandler,
+    configure_log_records,
+    get_logger,
+    profile_processors,
+    restore_log_records,
+)
+
+
+def configure(profile: str, log_queue: queue.Queue) -> None:
+    """configure_logging without the listener thread, the benchmark empties the queue itself."""
+    configure_log_records(profile)
+    logging.basicConfig(level=logging.INFO, handlers=[BoundedQueueHandler(log_queue)], force=True)
+    structlog.configure(
+        processors=profile_processors(profile),
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+        cache_logger_on_first_use=True,
+    )
+
+
+def per_call_us(func: Callable[[], None], number: int, log_queue: queue.Queue, repeat: int = 5) -> float:
+    """Best-of-`repeat` time of one `func` call in microseconds, with the queue emptied between repeats."""
+    best = float("inf")
+    for _ in range(repeat):
+        with log_queue.mutex:
+            log_queue.queue.clear()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / number * 1e6
+
+
+def log_cases(logger: structlog.BoundLogger, hot_logger: structlog.BoundLogger) -> Dict[str, Callable[[], None]]:
+    """The measured log calls, by name, on the loggers of the current profile."""
+    user_id, schedule_id = 1, 2
+    return {
+        "info": lambda: logger.info("Fetching next takings", user_id=user_id),
+        "warning": lambda: logger.warning("Schedule not found", user_id=user_id, schedule_id=schedule_id),
+        "hot info, filtered": lambda: hot_logger.info("Fetching user", user_id=user_id),
+        "hot f-string, filtered": lambda: hot_logger.info(f"Get user with id={user_id}"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20_000, help="calls per measurement")
+    args = parser.parse_args()
+    settings.LOG_LEVEL = "INFO"
+    settings.LOG_HOT_PATH_LEVEL = "WARNING"
+
+    results: Dict[str, Dict[str, float]] = {}
+    for profile in LOG_PROFILES:
+        log_queue: queue.Queue = queue.Queue()
+        configure(profile, log_queue)
+        cases = log_cases(get_logger("benchmark"), get_logger("benchmark", hot=True))
+        results[profile] = {name: per_call_us(case, args.number, log_queue) for name, case in cases.items()}
+    restore_log_records()
+
+    print(f"{'call, us':<24}" + "".join(f"{profile:>12}" for profile in LOG_PROFILES))
+    for name in results[LOG_PROFILES[0]]:
+        print(f"{name:<24}" + "".join(f"{results[profile][name]:>12.2f}" for profile in LOG_PROFILES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Event loop stalls while a burst of --requests requests logs as the app does: four events each,
+written by the synchronous console and rotating file handlers with indented JSON (before) and
+through the queue to the logging thread with single-line JSON (after).
+
+A ticker expecting to wake every millisecond measures how late the loop runs it. The console goes
+to /dev/null and the log file to a temporary directory; records written are counted after the
+shutdown flush, so drops of a full queue show up.
+
+    uv run python -m benchmarks.log_pipeline --requests 10000 --queue-size 10000 --policy drop_new
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Callable, List
+
+import structlog
+
+from aibolit.core import logger as app_logger
+from aibolit.core.config import settings
+
+HEADERS = {"host": "localhost:8000", "user-agent": "benchmark", "accept": "*/*", "x-trace-id": "0" * 36}
+
+
+class SlowRotatingFileHandler(RotatingFileHandler):
+    write_delay = 0.0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        super().emit(record)
+        if self.write_delay:
+            time.sleep(self.write_delay)
+
+
+def rotating_file_handler(logs_dir: Path) -> RotatingFileHandler:
+    return SlowRotatingFileHandler(
+        logs_dir / "app.log", mode="a", encoding="utf-8", backupCount=5, maxBytes=10 * 1024 * 1024
+    )
+
+
+def sync_logging(logs_dir: Path, console) -> None:
+    """configure_logging before the queue."""
+    logging.basicConfig(
+        format="%(message)s",
+        level=logging.INFO,
+        handlers=[logging.StreamHandler(console), rotating_file_handler(logs_dir)],
+        force=True,
+    )
+    structlog.configure(
+        processors=[
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.add_logger_name,
+            structlog.processors.TimeStamper(fmt="iso", utc=True),
+            structlog.processors.CallsiteParameterAdder(
+                parameters=[
+                    structlog.processors.CallsiteParameter.MODULE,
+                    structlog.processors.CallsiteParameter.FUNC_NAME,
+                    structlog.processors.CallsiteParameter.LINENO,
+                ]
+            ),
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.JSONRenderer(indent=4, ensure_ascii=False),
+        ],
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+        cache_logger_on_first_use=True,
+    )
+
+
+def queue_logging(logs_dir: Path, console) -> None:
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    app_logger.configure_logging(handlers=[logging.StreamHandler(console), rotating_file_handler(logs_dir)])
+
+
+async def burst(requests: int, concurrency: int) -> List[float]:
+    """Lateness (ms) of every tick of a 1 ms ticker while `requests` requests log, `concurrency` at a time."""
+    logger = structlog.get_logger("benchmark")
+    lags: List[float] = []
+    running = True
+
+    async def ticker() -> None:
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(max((time.perf_counter() - start) * 1000 - 1, 0))
+
+    async def request(number: int) -> None:
+        logger.info("request_received", method="GET", url="http://localhost:8000/next_takings", headers=HEADERS)
+        await asyncio.sleep(0)
+        logger.info("Fetching next takings", user_id=number)
+        logger.info("Next takings determined", user_id=number, count=3)
+        await asyncio.sleep(0)
+        logger.info("response_sent", status_code=200, process_time=0.001, response_length="230")
+
+    numbers = iter(range(requests))
+
+    async def connection() -> None:
+        for number in numbers:
+            await request(number)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    await asyncio.gather(*(connection() for _ in range(concurrency)))
+    running = False
+    await ticker_task
+    return lags
+
+
+def lines_written(logs_dir: Path) -> int:
+    return sum(path.read_text(encoding="utf-8").count("\n") for path in logs_dir.glob("app.log*"))
+
+
+def run(name: str, configure: Callable[[Path, object], None], shutdown: Callable[[], None], args) -> None:
+    with tempfile.TemporaryDirectory() as logs_dir, open(os.devnull, "w") as console:
+        configure(Path(logs_dir), console)
+        start = time.perf_counter()
+        lags = asyncio.run(burst(args.requests, args.concurrency))
+        burst_s = time.perf_counter() - start
+        start = time.perf_counter()
+        shutdown()
+        flush_ms = (time.perf_counter() - start) * 1000
+        written = lines_written(Path(logs_dir)) if name == "queue" else args.requests * 4
+        lags.sort()
+        print(
+            f"{name:<8}{burst_s * 1000:>10.0f}{lags[-1]:>10.1f}{lags[int(len(lags) * 0.99)]:>10.1f}"
+            f"{sum(lags):>12.0f}{flush_ms:>10.0f}{written:>10}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10_000, help="requests in the burst")
+    parser.add_argument("--concurrency", type=int, default=100, help="requests in flight")
+    parser.add_argument("--write-delay-us", type=float, default=0, help="added to every write, a slow disk or pipe")
+    parser.add_argument("--queue-size", type=int, default=settings.LOG_QUEUE_SIZE, help="LOG_QUEUE_SIZE")
+    parser.add_argument(
+        "--policy", default=settings.LOG_QUEUE_FULL_POLICY, choices=["drop_new", "drop_oldest", "block"]
+    )
+    args = parser.parse_args()
+    settings.LOG_QUEUE_SIZE = args.queue_size
+    SlowRotatingFileHandler.write_delay = args.write_delay_us / 1e6
+    settings.LOG_QUEUE_FULL_POLICY = args.policy
+
+    header = f"{'logging':<8}{'burst, ms':>10}{'max, ms':>10}{'p99, ms':>10}{'stalled, ms':>12}{'flush, ms':>10}"
+    print(f"{header}{'records':>10}")
+    run("sync", sync_logging, lambda: None, args)
+    run("queue", queue_logging, app_logger.shutdown_logging, args)
+
+
+if __name__ == "__main__":
+    main()
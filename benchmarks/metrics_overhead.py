@@ -0,0 +1,140 @@
+"""
+Overhead of the metrics on the calls they measure, with and without them:
+- REST: GET /next_takings straight to the ASGI app with the request logging of the app, sampling
+  --sample-rate of the requests, and MetricsMiddleware on top;
+- gRPC: GetUsers pages of --page-size users from memory on a local server, with and without
+  MetricsInterceptor;
+- DB: SELECT 1 on an in-memory SQLite engine, with and without the statement listeners. SQLite
+  answers in microseconds, so the added time per statement is the number to compare with a
+  database round trip.
+
+Calls with and without metrics alternate so that both see the same machine state. The REST and gRPC
+overhead is checked against --budget.
+
+    uv run python -m benchmarks.metrics_overhead --requests 5000
+"""
+
+import argparse
+import asyncio
+import time
+from functools import partial
+from typing import Callable, List
+
+import grpc
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+
+from aibolit.core.config import Settings
+from aibolit.core.metrics import instrument_engine
+from aibolit.core.middleware import LoggingMiddleware, MetricsMiddleware
+from aibolit.grpc.adapters.users import GrpcUserService
+from aibolit.grpc.generated import users_pb2, users_pb2_grpc
+from aibolit.grpc.server import create_server
+from benchmarks.common import log_to_devnull, per_call_us
+from benchmarks.grpc_transport import in_memory_user_service
+from benchmarks.request_logging import make_app, request
+
+
+def p50(latencies: List[float]) -> float:
+    return sorted(latencies)[len(latencies) // 2]
+
+
+def report(name: str, without: List[float], with_metrics: List[float], budget: float) -> bool:
+    base, measured = p50(without), p50(with_metrics)
+    overhead = measured / base - 1
+    ok = overhead < budget
+    print(f"{name:<6}{base * 1e6:>14.1f}{measured * 1e6:>14.1f}{overhead:>11.2%}  {'ok' if ok else 'OVER BUDGET'}")
+    return ok
+
+
+async def measure(calls: int, without: Callable, with_metrics: Callable) -> tuple[List[float], List[float]]:
+    for _ in range(200):
+        await without()
+        await with_metrics()
+    latencies_without: List[float] = []
+    latencies_with: List[float] = []
+    for _ in range(calls):
+        latencies_without.append(await without())
+        latencies_with.append(await with_metrics())
+    return latencies_without, latencies_with
+
+
+async def bench_rest(args: argparse.Namespace) -> tuple[List[float], List[float]]:
+    def add_logging(app: FastAPI) -> None:
+        app.add_middleware(LoggingMiddleware, sample_rate=args.sample_rate)
+
+    def add_logging_and_metrics(app: FastAPI) -> None:
+        add_logging(app)
+        app.add_middleware(MetricsMiddleware)
+
+    app = make_app(add_logging, args.schedules)
+    metrics_app = make_app(add_logging_and_metrics, args.schedules)
+    return await measure(args.requests, lambda: request(app), lambda: request(metrics_app))
+
+
+async def bench_grpc(args: argparse.Namespace) -> tuple[List[float], List[float]]:
+    stubs = []
+    servers = []
+    channels = []
+    for enabled in (False, True):
+        server = create_server(Settings(METRICS_ENABLED=enabled))
+        users_pb2_grpc.add_UserServiceServicer_to_server(GrpcUserService(in_memory_user_service), server)
+        port = server.add_insecure_port("localhost:0")
+        await server.start()
+        channel = grpc.aio.insecure_channel(f"localhost:{port}")
+        servers.append(server)
+        channels.append(channel)
+        stubs.append(users_pb2_grpc.UserServiceStub(channel))
+    page = users_pb2.GetAllUsersRequest(page_size=args.page_size)
+
+    def call(stub: users_pb2_grpc.UserServiceStub) -> Callable:
+        async def timed() -> float:
+            start = time.perf_counter()
+            await stub.GetUsers(page)
+            return time.perf_counter() - start
+
+        return timed
+
+    try:
+        return await measure(args.requests, call(stubs[0]), call(stubs[1]))
+    finally:
+        for channel, server in zip(channels, servers):
+            await channel.close()
+            await server.stop(0)
+
+
+def bench_db(statements: int) -> None:
+    per_statement = []
+    for instrumented in (False, True):
+        engine = create_engine("sqlite://")
+        if instrumented:
+            instrument_engine(engine)
+        with engine.connect() as connection:
+            select = text("SELECT 1")
+            per_statement.append(per_call_us(partial(connection.execute, select), number=statements))
+    base, measured = per_statement
+    overhead = measured / base - 1
+    print(f"{'DB':<6}{base:>14.1f}{measured:>14.1f}{overhead:>11.2%}  +{measured - base:.1f} us per statement")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="REST requests and gRPC calls per variant")
+    parser.add_argument("--schedules", type=int, default=10, help="schedules of the user")
+    parser.add_argument("--sample-rate", type=float, default=0.01, help="sampled share of logged requests")
+    parser.add_argument("--page-size", type=int, default=100, help="users per GetUsers page")
+    parser.add_argument("--statements", type=int, default=20000, help="SQLite statements per repeat")
+    parser.add_argument("--budget", type=float, default=0.02, help="largest accepted p50 overhead")
+    args = parser.parse_args()
+    log_to_devnull()
+
+    print(f"{'':<6}{'without, us':>14}{'with, us':>14}{'overhead':>11}")
+    ok = report("REST", *await bench_rest(args), args.budget)
+    ok &= report("gRPC", *await bench_grpc(args), args.budget)
+    bench_db(args.statements)
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
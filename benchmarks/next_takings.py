@@ -0,0 +1,92 @@
+"""
+Per-schedule cost of next takings selection with the datetime/strptime check per time string (before)
+and with the minute-of-day NextTakingsWindow (after), alone and within ScheduleService.get_user_next_takings.
+
+    uv run python -m benchmarks.next_takings --schedules 10 100 1000
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+from aibolit.core.config import settings
+from aibolit.schemas.openapi_generated import NextTakingsMedications, NextTakingsMedicationsResponse
+from aibolit.services.daily_plans import daily_plans
+from aibolit.services.next_takings import NextTakingsWindow
+from aibolit.services.schedules import ScheduleService
+from benchmarks.common import FakeScheduleRepo, make_db_schedules, per_call_us, silence_logs
+
+
+def legacy_is_within_timeframe(time_str: str) -> bool:
+    current_datetime = datetime.now()
+    current_time = current_datetime.time()
+    target_datetime = datetime.strptime(time_str, "%H:%M")
+    window_end_time = (target_datetime + timedelta(minutes=settings.INTAKE_WINDOW)).time()
+    time_upper_limit = (current_datetime + timedelta(minutes=settings.NEXT_TAKINGS_PERIOD)).time()
+    target_time = target_datetime.time()
+
+    is_within_day_limits = settings.TIME_DAY_START <= target_time <= settings.TIME_DAY_END
+    is_upcoming = current_time <= target_time <= time_upper_limit
+    is_active = target_time <= current_time <= window_end_time
+    return is_within_day_limits and (is_upcoming or is_active)
+
+
+class LegacyNextTakingsScheduleService(ScheduleService):
+    """ScheduleService with the per-time-string datetime check, as it was before NextTakingsWindow."""
+
+    async def get_user_next_takings(self, user_id: int) -> NextTakingsMedicationsResponse:
+        user_db_schedules = await self._schedules_repo.get_all_user_schedules(user_id)
+        schedules = [self._one_schedule_with_plan(db_schedule) for db_schedule in user_db_schedules]
+        next_takings = [
+            NextTakingsMedications(
+                schedule_id=next_taking.id,
+                schedule_name=next_taking.medication_name,
+                schedule_times=list(filter(legacy_is_within_timeframe, next_taking.daily_plan)),
+            )
+            for next_taking in schedules
+            if any(map(legacy_is_within_timeframe, next_taking.daily_plan))
+        ]
+        return NextTakingsMedicationsResponse(user_id=user_id, next_takings=next_takings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schedules", type=int, nargs="+", default=[10, 100, 1000], help="schedules per user")
+    parser.add_argument("--number", type=int, default=20, help="calls per measurement")
+    args = parser.parse_args()
+    silence_logs()
+
+    print(f"{'measure':<24}{'schedules':>10}{'before, us':>14}{'after, us':>14}{'speedup':>10}")
+    with asyncio.Runner() as runner:
+        for count in args.schedules:
+            db_schedules = make_db_schedules(count)
+            frequencies = [db_schedule.frequency for db_schedule in db_schedules]
+
+            def select_before(frequencies=frequencies):
+                for frequency in frequencies:
+                    plan = daily_plans.get(frequency)
+                    if any(map(legacy_is_within_timeframe, plan)):
+                        list(filter(legacy_is_within_timeframe, plan))
+
+            def select_after(frequencies=frequencies):
+                window = NextTakingsWindow(datetime.now())
+                for frequency in frequencies:
+                    window.select(frequency)
+
+            repo = FakeScheduleRepo(db_schedules)
+            before, after = LegacyNextTakingsScheduleService(repo), ScheduleService(repo)
+            measures = {
+                "selection": (select_before, select_after),
+                "get_user_next_takings": (
+                    lambda service=before: runner.run(service.get_user_next_takings(1)),
+                    lambda service=after: runner.run(service.get_user_next_takings(1)),
+                ),
+            }
+            for name, (before_call, after_call) in measures.items():
+                before_us = per_call_us(before_call, args.number) / count
+                after_us = per_call_us(after_call, args.number) / count
+                print(f"{name:<24}{count:>10}{before_us:>14.2f}{after_us:>14.2f}{before_us / after_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
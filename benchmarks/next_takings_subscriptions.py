@@ -0,0 +1,136 @@
+"""
+Next takings subscriptions on one process: memory, subscribe cost and the shared clock tick over a
+simulated day, with a share of stalled subscribers that never read after the first update.
+The per-minute cost of every subscriber rebuilding its own window is shown for comparison.
+
+    uv run python -m benchmarks.next_takings_subscriptions --subscribers 50000 --stalled 0.1
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Sequence
+
+from aibolit.services.next_takings import NextTakingsWindow
+from aibolit.services.next_takings_hub import NextTakingsHub, NextTakingsSubscription, SubscribedSchedule
+from benchmarks.common import per_call_us, rss_mb, silence_logs
+
+
+class SimulatedClock:
+    def __init__(self, now: datetime) -> None:
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+def make_user_schedules(users: int, per_user: int, today: date, seed: int = 0) -> List[List[SubscribedSchedule]]:
+    rnd = random.Random(seed)
+    schedule_ids = iter(range(1, users * per_user + 1))
+    return [
+        [
+            SubscribedSchedule(
+                next(schedule_ids),
+                f"Medication {user_id}",
+                rnd.randint(1, 15),
+                today - timedelta(days=rnd.randint(0, 5)),
+                rnd.choice([None, today, today + timedelta(days=30)]),
+            )
+            for _ in range(per_user)
+        ]
+        for user_id in range(users)
+    ]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=50_000, help="concurrent subscriptions")
+    parser.add_argument("--per-user", type=int, default=1, help="subscriptions per user")
+    parser.add_argument("--schedules", type=int, default=3, help="schedules per user")
+    parser.add_argument("--stalled", type=float, default=0.1, help="share of subscribers that stop reading")
+    args = parser.parse_args()
+    silence_logs()
+
+    start = datetime.combine(date.today(), datetime.min.time()).replace(hour=6)
+    clock = SimulatedClock(start)
+    hub = NextTakingsHub(clock=clock)
+    users = max(args.subscribers // args.per_user, 1)
+    user_schedules = make_user_schedules(users, args.schedules, start.date())
+    stalled_count = int(args.subscribers * args.stalled)
+    received = 0
+
+    async def load(user_id: int) -> Sequence[SubscribedSchedule]:
+        return user_schedules[user_id]
+
+    async def subscriber(number: int, subscribed: asyncio.Event, done: asyncio.Event) -> None:
+        nonlocal received
+        async with hub.subscribe(number % users, load) as subscription:
+            subscriptions[number] = subscription
+            subscribed.set()
+            async for _ in subscription:
+                received += 1
+                if number < stalled_count:
+                    await done.wait()
+
+    subscriptions: List[NextTakingsSubscription] = [None] * args.subscribers  # type: ignore[list-item]
+    rss_before = rss_mb()
+    done = asyncio.Event()
+    began = time.perf_counter()
+    tasks, events = [], []
+    for number in range(args.subscribers):
+        subscribed = asyncio.Event()
+        events.append(subscribed)
+        tasks.append(asyncio.create_task(subscriber(number, subscribed, done)))
+    for subscribed in events:
+        await subscribed.wait()
+    subscribe_s = time.perf_counter() - began
+    rss_after = rss_mb()
+    print(f"{'subscriptions':<28}{hub.subscription_count:>12}")
+    print(f"{'users':<28}{hub.user_count:>12}")
+    print(f"{'subscribe, us each':<28}{subscribe_s / args.subscribers * 1e6:>12.1f}")
+    print(f"{'rss growth, MB':<28}{rss_after - rss_before:>12.1f}")
+    print(f"{'rss per subscription, KB':<28}{(rss_after - rss_before) * 1024 / args.subscribers:>12.2f}")
+
+    # one simulated day, a tick per minute
+    tick_times, change_times, pushed = [], [], 0
+    received_before = received
+    minute = start
+    while minute < start + timedelta(days=1):
+        minute += timedelta(minutes=1)
+        clock.now = minute
+        began = time.perf_counter()
+        count = await hub.refresh(minute)
+        # woken subscribers run before this task resumes
+        await asyncio.sleep(0)
+        elapsed = (time.perf_counter() - began) * 1000
+        (change_times if count else tick_times).append(elapsed)
+        pushed += count
+    skipped = sum(subscription.skipped for subscription in subscriptions)
+    print(f"{'ticks without changes':<28}{len(tick_times):>12}")
+    print(f"{'  mean, ms':<28}{sum(tick_times) / max(len(tick_times), 1):>12.3f}")
+    print(f"{'ticks with changes':<28}{len(change_times):>12}")
+    print(f"{'  mean, ms':<28}{sum(change_times) / max(len(change_times), 1):>12.1f}")
+    print(f"{'  max, ms':<28}{max(change_times, default=0):>12.1f}")
+    print(f"{'updates pushed':<28}{pushed:>12}")
+    print(f"{'updates read':<28}{received - received_before:>12}")
+    print(f"{'updates skipped (stalled)':<28}{skipped:>12}")
+
+    schedules = user_schedules[0]
+
+    def own_window() -> object:
+        window = NextTakingsWindow(clock.now)
+        return [window.select(schedule.frequency) for schedule in schedules]
+
+    per_minute_ms = per_call_us(own_window, number=1000) * args.subscribers / 1000
+    print(f"{'window per subscriber, ms/min':<28}{per_minute_ms:>12.1f}")
+
+    done.set()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
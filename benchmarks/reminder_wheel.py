@@ -0,0 +1,69 @@
+"""
+Cost of ReminderWheel inserts, cancellations and minute ticks at a given number of intake slots.
+
+    uv run python -m benchmarks.reminder_wheel --slots 10000000
+"""
+
+import argparse
+import random
+import resource
+import time
+from datetime import date
+
+from aibolit.services.daily_plans import daily_plans
+from aibolit.services.next_takings import MINUTES_PER_DAY
+from aibolit.services.reminders import ReminderSchedule, ReminderWheel
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=1_000_000, help="intake slots to fill the wheel with")
+    parser.add_argument("--cancel", type=int, default=100_000, help="schedules to cancel and add back")
+    parser.add_argument("--batch-size", type=int, default=5000, help="intakes per fired batch")
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    today = date.today()
+    schedules, slots = [], 0
+    while slots < args.slots:
+        frequency = rnd.randint(1, 15)
+        schedules.append(ReminderSchedule(len(schedules) + 1, rnd.randint(1, 10**7), frequency, today, None))
+        slots += len(daily_plans.get(frequency))
+
+    wheel = ReminderWheel(today)
+    started = time.perf_counter()
+    for schedule in schedules:
+        wheel.add(schedule)
+    insert_s = time.perf_counter() - started
+
+    sample = rnd.sample(schedules, min(args.cancel, len(schedules)))
+    started = time.perf_counter()
+    for schedule in sample:
+        wheel.cancel(schedule.id)
+    cancel_s = time.perf_counter() - started
+    for schedule in sample:
+        wheel.add(schedule)
+
+    # time between event loop yields: from the tick start to the first batch and between batches
+    tick_s, worst_batch_s, fired = 0.0, 0.0, 0
+    for minute in range(MINUTES_PER_DAY):
+        started = time.perf_counter()
+        for batch in wheel.due_batches(minute, args.batch_size):
+            fired += len(batch)
+            now = time.perf_counter()
+            worst_batch_s = max(worst_batch_s, now - started)
+            tick_s += now - started
+            started = now
+        tick_s += time.perf_counter() - started
+
+    print(f"schedules: {len(schedules):,}, slots: {len(wheel):,}")
+    print(f"insert:  {insert_s / len(schedules) * 1e6:.2f} us/schedule")
+    print(f"cancel:  {cancel_s / len(sample) * 1e6:.2f} us/schedule")
+    print(f"tick:    {tick_s / MINUTES_PER_DAY * 1e3:.3f} ms/minute on average")
+    print(f"batch:   {worst_batch_s * 1e3:.1f} ms worst event loop stall per batch of {args.batch_size}")
+    print(f"fire:    {tick_s / max(fired, 1) * 1e9:.0f} ns/intake, {fired:,} intakes a day")
+    print(f"max rss: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Latency of GET /next_takings through the request logging middleware: the BaseHTTPMiddleware one
+(before), the raw ASGI one logging every request and sampling --sample-rate of them (after), and
+no middleware at all. Requests are sent one at a time straight to the ASGI app; the schedules come
+from memory and the logs are rendered as in the app but written to /dev/null.
+
+    uv run python -m benchmarks.request_logging --requests 5000 --sample-rate 0.01
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Callable, Dict, List
+
+import structlog
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from structlog.contextvars import clear_contextvars
+
+from aibolit.core.dependencies import get_schedule_service
+from aibolit.core.logger import get_logger
+from aibolit.core.middleware import LoggingMiddleware
+from aibolit.services.schedules import ScheduleService
+from aibolit.transport.views.schedules import router as schedules_router
+from benchmarks.common import FakeScheduleRepo, log_to_devnull, make_db_schedules
+
+logger = get_logger("aibolit.core.middleware")
+
+
+class BaseHTTPLoggingMiddleware(BaseHTTPMiddleware):
+    """The LoggingMiddleware before it was rewritten as raw ASGI."""
+
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+
+        trace_id = request.headers.get("X-TRACE-ID", str(uuid.uuid4()))
+        structlog.contextvars.bind_contextvars(trace_id=trace_id)
+
+        client_ip = request.client.host if request.client else "unknown"
+
+        logger.info(
+            "request_received",
+            method=request.method,
+            url=str(request.url),
+            headers={k: v for k, v in request.headers.items() if k.lower() not in {"authorization", "cookie"}},
+            query_params=dict(request.query_params),
+            client_ip=client_ip,
+            timestamp=start_time,
+        )
+
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            logger.error("unhandled_exception", error=str(e))
+            raise
+        finally:
+            clear_contextvars()
+
+        process_time = time.time() - start_time
+
+        logger.info(
+            "response_sent",
+            status_code=response.status_code,
+            process_time=round(process_time, 4),
+            response_length=response.headers.get("content-length", "unknown"),
+            response_timestamp=time.time(),
+        )
+
+        return response
+
+
+def make_app(add_middleware: Callable[[FastAPI], None], schedules: int) -> FastAPI:
+    app = FastAPI()
+    add_middleware(app)
+    app.include_router(schedules_router)
+    service = ScheduleService(FakeScheduleRepo(make_db_schedules(schedules)))
+    app.dependency_overrides[get_schedule_service] = lambda: service
+    return app
+
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/next_takings",
+    "raw_path": b"/next_takings",
+    "query_string": b"user_id=1",
+    "root_path": "",
+    "headers": [(b"host", b"localhost:8000"), (b"user-agent", b"benchmark"), (b"accept", b"*/*")],
+    "client": ("127.0.0.1", 50000),
+    "server": ("localhost", 8000),
+}
+
+
+async def request(app: FastAPI) -> float:
+    """Seconds until the response of one GET /next_takings is sent."""
+    disconnected = asyncio.Event()
+    received = False
+
+    async def receive() -> Dict:
+        nonlocal received
+        if received:
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict) -> None:
+        if message["type"] == "http.response.start":
+            assert 200 == message["status"], message
+
+    start = time.perf_counter()
+    await app(dict(SCOPE), receive, send)
+    elapsed = time.perf_counter() - start
+    disconnected.set()
+    return elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="requests per measurement")
+    parser.add_argument("--schedules", type=int, default=10, help="schedules of the user")
+    parser.add_argument("--sample-rate", type=float, default=0.01, help="sampled share of logged requests")
+    args = parser.parse_args()
+    log_to_devnull()
+
+    variants: Dict[str, Callable[[FastAPI], None]] = {
+        "BaseHTTPMiddleware": lambda app: app.add_middleware(BaseHTTPLoggingMiddleware),
+        "ASGI, all logged": lambda app: app.add_middleware(LoggingMiddleware),
+        f"ASGI, {args.sample_rate:.0%} sampled": lambda app: app.add_middleware(
+            LoggingMiddleware, sample_rate=args.sample_rate
+        ),
+        "no middleware": lambda app: None,
+    }
+    print(f"{'middleware':<22}{'p50, us':>10}{'p99, us':>10}")
+    for name, add_middleware in variants.items():
+        app = make_app(add_middleware, args.schedules)
+        for _ in range(200):
+            await request(app)
+        latencies: List[float] = sorted([await request(app) for _ in range(args.requests)])
+        p50 = latencies[len(latencies) // 2] * 1e6
+        p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+        print(f"{name:<22}{p50:>10.0f}{p99:>10.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,42 @@
+"""
+Per-row cost of building MedicationSchedule responses from ORM rows by unpacking the row __dict__ into the model
+and passing the result to model_validate again (before) and by validating only the loaded column values with
+services.mappers (after). Users keep the direct User.model_validate(row.__dict__): a single validation already,
+which the mapper does not beat.
+
+    uv run python -m benchmarks.row_mappers --rows 1000
+"""
+
+import argparse
+
+from aibolit.schemas.openapi_generated import MedicationSchedule
+from aibolit.services.daily_plans import daily_plans
+from aibolit.services.schedules import schedule_mapper
+from benchmarks.common import make_db_schedules, per_call_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="rows per measurement")
+    parser.add_argument("--number", type=int, default=20, help="calls per measurement")
+    args = parser.parse_args()
+
+    db_schedules = make_db_schedules(args.rows)
+
+    def schedules_before():
+        for row in db_schedules:
+            daily_plan = list(daily_plans.get(row.frequency))
+            MedicationSchedule.model_validate(MedicationSchedule(**row.__dict__, daily_plan=daily_plan))
+
+    def schedules_after():
+        for row in db_schedules:
+            schedule_mapper(row, daily_plan=list(daily_plans.get(row.frequency)))
+
+    print(f"{'model':<20}{'before, us':>14}{'after, us':>14}{'speedup':>10}")
+    before_us = per_call_us(schedules_before, args.number) / args.rows
+    after_us = per_call_us(schedules_after, args.number) / args.rows
+    print(f"{'MedicationSchedule':<20}{before_us:>14.2f}{after_us:>14.2f}{before_us / after_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Per-call cost of listing the schedule IDs of a user by loading full ORM rows and building
+schedules with daily plans (before) and by selecting only the IDs (after).
+Queries run through the ORM against an in-memory SQLite database, so driver and hydration costs
+are included; against PostgreSQL the result set also shrinks from 7 columns per row to 1.
+
+    uv run python -m benchmarks.schedule_ids --schedules 10 100 1000
+"""
+
+import argparse
+from datetime import date
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from aibolit.core.database import Base
+from aibolit.models.schedules import MedicationScheduleOrm
+from aibolit.models.users import UserOrm
+from aibolit.repositories.schedules import ScheduleRepo
+from aibolit.schemas.openapi_generated import MedicationScheduleIdsResponse
+from aibolit.services.daily_plans import daily_plans
+from aibolit.services.schedules import schedule_mapper
+from benchmarks.common import make_db_schedules, per_call_us, silence_logs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schedules", type=int, nargs="+", default=[10, 100, 1000], help="schedules per user")
+    parser.add_argument("--number", type=int, default=20, help="calls per measurement")
+    args = parser.parse_args()
+    silence_logs()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    print(f"{'schedules':>10}{'before, us':>14}{'after, us':>14}{'speedup':>10}")
+    for user_id, count in enumerate(args.schedules, start=1):
+        with Session(engine) as session:
+            session.add(UserOrm(id=user_id))
+            rows = [
+                {column.key: getattr(db_schedule, column.key) for column in MedicationScheduleOrm.__table__.columns}
+                for db_schedule in make_db_schedules(count, user_id=user_id)
+            ]
+            for row in rows:
+                row["id"] += user_id * 1_000_000
+                row["start_date"] = min(row["start_date"], date.today())
+            session.execute(insert(MedicationScheduleOrm), rows)
+            session.commit()
+
+        def before(user_id=user_id):
+            with Session(engine) as session:
+                db_schedules = session.execute(ScheduleRepo.all_user_schedules_query(user_id)).scalars().all()
+                schedules = [
+                    schedule_mapper(row, daily_plan=list(daily_plans.get(row.frequency))).id for row in db_schedules
+                ]
+                return MedicationScheduleIdsResponse(user_id=user_id, schedules=schedules)
+
+        def after(user_id=user_id):
+            with Session(engine) as session:
+                schedules = list(session.execute(ScheduleRepo.all_user_schedule_ids_query(user_id)).scalars())
+                return MedicationScheduleIdsResponse(user_id=user_id, schedules=schedules)
+
+        assert before().schedules == after().schedules
+        before_us = per_call_us(before, args.number)
+        after_us = per_call_us(after, args.number)
+        print(f"{count:>10}{before_us:>14.1f}{after_us:>14.1f}{before_us / after_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
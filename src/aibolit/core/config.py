@@ -1,5 +1,6 @@
 from datetime import time
 from pathlib import Path
+from typing import Dict, Literal, Optional
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -10,7 +11,23 @@ load_dotenv(BASE_DIR / ".env")
 class Settings(BaseSettings):
     DEBUG: bool = False
     LOG_LEVEL: str = "INFO"
+    # processors run on every log call, see core.logger.profile_processors; "production" is the cheapest
+    # one that keeps callsite info on warnings and errors
+    LOG_PROFILE: Literal["full", "production", "minimal"] = "full"
+    # least level of the events of hot-path loggers, get_logger(name, hot=True); WARNING makes their info calls free
+    LOG_HOT_PATH_LEVEL: str = "INFO"
     LOGS_DIR: Path = BASE_DIR / "logs"
+    # records waiting for the logging thread, and what to do with new ones when they fill up
+    LOG_QUEUE_SIZE: int = 10_000
+    LOG_QUEUE_FULL_POLICY: Literal["drop_new", "drop_oldest", "block"] = "drop_new"
+    # places of the queue left to warnings and errors, records below WARNING are dropped once only these are free
+    LOG_QUEUE_WARNING_HEADROOM: int = 1_000
+    # share of HTTP requests logged; responses with at least LOG_ERROR_STATUS and slower ones are logged always
+    LOG_REQUESTS_SAMPLE_RATE: float = 1.0
+    LOG_SLOW_REQUEST_MS: float = 1000.0
+    LOG_ERROR_STATUS: int = 500
+    # Prometheus metrics of REST, gRPC and database calls served at /metrics
+    METRICS_ENABLED: bool = True
     # env variables
     APP_PORT: int = 8000
     APP_HOST: str = "localhost"
@@ -20,7 +37,65 @@ class Settings(BaseSettings):
     DB_PORT: int = 6543
     DB_NAME: str = "aibolit_db"
     DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 10.0
+    # seconds after which connections are replaced, -1 to keep them forever
+    DB_POOL_RECYCLE: int = 1800
+    # ping connections on checkout, costs a round trip per checkout
+    DB_POOL_PRE_PING: bool = False
+    # prepared statements cached per connection, 0 behind pgbouncer in transaction mode
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # seconds between pool stats log lines, 0 to disable
+    DB_POOL_STATS_LOG_INTERVAL: int = 60
+    # statements counted per HTTP request and gRPC call, logged as query_budget_exceeded above SQL_QUERY_BUDGET and
+    # as repeated_statement (N+1) when one statement runs SQL_REPEATED_STATEMENT_LIMIT times; 0 to disable either
+    SQL_STATS_ENABLED: bool = True
+    SQL_QUERY_BUDGET: int = 10
+    SQL_REPEATED_STATEMENT_LIMIT: int = 5
+    # statements slower than this are logged and SELECTs get their plan written to slow_queries.log, once per
+    # SQL_EXPLAIN_COOLDOWN_S for the same statement; 0 (default) to disable, EXPLAIN ANALYZE runs them again
+    SQL_SLOW_QUERY_MS: float = 0.0
+    SQL_EXPLAIN_COOLDOWN_S: float = 300.0
+    # /internal/pool answers only requests with an "Authorization: Bearer <INTERNAL_TOKEN>" header; unset to disable
+    INTERNAL_TOKEN: str = ""
+    # requests and gRPC calls with an X-Profile header (x-profile metadata) equal to PROFILE_TOKEN and
+    # PROFILE_SAMPLE_RATE of the rest get their stacks sampled every PROFILE_INTERVAL_MS; the last PROFILE_KEEP
+    # profiles are written to LOGS_DIR/profiles and listed at /internal/profiles. Unset and 0 to disable
+    PROFILE_TOKEN: str = ""
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_INTERVAL_MS: float = 1.0
+    PROFILE_KEEP: int = 100
+    # spans of requests, calls, services and repositories, exported in batches as OTLP/JSON lines to
+    # TRACING_EXPORT_PATH, LOGS_DIR/spans.jsonl by default
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORT_PATH: Optional[Path] = None
+    TRACING_QUEUE_SIZE: int = 10_000
+    TRACING_BATCH_SIZE: int = 512
+    TRACING_EXPORT_INTERVAL_S: float = 5.0
     GRPC_PORT: int = 50051
+    # RPCs with a single response served at once, the rest are rejected with RESOURCE_EXHAUSTED; 0 for no limit.
+    # Server-streaming RPCs (SubscribeNextTakings, StreamUsers) have a limit of their own
+    GRPC_MAX_CONCURRENT_RPCS: int = 100
+    GRPC_MAX_CONCURRENT_STREAMING_RPCS: int = 10_000
+    # gRPC transport, the defaults are the ones of grpc itself.
+    # HTTP/2 streams per connection, 0 for no limit
+    GRPC_MAX_CONCURRENT_STREAMS: int = 0
+    # pings on idle connections and how long to wait for their ack before closing the connection
+    GRPC_KEEPALIVE_TIME_MS: int = 7_200_000
+    GRPC_KEEPALIVE_TIMEOUT_MS: int = 20_000
+    GRPC_KEEPALIVE_PERMIT_WITHOUT_CALLS: bool = False
+    # client pings closer than this get the connection closed with too_many_pings, lower it behind sidecars
+    GRPC_MIN_RECV_PING_INTERVAL_MS: int = 300_000
+    # bytes, -1 for no limit
+    GRPC_MAX_RECEIVE_MESSAGE_LENGTH: int = 4 * 1024 * 1024
+    GRPC_MAX_SEND_MESSAGE_LENGTH: int = -1
+    # compression of every response, and overrides per method, e.g. {"/user.UserService/StreamUsers": "gzip"}
+    GRPC_COMPRESSION: Literal["none", "deflate", "gzip"] = "none"
+    GRPC_CALL_COMPRESSION: Dict[str, Literal["none", "deflate", "gzip"]] = {}
+    # initial HTTP/2 stream flow-control window in bytes, 0 for the default; BDP probing grows it on its own
+    GRPC_HTTP2_STREAM_WINDOW: int = 0
+    GRPC_HTTP2_BDP_PROBE: bool = True
     # for tests
     TEST_DB_USER: str = "aibolit_user"
     TEST_DB_NAME: str = "test_aibolit_db"
@@ -33,6 +108,15 @@ class Settings(BaseSettings):
     NEXT_TAKINGS_PERIOD: int = 120
     INTAKE_WINDOW: int = 30
     TIME_ROUNDING_INTERVAL: int = 15
+    # rows fetched per server-side cursor round trip and due intakes yielded per batch by the sweep
+    DUE_INTAKES_SWEEP_BATCH_SIZE: int = 5000
+    # the reminder scheduler of main.py; every process with it loads all schedules and fires every reminder,
+    # so enable it in exactly one process (one uvicorn worker, one replica)
+    REMINDERS_ENABLED: bool = False
+    SCHEDULES_BATCH_MAX_SIZE: int = 100
+    # users per GetUsers page and StreamUsers message when the request sets no page_size, and the largest allowed
+    USERS_PAGE_SIZE: int = 1000
+    USERS_PAGE_MAX_SIZE: int = 10000
 
     @property
     def DB_URL(self) -> str:
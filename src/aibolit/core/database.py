@@ -5,11 +5,30 @@ from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, mapped_column
 
 from aibolit.core.config import settings
+from aibolit.core.metrics import instrument_engine, pool_collector, registry
+from aibolit.core.pool_stats import TimedAsyncAdaptedQueuePool
+from aibolit.core.query_stats import QueryTracker
 
 engine = create_async_engine(
     url=settings.DB_URL,
     echo=settings.DB_ECHO,
+    poolclass=TimedAsyncAdaptedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={
+        # SQLAlchemy's own prepared statement cache and the asyncpg one under it
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    },
 )
+if settings.METRICS_ENABLED:
+    instrument_engine(engine.sync_engine)
+    registry.add_collector(pool_collector(engine))
+if settings.SQL_STATS_ENABLED:
+    QueryTracker(engine, settings.SQL_SLOW_QUERY_MS, settings.SQL_EXPLAIN_COOLDOWN_S).install()
 SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
 
 
@@ -30,4 +49,4 @@ async def get_db():
         yield db
 
 
-intpk = Annotated[int, mapped_column(primary_key=True, index=True)]
+intpk = Annotated[int, mapped_column(primary_key=True)]
@@ -1,12 +1,17 @@
-from typing import Annotated
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncContextManager, AsyncIterator, Callable, TypeVar
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from aibolit.core.database import get_db
+from aibolit.core.database import get_db, get_db_grpc
 from aibolit.repositories.schedules import ScheduleRepo
 from aibolit.repositories.users import UserRepo
 from aibolit.services.schedules import ScheduleService
 from aibolit.services.users import UserService
 
+ServiceT = TypeVar("ServiceT")
+# opens a service on its own session for the duration of one gRPC call
+ServiceScope = Callable[[], AsyncContextManager[ServiceT]]
+
 
 def get_users_repo(session: Annotated[AsyncSession, Depends(get_db)]) -> UserRepo:
     return UserRepo(session)
@@ -22,3 +27,15 @@ async def get_schedule_service(schedules_repo: Annotated[ScheduleRepo, Depends(g
 
 async def get_user_service(users_repo: Annotated[UserRepo, Depends(get_users_repo)]) -> UserService:
     return UserService(users_repo)
+
+
+@asynccontextmanager
+async def schedule_service_scope() -> AsyncIterator[ScheduleService]:
+    async with get_db_grpc() as session:
+        yield ScheduleService(ScheduleRepo(session))
+
+
+@asynccontextmanager
+async def user_service_scope() -> AsyncIterator[UserService]:
+    async with get_db_grpc() as session:
+        yield UserService(UserRepo(session))
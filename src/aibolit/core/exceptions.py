@@ -1,4 +1,5 @@
 from datetime import date
+from typing import List
 
 
 class ScheduleExpiredError(Exception):
@@ -17,3 +18,17 @@ class ScheduleNotStartedError(Exception):
     def __init__(self, medication_name: str, start_date: date) -> None:
         self.status_code = 409
         super().__init__(f"The medication '{medication_name}' intake will begin {start_date}")
+
+
+class UserNotFoundError(Exception):
+    def __init__(self, user_id: int) -> None:
+        self.status_code = 404
+        super().__init__(f"User with id={user_id} not found")
+
+
+class ScheduleBatchUserError(Exception):
+    def __init__(self, user_id: int, indexes: List[int]) -> None:
+        self.status_code = 422
+        self.user_id = user_id
+        self.indexes = indexes
+        super().__init__(f"All schedules of a batch must belong to one user, expected user={user_id}")
@@ -1,50 +1,251 @@
+import atexit
 import logging
 import os
+import queue
 import structlog
 
-from logging.handlers import RotatingFileHandler
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional, Sequence
+from structlog.typing import EventDict, Processor, WrappedLogger
 from aibolit.core.config import settings
 
+LOG_PROFILES = ("full", "production", "minimal")
 
-def configure_logging():
-    os.makedirs(settings.LOGS_DIR, exist_ok=True)
-    render_method = (
-        structlog.dev.ConsoleRenderer()
-        if settings.DEBUG
-        else structlog.processors.JSONRenderer(indent=4, ensure_ascii=False)
-    )
-    file_handler = RotatingFileHandler(
-        settings.LOGS_DIR / "app.log",
-        mode="a",
-        encoding="utf-8",
-        backupCount=5,
-        maxBytes=10 * 1024 * 1024,  # 10 MB
+# switches of the logging module for the attributes of every record, see configure_log_records
+LOG_RECORD_SWITCHES = ("logThreads", "logProcesses", "logMultiprocessing", "logAsyncioTasks")
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_log_record_defaults: Dict[str, bool] = {}
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Puts records on a bounded queue for the listener thread and applies `full_policy` when it is full:
+    "drop_new" drops the record, "drop_oldest" the oldest queued one below WARNING and "block" waits for room.
+    Records below WARNING leave the last `headroom` places of the queue to warnings and errors, which are dropped
+    too once those are taken, so that only the "block" policy ever waits.
+    Drops are counted and reported by a warning once there is room again.
+    """
+
+    def __init__(self, log_queue: queue.Queue, full_policy: str = "drop_new", headroom: int = 0) -> None:
+        super().__init__(log_queue)
+        self.full_policy = full_policy
+        self.headroom = headroom
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # structlog event dicts are rendered by the listener, the messages of other loggers are resolved here
+        # as their arguments may change once the call returns
+        if not isinstance(record.msg, dict):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.full_policy == "block":
+            self.queue.put(record)
+        else:
+            full = self.queue.full if record.levelno >= logging.WARNING else self._headroom_reached
+            if self.full_policy == "drop_oldest" and full() and self._drop_oldest():
+                self.dropped += 1
+            try:
+                if full():
+                    raise queue.Full
+                self.queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+                return
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            try:
+                self.queue.put_nowait(
+                    logging.LogRecord(
+                        __name__, logging.WARNING, __file__, 0, f"{dropped} log records dropped", None, None
+                    )
+                )
+            except queue.Full:
+                self.dropped += dropped
+
+    def _headroom_reached(self) -> bool:
+        return 0 < self.queue.maxsize <= self.queue.qsize() + self.headroom
+
+    def _drop_oldest(self) -> bool:
+        """Drops the oldest queued record below WARNING, False if all of them are warnings or errors."""
+        with self.queue.mutex:
+            for index, queued in enumerate(self.queue.queue):
+                if queued.levelno < logging.WARNING:
+                    del self.queue.queue[index]
+                    self.queue.not_full.notify()
+                    return True
+        return False
+
+
+class RenderingQueueListener(QueueListener):
+    """Renders every record once on the listener thread, before its handlers write it."""
+
+    def __init__(self, log_queue: queue.Queue, formatter: logging.Formatter, *handlers: logging.Handler) -> None:
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.formatter = formatter
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = self.formatter.format(record)
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+
+class LevelGate:
+    """Runs `processor` only on events of `min_level` and above."""
+
+    def __init__(self, processor: Processor, min_level: int) -> None:
+        self.processor = processor
+        self.min_level = min_level
+
+    def __call__(self, logger: WrappedLogger, method_name: str, event_dict: EventDict) -> EventDict:
+        if structlog.processors.NAME_TO_LEVEL.get(method_name, logging.NOTSET) >= self.min_level:
+            return self.processor(logger, method_name, event_dict)
+        return event_dict
+
+
+def iso_timestamp(logger: WrappedLogger, method_name: str, event_dict: EventDict) -> EventDict:
+    """Formats a UNIX `timestamp` in ISO 8601 UTC with microseconds, even when they are 0, on the listener thread."""
+    timestamp = event_dict.get("timestamp")
+    if isinstance(timestamp, float):
+        event_dict["timestamp"] = datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    return event_dict
+
+
+def profile_processors(profile: str) -> List[Processor]:
+    """
+    structlog processors run on every log call.
+    "full": callsite info on every event; "production": callsite info on warnings and above, timestamps formatted
+    by the listener; "minimal": no callsite info.
+    """
+    callsite = structlog.processors.CallsiteParameterAdder(
+        parameters=[
+            structlog.processors.CallsiteParameter.MODULE,
+            structlog.processors.CallsiteParameter.FUNC_NAME,
+            structlog.processors.CallsiteParameter.LINENO,
+        ],
+        additional_ignores=[__name__],
     )
+    processors: List[Processor] = [
+        # the trace_id and other values bound to the request or call
+        structlog.contextvars.merge_contextvars,
+        structlog.stdlib.add_log_level,
+        structlog.stdlib.add_logger_name,
+    ]
+    if profile == "full":
+        processors += [structlog.processors.TimeStamper(fmt="iso", utc=True), callsite]
+    elif profile == "production":
+        processors += [structlog.processors.TimeStamper(utc=True), LevelGate(callsite, logging.WARNING)]
+    elif profile == "minimal":
+        processors.append(structlog.processors.TimeStamper(utc=True))
+    else:
+        raise ValueError(f"Unknown log profile {profile!r}, expected one of {LOG_PROFILES}")
+    processors += [
+        structlog.processors.StackInfoRenderer(),
+        structlog.processors.format_exc_info,
+        structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+    ]
+    return processors
 
-    log_handlers = [logging.StreamHandler(), file_handler]
-    logging.basicConfig(format="%(message)s", level=logging.INFO, handlers=log_handlers)
-    structlog.configure(
-        processors=[
+
+def configure_log_records(profile: str) -> None:
+    """
+    Outside the "full" profile, stdlib log records skip the thread, process and task lookups: rendered events
+    never show them. restore_log_records sets the switches back.
+    """
+    full = profile == "full"
+    for name in LOG_RECORD_SWITCHES:
+        _log_record_defaults.setdefault(name, getattr(logging, name))
+        setattr(logging, name, full)
+
+
+def restore_log_records() -> None:
+    """Sets the switches of configure_log_records back to what they were before its first call."""
+    for name, value in _log_record_defaults.items():
+        setattr(logging, name, value)
+    _log_record_defaults.clear()
+
+
+def configure_logging(handlers: Optional[Sequence[logging.Handler]] = None):
+    """
+    Sets up structlog over the root logger once per process with the LOG_PROFILE processors. Records are queued
+    to a listener thread that renders them and writes them to `handlers`, the console and the log file by default,
+    so logging never waits on I/O; see shutdown_logging.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+    processors = profile_processors(settings.LOG_PROFILE)
+    level = logging.getLevelNamesMapping()[settings.LOG_LEVEL.upper()]
+    render_method = (
+        structlog.dev.ConsoleRenderer() if settings.DEBUG else structlog.processors.JSONRenderer(ensure_ascii=False)
+    )
+    if handlers is None:
+        os.makedirs(settings.LOGS_DIR, exist_ok=True)
+        file_handler = RotatingFileHandler(
+            settings.LOGS_DIR / "app.log",
+            mode="a",
+            encoding="utf-8",
+            backupCount=5,
+            maxBytes=10 * 1024 * 1024,  # 10 MB
+        )
+        handlers = [logging.StreamHandler(), file_handler]
+    formatter = structlog.stdlib.ProcessorFormatter(
+        processors=[structlog.stdlib.ProcessorFormatter.remove_processors_meta, iso_timestamp, render_method],
+        foreign_pre_chain=[
             structlog.stdlib.add_log_level,
             structlog.stdlib.add_logger_name,
             structlog.processors.TimeStamper(fmt="iso", utc=True),
-            structlog.processors.CallsiteParameterAdder(
-                parameters=[
-                    structlog.processors.CallsiteParameter.MODULE,
-                    structlog.processors.CallsiteParameter.FUNC_NAME,
-                    structlog.processors.CallsiteParameter.LINENO,
-                ]
-            ),
-            structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
-            render_method,
         ],
+    )
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    _listener = RenderingQueueListener(log_queue, formatter, *handlers)
+    _queue_handler = BoundedQueueHandler(log_queue, settings.LOG_QUEUE_FULL_POLICY, settings.LOG_QUEUE_WARNING_HEADROOM)
+
+    configure_log_records(settings.LOG_PROFILE)
+    logging.basicConfig(format="%(message)s", level=level, handlers=[_queue_handler])
+    _listener.start()
+    atexit.register(shutdown_logging)
+    structlog.configure(
+        processors=processors,
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
-        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+        wrapper_class=structlog.make_filtering_bound_logger(level),
         cache_logger_on_first_use=True,
     )
 
 
-def get_logger(name: str) -> structlog.BoundLogger:
+def shutdown_logging():
+    """Writes out the queued records and stops the listener thread, also run at exit."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    logging.getLogger().removeHandler(_queue_handler)
+    _queue_handler = None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    restore_log_records()
+
+
+def get_logger(name: str, hot: bool = False) -> structlog.BoundLogger:
+    """
+    `hot` marks a logger of events on hot paths, such as the per-request ones of services. Its methods of levels
+    below LOG_HOT_PATH_LEVEL do nothing, so calls filtered out cost a function call; pass values as keyword
+    arguments rather than formatting them into the event.
+    """
+    levels = logging.getLevelNamesMapping()
+    hot_level = levels[settings.LOG_HOT_PATH_LEVEL.upper()]
+    if hot and hot_level > levels[settings.LOG_LEVEL.upper()]:
+        return structlog.wrap_logger(
+            None, wrapper_class=structlog.make_filtering_bound_logger(hot_level), logger_factory_args=(name,)
+        )
     return structlog.get_logger(name)
@@ -0,0 +1,245 @@
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Generic, Iterable, List, Sequence, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from aibolit.core.pool_stats import pool_stats
+
+# upper bounds of the latency buckets, in seconds; the last bucket is unbounded
+LATENCY_BUCKETS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_OPERATIONS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE"})
+
+ChildT = TypeVar("ChildT")
+
+
+class CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class GaugeValue(CounterValue):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Metric(ABC, Generic[ChildT]):
+    """
+    A metric family with one child per label values. Children are plain objects updated in place: metrics are
+    only updated from the event loop thread, so they need no locks.
+    """
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], ChildT] = {}
+
+    def labels(self, *values: str) -> ChildT:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    @abstractmethod
+    def _new_child(self) -> ChildT:
+        """The child of label values seen for the first time."""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for values, child in self._children.items():
+            lines.extend(self._render_child(_labels(self.labelnames, values), child))
+        return lines
+
+    def _render_child(self, labels: str, child: ChildT) -> Iterable[str]:
+        yield f"{self.name}{_braces(labels)} {child.value}"  # type: ignore[attr-defined]
+
+
+class Counter(Metric[CounterValue]):
+    type = "counter"
+
+    def _new_child(self) -> CounterValue:
+        return CounterValue()
+
+
+class Gauge(Metric[GaugeValue]):
+    type = "gauge"
+
+    def _new_child(self) -> GaugeValue:
+        return GaugeValue()
+
+
+class Histogram(Metric[HistogramValue]):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def _new_child(self) -> HistogramValue:
+        return HistogramValue(self.buckets)
+
+    def _render_child(self, labels: str, child: HistogramValue) -> Iterable[str]:
+        separator = "," if labels else ""
+        total = 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], child.counts):
+            total += count
+            yield f'{self.name}_bucket{{{labels}{separator}le="{bound}"}} {total}'
+        yield f"{self.name}_sum{_braces(labels)} {child.sum}"
+        yield f"{self.name}_count{_braces(labels)} {total}"
+
+
+MetricT = TypeVar("MetricT", bound=Metric)
+
+
+class MetricsRegistry:
+    """Metrics rendered together in the Prometheus text format, with collectors for values read on scrape."""
+
+    def __init__(self) -> None:
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric: MetricT) -> MetricT:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[str]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _braces(labels: str) -> str:
+    return f"{{{labels}}}" if labels else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+http_request_duration: Histogram = registry.register(
+    Histogram("http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+)
+http_requests_in_flight: Gauge = registry.register(
+    Gauge("http_requests_in_flight", "HTTP requests being served.", ("method",))
+)
+http_request_errors: Counter = registry.register(
+    Counter("http_request_errors_total", "HTTP responses with a 4xx or 5xx status.", ("method", "route", "status"))
+)
+grpc_handling_duration: Histogram = registry.register(
+    Histogram("grpc_server_handling_seconds", "gRPC call latency by method.", ("grpc_method",))
+)
+grpc_in_flight: Gauge = registry.register(Gauge("grpc_server_in_flight", "gRPC calls being served.", ("grpc_method",)))
+grpc_errors: Counter = registry.register(
+    Counter("grpc_server_errors_total", "gRPC calls ended with a status other than OK.", ("grpc_method", "grpc_code"))
+)
+db_query_duration: Histogram = registry.register(
+    Histogram("db_query_duration_seconds", "Database statement execution time.", ("operation",))
+)
+db_query_errors: Counter = registry.register(
+    Counter("db_query_errors_total", "Database statements that raised.", ("operation",))
+)
+
+
+def db_operation(statement: str) -> str:
+    operation = statement.lstrip()[:6].upper()
+    return operation if operation in DB_OPERATIONS else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    # the execution context lives for one statement, cheaper to reach than conn.info
+    context.metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    db_query_duration.labels(db_operation(statement)).observe(time.perf_counter() - context.metrics_start)
+
+
+def _handle_error(exception_context) -> None:
+    db_query_errors.labels(db_operation(exception_context.statement or "")).inc()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Records the execution time of every statement of `engine`, the sync_engine of an AsyncEngine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def pool_collector(engine: AsyncEngine) -> Callable[[], List[str]]:
+    """Pool size and checkout wait of `engine` as metrics, read from pool_stats on every scrape."""
+
+    def collect() -> List[str]:
+        stats: Dict[str, Any] = pool_stats(engine)
+        wait = stats["checkout_wait"]
+        lines = []
+        for key in ("size", "checked_out", "overflow"):
+            if key in stats:
+                lines += [f"# TYPE db_pool_{key} gauge", f"db_pool_{key} {stats[key]}"]
+        lines += [
+            "# HELP db_pool_checkout_wait_seconds Time to check out a connection from the pool.",
+            "# TYPE db_pool_checkout_wait_seconds histogram",
+        ]
+        lines += [
+            f'db_pool_checkout_wait_seconds_bucket{{le="{_ms_to_seconds(bound)}"}} {total}'
+            for bound, total in wait["buckets_ms"].items()
+        ]
+        lines += [
+            f"db_pool_checkout_wait_seconds_sum {wait['sum_ms'] / 1000}",
+            f"db_pool_checkout_wait_seconds_count {wait['count']}",
+            "# TYPE db_pool_checkout_timeouts_total counter",
+            f"db_pool_checkout_timeouts_total {wait['timeouts']}",
+        ]
+        return lines
+
+    return collect
+
+
+def _ms_to_seconds(bound: str) -> str:
+    return bound if bound == "+Inf" else str(float(bound) / 1000)
@@ -1,49 +1,224 @@
+import random
 import time
 import uuid
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from structlog.contextvars import clear_contextvars
-from aibolit.core.logger import get_logger
+from typing import Optional
+
 import structlog
+from starlette.datastructures import URL, Headers, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from structlog.contextvars import clear_contextvars, get_contextvars
+from aibolit.core.logger import get_logger
+from aibolit.core.metrics import http_request_duration, http_request_errors, http_requests_in_flight
+from aibolit.core.profiling import Profiler
+from aibolit.core.query_stats import finish_query_stats, start_query_stats
+from aibolit.core.tracing import root_span
 
 logger = get_logger(__name__)
 
+HIDDEN_HEADERS = frozenset({"authorization", "cookie"})
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
 
-        trace_id = request.headers.get("X-TRACE-ID", str(uuid.uuid4()))
-        structlog.contextvars.bind_contextvars(trace_id=trace_id)
+class LoggingMiddleware:
+    """
+    Binds the trace id of every HTTP request and logs `sample_rate` of the requests and their responses.
+    Responses with a status of at least `error_status`, unhandled exceptions and requests slower than
+    `slow_request_ms` are logged whether sampled or not. With `query_stats`, the statements run for the request are
+    counted, added to the response log and checked against the query budget.
+    Raw ASGI: no task or body stream per request, headers and URL are built only for logged requests.
+    """
 
-        client_ip = request.client.host if request.client else "unknown"
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = 1.0,
+        slow_request_ms: Optional[float] = None,
+        error_status: int = 500,
+        query_stats: bool = False,
+    ) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_request_s = slow_request_ms / 1000 if slow_request_ms is not None else None
+        self.error_status = error_status
+        self.query_stats = query_stats
 
-        logger.info(
-            "request_received",
-            method=request.method,
-            url=str(request.url),
-            headers={k: v for k, v in request.headers.items() if k.lower() not in {"authorization", "cookie"}},
-            query_params=dict(request.query_params),
-            client_ip=client_ip,
-            timestamp=start_time,
-        )
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.time()
+        trace_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-trace-id":
+                trace_id = value.decode("latin-1")
+                break
+        structlog.contextvars.bind_contextvars(trace_id=trace_id or str(uuid.uuid4()))
 
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+        if sampled:
+            self._log_request(scope, start_time)
+        status_code = 500
+        response_length = "unknown"
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_length
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"content-length":
+                        response_length = value.decode("latin-1")
+                        break
+            await send(message)
+
+        stats = start_query_stats() if self.query_stats else None
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
+            if not sampled:
+                self._log_request(scope, start_time)
             logger.error("unhandled_exception", error=str(e))
-            raise
-        finally:
+            if stats is not None:
+                finish_query_stats(stats, _route_path(scope))
             clear_contextvars()
+            raise
 
+        db_fields = {}
+        if stats is not None:
+            finish_query_stats(stats, _route_path(scope))
+            db_fields = stats.fields()
         process_time = time.time() - start_time
+        if not sampled and (
+            status_code >= self.error_status or (self.slow_request_s is not None and process_time > self.slow_request_s)
+        ):
+            self._log_request(scope, start_time)
+            sampled = True
+        if sampled:
+            logger.info(
+                "response_sent",
+                status_code=status_code,
+                process_time=round(process_time, 4),
+                response_length=response_length,
+                response_timestamp=time.time(),
+                **db_fields,
+            )
+        clear_contextvars()
 
+    @staticmethod
+    def _log_request(scope: Scope, start_time: float) -> None:
+        client = scope.get("client")
         logger.info(
-            "response_sent",
-            status_code=response.status_code,
-            process_time=round(process_time, 4),
-            response_length=response.headers.get("content-length", "unknown"),
-            response_timestamp=time.time(),
+            "request_received",
+            method=scope["method"],
+            url=str(URL(scope=scope)),
+            headers={k: v for k, v in Headers(scope=scope).items() if k not in HIDDEN_HEADERS},
+            query_params=dict(QueryParams(scope["query_string"])),
+            client_ip=client[0] if client else "unknown",
+            timestamp=start_time,
         )
 
-        return response
+
+class MetricsMiddleware:
+    """
+    Records the latency of every HTTP request by method and route template, the requests in flight and the
+    responses with a 4xx or 5xx status. Requests matching no route are recorded under "unmatched".
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_flight = http_requests_in_flight.labels(method)
+        in_flight.inc()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            in_flight.dec()
+            route_path = _route_path(scope)
+            http_request_duration.labels(method, route_path).observe(elapsed)
+            if status_code >= 400:
+                http_request_errors.labels(method, route_path, str(status_code)).inc()
+
+
+class ProfilingMiddleware:
+    """
+    Samples the stacks of the HTTP requests `profiler` wants, saved under the trace id bound by LoggingMiddleware,
+    which must wrap this middleware. Added only when profiling is enabled.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: Profiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = None
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                header = value
+                break
+        if not self.profiler.wanted(header):
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.time()
+        stacks = self.profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            endpoint = f"{scope['method']} {_route_path(scope)}"
+            self.profiler.finish(stacks, get_contextvars().get("trace_id"), endpoint, started_at)
+
+
+class TracingMiddleware:
+    """
+    Runs every HTTP request in the root span of its trace, under the trace id bound by LoggingMiddleware, which must
+    wrap this middleware. The span covers the response serialization that the view spans leave out.
+    Added only with TRACING_ENABLED.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        trace_id = get_contextvars().get("trace_id") or str(uuid.uuid4())
+        with root_span(scope["method"], trace_id, **{"http.method": scope["method"]}) as span:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route_path = _route_path(scope)
+                span.name = f"{scope['method']} {route_path}"
+                span.set_attribute("http.route", route_path)
+                span.set_attribute("http.status_code", status_code)
+
+
+def _route_path(scope: Scope) -> str:
+    # the router sets the matched route in the scope it shares with the middlewares
+    return getattr(scope.get("route"), "path", "unmatched")
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection, QueuePool
+
+from aibolit.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# upper bounds of the checkout wait buckets, in milliseconds; the last bucket is unbounded
+WAIT_BUCKETS_MS: Tuple[float, ...] = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class WaitHistogram:
+    """Histogram of the time it takes to check out a connection from the pool."""
+
+    def __init__(self, buckets_ms: Tuple[float, ...] = WAIT_BUCKETS_MS) -> None:
+        self._buckets_ms = buckets_ms
+        self._counts = [0] * (len(buckets_ms) + 1)
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._timeouts = 0
+
+    def observe(self, wait_ms: float) -> None:
+        self._counts[bisect_left(self._buckets_ms, wait_ms)] += 1
+        self._sum_ms += wait_ms
+        if wait_ms > self._max_ms:
+            self._max_ms = wait_ms
+
+    def observe_timeout(self) -> None:
+        self._timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cumulative bucket counts keyed by upper bound, as in Prometheus histograms."""
+        buckets: Dict[str, int] = {}
+        total = 0
+        for bound, count in zip([*map(str, self._buckets_ms), "+Inf"], self._counts):
+            total += count
+            buckets[bound] = total
+        return {
+            "count": total,
+            "sum_ms": round(self._sum_ms, 3),
+            "max_ms": round(self._max_ms, 3),
+            "timeouts": self._timeouts,
+            "buckets_ms": buckets,
+        }
+
+    def reset(self) -> None:
+        self._counts = [0] * (len(self._buckets_ms) + 1)
+        self._sum_ms = self._max_ms = 0.0
+        self._timeouts = 0
+
+
+checkout_wait = WaitHistogram()
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records checkout waits in `checkout_wait`, the pool used by the app engine."""
+
+    def connect(self) -> PoolProxiedConnection:
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            checkout_wait.observe_timeout()
+            raise
+        checkout_wait.observe((time.perf_counter() - start) * 1000)
+        return connection
+
+
+def pool_stats(engine: AsyncEngine) -> Dict[str, Any]:
+    """Current state of the engine pool and the checkout wait histogram."""
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            # SQLAlchemy counts the not yet opened connections of `size` as negative overflow
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    stats["checkout_wait"] = checkout_wait.snapshot()
+    return stats
+
+
+class PoolStatsReporter:
+    """Logs pool_stats of an engine every `interval` seconds while running."""
+
+    def __init__(self, engine: AsyncEngine, interval: float) -> None:
+        self._engine = engine
+        self._interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            stats = pool_stats(self._engine)
+            wait = stats.pop("checkout_wait")
+            logger.info("Connection pool stats", **stats, **_wait_summary(wait))
+
+
+def _wait_summary(wait: Dict[str, Any]) -> Dict[str, Any]:
+    """Checkout wait fields for a log line: totals and the non-empty buckets only."""
+    previous = 0
+    buckets: List[str] = []
+    for bound, total in wait["buckets_ms"].items():
+        if total > previous:
+            buckets.append(f"<={bound}ms:{total - previous}")
+        previous = total
+    return {
+        "checkouts": wait["count"],
+        "checkout_wait_sum_ms": wait["sum_ms"],
+        "checkout_wait_max_ms": wait["max_ms"],
+        "checkout_timeouts": wait["timeouts"],
+        "checkout_wait_buckets": " ".join(buckets),
+    }
@@ -0,0 +1,202 @@
+import asyncio
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from types import FrameType
+from typing import Deque, Dict, List, NamedTuple, Optional, Set
+
+from aibolit.core.config import Settings, settings
+from aibolit.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+WAITING = "(waiting)"
+_UNSAFE_ID_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class ProfileInfo(NamedTuple):
+    trace_id: str
+    endpoint: str
+    started_at: float
+    duration_ms: float
+    samples: int
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})"
+
+
+def _awaited_frames(task: asyncio.Task) -> List[FrameType]:
+    """Frames of the coroutines a suspended task awaits, outermost first."""
+    frames = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "ag_frame", None)
+        if frame is None:
+            frame = getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        awaitable = (
+            getattr(awaitable, "cr_await", None)
+            or getattr(awaitable, "ag_await", None)
+            or getattr(awaitable, "gi_yieldfrom", None)
+        )
+    return frames
+
+
+class StackSampler:
+    """
+    Samples the stacks of the profiled tasks from a thread every `interval_s`, while any task is profiled: the frames
+    of the event loop thread from the task's coroutine inwards when it runs, the coroutines it awaits ending with
+    "(waiting)" when it is suspended. Counts are kept per stack, as the folded stacks of flamegraph tools.
+    """
+
+    def __init__(self, interval_s: float) -> None:
+        self._interval_s = interval_s
+        self._tasks: Dict[asyncio.Task, Counter] = {}
+        self._thread_ids: Dict[asyncio.Task, int] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, task: asyncio.Task) -> Counter:
+        stacks: Counter = Counter()
+        with self._lock:
+            self._tasks[task] = stacks
+            self._thread_ids[task] = threading.get_ident()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+        return stacks
+
+    def stop(self, task: asyncio.Task) -> None:
+        with self._lock:
+            self._tasks.pop(task, None)
+            self._thread_ids.pop(task, None)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self._interval_s)
+            with self._lock:
+                if not self._tasks:
+                    self._thread = None
+                    return
+                tasks = [(task, stacks, self._thread_ids[task]) for task, stacks in self._tasks.items()]
+            current_frames = sys._current_frames()
+            samples = [
+                (task, stacks, self._stack(task, current_frames.get(thread_id))) for task, stacks, thread_id in tasks
+            ]
+            with self._lock:
+                # tasks stopped meanwhile keep their stacks as they were
+                for task, stacks, stack in samples:
+                    if task in self._tasks:
+                        stacks[stack] += 1
+
+    @staticmethod
+    def _stack(task: asyncio.Task, thread_frame: Optional[FrameType]) -> str:
+        coro_frame = getattr(task.get_coro(), "cr_frame", None)
+        running: List[FrameType] = []
+        frame = thread_frame
+        while frame is not None:
+            running.append(frame)
+            if frame is coro_frame:
+                return ";".join(_frame_label(frame) for frame in reversed(running))
+            frame = frame.f_back
+        return ";".join([*map(_frame_label, _awaited_frames(task)), WAITING])
+
+
+class Profiler:
+    """
+    Profiles single requests and calls: the ones carrying `token` in their x-profile header or metadata and
+    `sample_rate` of the others. The stacks of the last `keep` profiles are written to `directory` as
+    <trace id>.folded files, the folded stack format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(
+        self, directory: Path, token: str = "", sample_rate: float = 0, interval_ms: float = 1, keep: int = 100
+    ) -> None:
+        self.directory = directory
+        self.enabled = bool(token) or sample_rate > 0
+        self._token = token.encode()
+        self._sample_rate = sample_rate
+        self._sampler = StackSampler(interval_ms / 1000)
+        self._recent: Deque[ProfileInfo] = deque()
+        self._keep = keep
+        self._tasks: Set[asyncio.Task] = set()
+
+    def authorized(self, token: Optional[bytes]) -> bool:
+        """Whether `token` is PROFILE_TOKEN, never when it is not set."""
+        return token is not None and bool(self._token) and hmac.compare_digest(token, self._token)
+
+    def wanted(self, header: Optional[bytes]) -> bool:
+        if self.authorized(header):
+            return True
+        return self._sample_rate > 0 and random.random() < self._sample_rate
+
+    def start(self) -> Counter:
+        """Starts sampling the current task, the returned counter fills in until `finish`."""
+        return self._sampler.start(asyncio.current_task())
+
+    def finish(self, stacks: Counter, trace_id: Optional[str], endpoint: str, started_at: float) -> None:
+        """Stops sampling the current task and saves its stacks in the background."""
+        self._sampler.stop(asyncio.current_task())
+        info = ProfileInfo(
+            trace_id=_UNSAFE_ID_CHARS.sub("_", trace_id or "")[:64] or f"untraced-{time.time_ns()}",
+            endpoint=endpoint,
+            started_at=started_at,
+            duration_ms=round((time.time() - started_at) * 1000, 3),
+            samples=sum(stacks.values()),
+        )
+        task = asyncio.create_task(self._save(info, stacks))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _save(self, info: ProfileInfo, stacks: Counter) -> None:
+        folded = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        self._recent = deque((profile for profile in self._recent if profile.trace_id != info.trace_id))
+        self._recent.append(info)
+        dropped = self._recent.popleft() if len(self._recent) > self._keep else None
+        try:
+            await asyncio.to_thread(self._write, info.trace_id, folded, dropped)
+        except OSError as e:
+            logger.warning("profile_not_saved", trace_id=info.trace_id, error=str(e))
+            return
+        logger.info("profile_saved", **info._asdict())
+
+    def _write(self, trace_id: str, folded: str, dropped: Optional[ProfileInfo]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        (self.directory / f"{trace_id}.folded").write_text(folded, encoding="utf-8")
+        if dropped is not None:
+            (self.directory / f"{dropped.trace_id}.folded").unlink(missing_ok=True)
+
+    def recent(self) -> List[ProfileInfo]:
+        """The saved profiles, newest first."""
+        return list(reversed(self._recent))
+
+    def read(self, trace_id: str) -> Optional[str]:
+        if not any(profile.trace_id == trace_id for profile in self._recent):
+            return None
+        try:
+            return (self.directory / f"{trace_id}.folded").read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+
+def make_profiler(config: Settings = settings) -> Profiler:
+    return Profiler(
+        config.LOGS_DIR / "profiles",
+        token=config.PROFILE_TOKEN,
+        sample_rate=config.PROFILE_SAMPLE_RATE,
+        interval_ms=config.PROFILE_INTERVAL_MS,
+        keep=config.PROFILE_KEEP,
+    )
+
+
+profiler = make_profiler()
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from structlog.contextvars import get_contextvars
+
+from aibolit.core.config import Settings, settings
+from aibolit.core.logger import get_logger
+
+logger = get_logger(__name__)
+# EXPLAIN plans go to their own file, out of the app log
+slow_query_log = logging.getLogger("aibolit.slow_queries")
+
+# statements whose last explain is remembered for the cooldown, the oldest ones are forgotten first
+EXPLAINED_STATEMENTS_MAX = 1000
+# ANALYZE of a locking SELECT would take its row locks again
+_LOCKING_CLAUSE = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE|KEY\s+SHARE)\b", re.IGNORECASE)
+
+
+class QueryStats:
+    """Statements run while serving one request or call, and the time spent in them."""
+
+    __slots__ = ("queries", "duration", "statements")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.duration = 0.0
+        self.statements: Dict[str, int] = {}
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.duration += elapsed
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def most_repeated(self) -> Tuple[str, int]:
+        if not self.statements:
+            return "", 0
+        return max(self.statements.items(), key=lambda item: item[1])
+
+    def fields(self) -> Dict[str, Any]:
+        return {"db_queries": self.queries, "db_time_ms": round(self.duration * 1000, 3)}
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_query_stats() -> QueryStats:
+    """Counts the statements of the current task and the tasks it starts from now on."""
+    stats = QueryStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def finish_query_stats(stats: QueryStats, endpoint: str, config: Settings = settings) -> None:
+    """
+    Stops counting and warns when the request or call ran more than SQL_QUERY_BUDGET statements, or one statement
+    SQL_REPEATED_STATEMENT_LIMIT times or more, as loading rows one by one (N+1) does.
+    """
+    _current_stats.set(None)
+    if config.SQL_QUERY_BUDGET and stats.queries > config.SQL_QUERY_BUDGET:
+        logger.warning("query_budget_exceeded", endpoint=endpoint, budget=config.SQL_QUERY_BUDGET, **stats.fields())
+    statement, repeats = stats.most_repeated()
+    if config.SQL_REPEATED_STATEMENT_LIMIT and repeats >= config.SQL_REPEATED_STATEMENT_LIMIT:
+        logger.warning("repeated_statement", endpoint=endpoint, repeats=repeats, statement=statement[:500])
+
+
+class QueryTracker:
+    """
+    Engine listeners counting statements into the QueryStats of the current request or call. Statements slower than
+    `slow_query_ms` get their EXPLAIN (ANALYZE, BUFFERS) plan captured in the background and written to
+    slow_query_log, at most once per `explain_cooldown_s` for the same statement. Only SELECTs without FOR UPDATE
+    or FOR SHARE are explained, ANALYZE runs the statement again.
+    """
+
+    def __init__(self, engine: AsyncEngine, slow_query_ms: float = 0, explain_cooldown_s: float = 300) -> None:
+        self._engine = engine
+        self._slow_query_s = slow_query_ms / 1000
+        self._explain_cooldown_s = explain_cooldown_s
+        self._explained_at: Dict[str, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def install(self) -> None:
+        if self._slow_query_s:
+            # here rather than on the first plan, which is written from a worker thread
+            configure_slow_query_log()
+        event.listen(self._engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(self._engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        context.query_stats_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = time.perf_counter() - context.query_stats_start
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+        if self._slow_query_s and elapsed >= self._slow_query_s:
+            self._slow_query(statement, parameters, elapsed)
+
+    def _slow_query(self, statement: str, parameters: Any, elapsed: float) -> None:
+        if statement.startswith("EXPLAIN"):
+            return
+        duration_ms = round(elapsed * 1000, 3)
+        logger.warning("slow_query", duration_ms=duration_ms, statement=statement[:500])
+        if statement.lstrip()[:6].upper() != "SELECT" or _LOCKING_CLAUSE.search(statement):
+            return
+        now = time.monotonic()
+        explained_at = self._explained_at.get(statement)
+        if explained_at is not None and now - explained_at < self._explain_cooldown_s:
+            return
+        self._remember_explained(statement, now)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.explain(statement, parameters, duration_ms, get_contextvars().get("trace_id")))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _remember_explained(self, statement: str, now: float) -> None:
+        # kept in the order of the explains, so the expired ones and the oldest are first
+        self._explained_at.pop(statement, None)
+        self._explained_at[statement] = now
+        while self._explained_at:
+            oldest, explained_at = next(iter(self._explained_at.items()))
+            if now - explained_at < self._explain_cooldown_s and len(self._explained_at) <= EXPLAINED_STATEMENTS_MAX:
+                break
+            del self._explained_at[oldest]
+
+    async def explain(self, statement: str, parameters: Any, duration_ms: float, trace_id: Optional[str]) -> None:
+        # the plan statements are not the request's own
+        _current_stats.set(None)
+        try:
+            async with self._engine.connect() as connection:
+                # the transaction is rolled back when the connection is closed
+                result = await connection.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+                plan = [row[0] for row in result]
+        except SQLAlchemyError as e:
+            logger.warning("slow_query_explain_failed", error=str(e))
+            return
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "trace_id": trace_id,
+            "duration_ms": duration_ms,
+            "statement": statement,
+            "plan": plan,
+        }
+        await asyncio.to_thread(slow_query_log.info, json.dumps(record, ensure_ascii=False))
+
+
+def configure_slow_query_log(config: Settings = settings) -> None:
+    """Writes slow_query_log to LOGS_DIR/slow_queries.log, once per process."""
+    if slow_query_log.handlers:
+        return
+    os.makedirs(config.LOGS_DIR, exist_ok=True)
+    handler = RotatingFileHandler(
+        config.LOGS_DIR / "slow_queries.log",
+        mode="a",
+        encoding="utf-8",
+        backupCount=5,
+        maxBytes=10 * 1024 * 1024,  # 10 MB
+    )
+    slow_query_log.addHandler(handler)
+    slow_query_log.setLevel(logging.INFO)
+    slow_query_log.propagate = False
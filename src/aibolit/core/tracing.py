@@ -0,0 +1,329 @@
+import atexit
+import functools
+import hashlib
+import inspect
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+
+from aibolit.core.config import Settings, settings
+from aibolit.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+FuncT = TypeVar("FuncT", bound=Callable[..., Any])
+_HEX_TRACE_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class Span:
+    """A timed operation of a trace, nested in the span current when it started."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[int], attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class SpanScope:
+    """
+    Context manager of a span: started and made current on enter, ended and exported on exit, with the exception
+    that ended it if any. Outside of a trace, spans other than roots are not recorded.
+    """
+
+    __slots__ = ("_name", "_attributes", "_root", "_trace_id", "_current", "_token", "span")
+
+    def __init__(
+        self, name: str, attributes: Dict[str, Any], root: bool = False, trace_id: str = "", current: bool = True
+    ) -> None:
+        self._name = name
+        self._attributes = attributes
+        self._root = root
+        self._trace_id = trace_id
+        self._current = current
+        self._token: Optional[Token] = None
+        self.span: Optional[Span] = None
+
+    def __enter__(self) -> Optional[Span]:
+        parent = None if self._root else _current_span.get()
+        if parent is None and not self._root:
+            return None
+        if parent is None:
+            self.span = Span(self._name, self._trace_id, None, self._attributes)
+        else:
+            self.span = Span(self._name, parent.trace_id, parent.span_id, self._attributes)
+        if self._current:
+            self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        span = self.span
+        if span is None:
+            return
+        span.end_ns = time.time_ns()
+        if exc_type is not None:
+            span.error = f"{exc_type.__name__}: {exc}"
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                # ended in another context, as a stream closed by the server
+                pass
+        if _processor is not None:
+            _processor.on_end(span)
+
+
+class _DisabledScope:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_DISABLED = _DisabledScope()
+
+
+def span(name: str, **attributes: Any) -> Any:
+    """A span of the current trace, e.g. `with span("render", rows=len(rows)):`, a no-op without TRACING_ENABLED."""
+    if not settings.TRACING_ENABLED:
+        return _DISABLED
+    return SpanScope(name, attributes)
+
+
+def root_span(name: str, trace_id: str, **attributes: Any) -> SpanScope:
+    """The span of a whole request or call, starting the trace `trace_id`."""
+    return SpanScope(name, attributes, root=True, trace_id=trace_id)
+
+
+def traced(name: Optional[str] = None) -> Callable[[FuncT], FuncT]:
+    """
+    Runs every call of the decorated function, coroutine function or async generator function in a span named
+    `name`, its qualified name by default. Without TRACING_ENABLED the function is left as it is.
+    Async generators are timed until exhausted but do not parent the spans of their consumer.
+    """
+
+    def decorator(func: FuncT) -> FuncT:
+        if not settings.TRACING_ENABLED:
+            return func
+        span_name = name or func.__qualname__
+
+        if inspect.isasyncgenfunction(func):
+
+            @functools.wraps(func)
+            async def generator_wrapper(*args, **kwargs):
+                with SpanScope(span_name, {}, current=False):
+                    async for item in func(*args, **kwargs):
+                        yield item
+
+            return generator_wrapper  # type: ignore[return-value]
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def coroutine_wrapper(*args, **kwargs):
+                with SpanScope(span_name, {}):
+                    return await func(*args, **kwargs)
+
+            return coroutine_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with SpanScope(span_name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+class SpanExporter(ABC):
+    """Sends batches of ended spans somewhere, called from the exporting thread."""
+
+    @abstractmethod
+    def export(self, spans: Sequence[Span]) -> None:
+        """Sends one batch of spans, in the order they ended."""
+
+    def shutdown(self) -> None:  # noqa: B027 (an optional hook, not abstract)
+        """Optional hook releasing what the exporter holds, called once after the last export."""
+
+
+def otlp_trace_id(trace_id: str) -> str:
+    """The 32 hex digits OTLP expects: the trace id itself for UUIDs and hex ids, a hash of it otherwise."""
+    compact = trace_id.replace("-", "").lower()
+    if _HEX_TRACE_ID.fullmatch(compact):
+        return compact
+    return hashlib.blake2b(trace_id.encode(), digest_size=16).hexdigest()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_json(spans: Sequence[Span], service_name: str) -> Dict[str, Any]:
+    """An OTLP/JSON ExportTraceServiceRequest of `spans`."""
+    otlp_spans = []
+    for span in spans:
+        attributes = [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()]
+        attributes.append({"key": "aibolit.trace_id", "value": {"stringValue": span.trace_id}})
+        otlp_span: Dict[str, Any] = {
+            "traceId": otlp_trace_id(span.trace_id),
+            "spanId": f"{span.span_id:016x}",
+            "name": span.name,
+            "kind": 2 if span.parent_id is None else 1,  # SERVER for roots, INTERNAL otherwise
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": attributes,
+            "status": {"code": 2, "message": span.error} if span.error else {},
+        }
+        if span.parent_id is not None:
+            otlp_span["parentSpanId"] = f"{span.parent_id:016x}"
+        otlp_spans.append(otlp_span)
+    resource = {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]}
+    return {
+        "resourceSpans": [{"resource": resource, "scopeSpans": [{"scope": {"name": "aibolit"}, "spans": otlp_spans}]}]
+    }
+
+
+class OtlpJsonFileExporter(SpanExporter):
+    """
+    Appends every batch to `path` as one OTLP/JSON line, the format of the OpenTelemetry Collector file exporter,
+    which its otlpjsonfile receiver reads back.
+    """
+
+    def __init__(self, path: Path, service_name: str = "aibolit") -> None:
+        self._path = path
+        self._service_name = service_name
+        self._file = None
+
+    def export(self, spans: Sequence[Span]) -> None:
+        if self._file is None:
+            os.makedirs(self._path.parent, exist_ok=True)
+            # kept open across batches and closed by shutdown
+            self._file = open(self._path, "a", encoding="utf-8")  # noqa: SIM115
+        self._file.write(json.dumps(otlp_json(spans, self._service_name), ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def shutdown(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class BatchSpanProcessor:
+    """
+    Queues ended spans for a thread that exports them in batches of `batch_size`, or whatever is queued every
+    `interval_s`. Spans ended while `max_queue_size` are queued are dropped and counted.
+    """
+
+    def __init__(
+        self, exporter: SpanExporter, max_queue_size: int = 10_000, batch_size: int = 512, interval_s: float = 5
+    ) -> None:
+        self._exporter = exporter
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._batch_size = batch_size
+        self._interval_s = interval_s
+        self.dropped = 0
+        # spans are dropped on request threads and the count is reported by the exporting one
+        self._dropped_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _run(self) -> None:
+        batch: List[Span] = []
+        deadline = time.monotonic() + self._interval_s
+        while True:
+            try:
+                span = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                span = None
+            stop = span is _STOP
+            if span is not None and not stop:
+                batch.append(span)
+            if batch and (stop or len(batch) >= self._batch_size or time.monotonic() >= deadline):
+                self._export(batch)
+                batch = []
+            if stop:
+                return
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self._interval_s
+
+    def _export(self, batch: List[Span]) -> None:
+        try:
+            self._exporter.export(batch)
+        except Exception as e:
+            logger.warning("spans_not_exported", spans=len(batch), error=str(e))
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            logger.warning("spans_dropped", spans=dropped)
+
+    def shutdown(self) -> None:
+        """Exports the queued spans and stops the thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._exporter.shutdown()
+
+
+_STOP: Any = object()
+_processor: Optional[BatchSpanProcessor] = None
+
+
+def configure_tracing(exporter: Optional[SpanExporter] = None, config: Settings = settings) -> None:
+    """
+    Exports the spans of this process with `exporter`, by default as OTLP/JSON to TRACING_EXPORT_PATH, once per
+    process. Does nothing without TRACING_ENABLED.
+    """
+    global _processor
+    if not config.TRACING_ENABLED or _processor is not None:
+        return
+    _processor = BatchSpanProcessor(
+        exporter or OtlpJsonFileExporter(config.TRACING_EXPORT_PATH or config.LOGS_DIR / "spans.jsonl"),
+        max_queue_size=config.TRACING_QUEUE_SIZE,
+        batch_size=config.TRACING_BATCH_SIZE,
+        interval_s=config.TRACING_EXPORT_INTERVAL_S,
+    )
+    atexit.register(shutdown_tracing)
+
+
+def shutdown_tracing() -> None:
+    global _processor
+    if _processor is None:
+        return
+    processor, _processor = _processor, None
+    processor.shutdown()
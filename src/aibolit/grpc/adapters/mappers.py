@@ -0,0 +1,53 @@
+from datetime import date
+from typing import Optional
+
+from google.protobuf.timestamp_pb2 import Timestamp
+
+from aibolit.grpc.generated import schedules_pb2
+from aibolit.models.schedules import MedicationScheduleOrm
+from aibolit.services.daily_plans import DailyPlan, PlanMinutes, daily_plans
+from aibolit.services.next_takings import NextTakings
+
+_SECONDS_PER_DAY = 24 * 60 * 60
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def date_to_timestamp(value: Optional[date]) -> Optional[Timestamp]:
+    """Midnight UTC of `value`, as Timestamp.FromDatetime stores a naive datetime, without building one."""
+    if value is None:
+        return None
+    return Timestamp(seconds=(value.toordinal() - _EPOCH_ORDINAL) * _SECONDS_PER_DAY)
+
+
+def schedule_to_proto(
+    db_schedule: MedicationScheduleOrm, daily_plan: DailyPlan = (), daily_plan_minutes: PlanMinutes = ()
+) -> schedules_pb2.MedicationSchedule:
+    """MedicationSchedule message straight from a schedule row and its precomputed daily plan in either form."""
+    return schedules_pb2.MedicationSchedule(
+        id=db_schedule.id,
+        medication_name=db_schedule.medication_name,
+        frequency=db_schedule.frequency,
+        duration_days=db_schedule.duration_days,
+        start_date=date_to_timestamp(db_schedule.start_date),
+        end_date=date_to_timestamp(db_schedule.end_date),
+        user_id=db_schedule.user_id,
+        daily_plan=daily_plan,
+        daily_plan_minutes=daily_plan_minutes,
+    )
+
+
+def next_takings_to_proto(
+    user_id: int, next_takings: NextTakings, compact: bool = False
+) -> schedules_pb2.GetUserNextTakingsResponse:
+    """GetUserNextTakingsResponse with intake times as "HH:MM" strings, or as minutes of day if `compact`."""
+    response = schedules_pb2.GetUserNextTakingsResponse(user_id=user_id)
+    # add() fills the items in place, building them first and copying them in costs a quarter more
+    add = response.next_takings.add
+    if compact:
+        minutes_of = daily_plans.minutes_of
+        for schedule_id, schedule_name, schedule_times in next_takings:
+            add(schedule_id=schedule_id, schedule_name=schedule_name, schedule_minutes=minutes_of(schedule_times))
+    else:
+        for schedule_id, schedule_name, schedule_times in next_takings:
+            add(schedule_id=schedule_id, schedule_name=schedule_name, schedule_times=schedule_times)
+    return response
@@ -1,80 +1,153 @@
-from datetime import date, datetime, time
-from google.protobuf.timestamp_pb2 import Timestamp
+from datetime import date
+from typing import AsyncIterator, List
 import grpc
+from pydantic import ValidationError
+from aibolit.core.config import settings
+from aibolit.core.dependencies import ServiceScope, schedule_service_scope
+from aibolit.core.tracing import traced
+from aibolit.grpc.adapters.mappers import next_takings_to_proto, schedule_to_proto
 from aibolit.grpc.generated.schedules_pb2_grpc import SchedulesServiceServicer
 from aibolit.grpc.generated import schedules_pb2
-from aibolit.services.users import UserService
+from aibolit.services.daily_plans import daily_plans
+from aibolit.services.next_takings_hub import NextTakingsHub, SubscribedSchedule, next_takings_hub
 from aibolit.services.schedules import ScheduleService
-from aibolit.core.exceptions import ScheduleExpiredError, ScheduleNotFoundError, ScheduleNotStartedError
-from aibolit.schemas.schedules import MedicationScheduleCreateRequest, MedicationSchedule
+from aibolit.core.exceptions import (
+    ScheduleBatchUserError,
+    ScheduleExpiredError,
+    ScheduleNotFoundError,
+    ScheduleNotStartedError,
+    UserNotFoundError,
+)
+
+# from aibolit.schemas.schedules import MedicationScheduleCreateRequest
+from aibolit.schemas.openapi_generated import MedicationScheduleCreateRequest
 from aibolit.core.logger import get_logger
 
 logger = get_logger(__name__)
+hot_logger = get_logger(__name__, hot=True)
 
 
 class GrpcScheduleService(SchedulesServiceServicer):
-    def __init__(self, schedules_service: ScheduleService, users_service: UserService) -> None:
-        self._schedules_service = schedules_service
-        self._users_service = users_service
+    """Every call gets a ScheduleService on its own pooled session, closed when the call ends."""
+
+    def __init__(
+        self,
+        schedules_service_scope: ServiceScope[ScheduleService] = schedule_service_scope,
+        next_takings: NextTakingsHub = next_takings_hub,
+    ) -> None:
+        self._schedules_service_scope = schedules_service_scope
+        self._next_takings = next_takings
 
+    @traced()
     async def CreateSchedule(self, request, context: grpc.aio.ServicerContext):
         logger.info("gRPC CreateSchedule called", user_id=request.user_id, medication_name=request.medication_name)
-        start_date = request.start_date.ToDatetime().date() if len(str(request.start_date)) else date.today()
-        schedule_data = MedicationScheduleCreateRequest(
-            medication_name=request.medication_name,
-            frequency=request.frequency,
-            duration_days=request.duration_days or None,
-            start_date=start_date,
-            user_id=request.user_id,
-        )
-        user_exists = await self._users_service.get_user_by_id(user_id=schedule_data.user_id)
-        if not user_exists:
-            logger.warning("User not found", user_id=schedule_data.user_id)
-            await context.abort(grpc.StatusCode.NOT_FOUND, f"User with id={schedule_data.user_id} not found")
-        schedule_id = await self._schedules_service.create_schedule(schedule_data)
+        schedule_data = self._to_create_request(request)
+        async with self._schedules_service_scope() as schedules_service:
+            try:
+                schedule_id = await schedules_service.create_schedule(schedule_data)
+            except UserNotFoundError as e:
+                await context.abort(grpc.StatusCode.NOT_FOUND, str(e))
         return schedules_pb2.CreateScheduleResponse(schedule_id=schedule_id.schedule_id)
 
+    @traced()
+    async def CreateSchedules(
+        self, request_iterator: AsyncIterator[schedules_pb2.CreateScheduleRequest], context: grpc.aio.ServicerContext
+    ):
+        logger.info("gRPC CreateSchedules called")
+        schedules: List[MedicationScheduleCreateRequest] = []
+        errors: List[str] = []
+        count = 0
+        async for request in request_iterator:
+            if count == settings.SCHEDULES_BATCH_MAX_SIZE:
+                await context.abort(
+                    grpc.StatusCode.INVALID_ARGUMENT,
+                    f"A batch holds at most {settings.SCHEDULES_BATCH_MAX_SIZE} schedules",
+                )
+            try:
+                schedules.append(self._to_create_request(request))
+            except ValidationError as e:
+                errors.extend(
+                    f"schedules[{count}].{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()
+                )
+            count += 1
+        if not count:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "A batch holds at least 1 schedule")
+        if errors:
+            logger.warning("Invalid schedules batch", errors=len(errors))
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "; ".join(errors))
+        # the session is opened only once the whole stream is read
+        async with self._schedules_service_scope() as schedules_service:
+            try:
+                created = await schedules_service.create_schedules(schedules)
+            except ScheduleBatchUserError as e:
+                await context.abort(
+                    grpc.StatusCode.INVALID_ARGUMENT,
+                    "; ".join(f"schedules[{index}].user_id: {e}" for index in e.indexes),
+                )
+            except UserNotFoundError as e:
+                await context.abort(grpc.StatusCode.NOT_FOUND, str(e))
+        return schedules_pb2.CreateSchedulesResponse(user_id=created.user_id, schedule_ids=created.schedule_ids)
+
+    @traced()
     async def GetAllSchedules(self, request, context: grpc.aio.ServicerContext):
-        logger.info("gRPC GetAllSchedules called", user_id=request.user_id)
-        schedules = await self._schedules_service.get_all_user_schedules(request.user_id)
+        hot_logger.info("gRPC GetAllSchedules called", user_id=request.user_id)
+        async with self._schedules_service_scope() as schedules_service:
+            schedules = await schedules_service.get_all_user_schedules(request.user_id)
         return schedules_pb2.GetAllSchedulesResponse(user_id=schedules.user_id, schedules=schedules.schedules)
 
+    @traced()
     async def GetUserSchedule(self, request, context: grpc.aio.ServicerContext):
-        logger.info("gRPC GetUserSchedule called", user_id=request.user_id, schedule_id=request.schedule_id)
-
-        try:
-            schedule = await self._schedules_service.get_user_schedule(
-                schedule_id=request.schedule_id, user_id=request.user_id
-            )
-        except ScheduleNotFoundError as e:
-            logger.warning("Schedule not found", user_id=request.user_id, schedule_id=request.schedule_id)
-            await context.abort(grpc.StatusCode.NOT_FOUND, str(e))
-
-        except ScheduleExpiredError as e:
-            logger.info("Schedule expired", user_id=request.user_id, schedule_id=request.schedule_id)
-            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
-
-        except ScheduleNotStartedError as e:
-            logger.info("Schedule hasn't started yet", user_id=request.user_id, schedule_ind=request.schedule_id)
-            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
-
-        schedule_dict = MedicationSchedule(**schedule.model_dump(mode="python")).model_dump(mode="python")
-        start_date, end_date = schedule_dict.pop("start_date"), schedule_dict.pop("end_date")
-        return schedules_pb2.MedicationSchedule(
-            **schedule_dict, start_date=self._to_timestamp(start_date), end_date=self._to_timestamp(end_date)
-        )
+        hot_logger.info("gRPC GetUserSchedule called", user_id=request.user_id, schedule_id=request.schedule_id)
+
+        async with self._schedules_service_scope() as schedules_service:
+            try:
+                db_schedule = await schedules_service.get_user_schedule_row(
+                    schedule_id=request.schedule_id, user_id=request.user_id
+                )
+            except ScheduleNotFoundError as e:
+                logger.warning("Schedule not found", user_id=request.user_id, schedule_id=request.schedule_id)
+                await context.abort(grpc.StatusCode.NOT_FOUND, str(e))
 
+            except ScheduleExpiredError as e:
+                logger.info("Schedule expired", user_id=request.user_id, schedule_id=request.schedule_id)
+                await context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
+
+            except ScheduleNotStartedError as e:
+                logger.info("Schedule hasn't started yet", user_id=request.user_id, schedule_ind=request.schedule_id)
+                await context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
+
+        if request.compact:
+            return schedule_to_proto(db_schedule, daily_plan_minutes=daily_plans.minutes(db_schedule.frequency))
+        return schedule_to_proto(db_schedule, daily_plans.get(db_schedule.frequency))
+
+    @traced()
     async def GetUserNextTakings(self, request, context: grpc.aio.ServicerContext):
-        logger.info("gRPC GetUserNextTakings called", user_id=request.user_id)
-        schedules = await self._schedules_service.get_user_next_takings(request.user_id)
-        next_takings = [
-            schedules_pb2.NextTakingsMedications(**next_taking.model_dump(mode='python'))
-            for next_taking in schedules.next_takings
-        ]
-        return schedules_pb2.GetUserNextTakingsResponse(user_id=request.user_id, next_takings=next_takings)
+        hot_logger.info("gRPC GetUserNextTakings called", user_id=request.user_id)
+        async with self._schedules_service_scope() as schedules_service:
+            next_takings = await schedules_service.get_user_next_taking_rows(request.user_id)
+        return next_takings_to_proto(request.user_id, next_takings, request.compact)
+
+    @traced()
+    async def SubscribeNextTakings(self, request, context: grpc.aio.ServicerContext):
+        """Current next takings of the user, then every change of them until the client cancels."""
+        logger.info("gRPC SubscribeNextTakings called", user_id=request.user_id)
+        async with self._next_takings.subscribe(request.user_id, self._load_subscribed_schedules) as subscription:
+            # a write waits for the client to read, updates meanwhile replace each other in the subscription
+            async for next_takings in subscription:
+                yield next_takings_to_proto(request.user_id, next_takings, request.compact)
+
+    async def _load_subscribed_schedules(self, user_id: int) -> List[SubscribedSchedule]:
+        # the session is held only while the schedules load, not for the life of the stream
+        async with self._schedules_service_scope() as schedules_service:
+            return await schedules_service.get_subscribed_schedules(user_id)
 
     @staticmethod
-    def _to_timestamp(dt: date) -> Timestamp:
-        ts = Timestamp()
-        ts.FromDatetime(datetime.combine(dt, time.min))
-        return ts
+    def _to_create_request(request: schedules_pb2.CreateScheduleRequest) -> MedicationScheduleCreateRequest:
+        start_date = request.start_date.ToDatetime().date() if len(str(request.start_date)) else date.today()
+        return MedicationScheduleCreateRequest(
+            medication_name=request.medication_name,
+            frequency=request.frequency,
+            duration_days=request.duration_days or None,
+            start_date=start_date,
+            user_id=request.user_id,
+        )
@@ -1,15 +1,61 @@
+from typing import Sequence
+
 import grpc
 from aibolit.grpc.generated.users_pb2_grpc import UserServiceServicer
 
+from aibolit.core.config import settings
+from aibolit.core.dependencies import ServiceScope, user_service_scope
 from aibolit.grpc.generated import users_pb2
 from aibolit.services.users import UserService
 from aibolit.schemas.users import UserCreateRequest
+from aibolit.core.logger import get_logger
+from aibolit.core.tracing import traced
+
+logger = get_logger(__name__)
+hot_logger = get_logger(__name__, hot=True)
 
 
 class GrpcUserService(UserServiceServicer):
-    def __init__(self, users_service: UserService):
-        self._users_service = users_service
+    """Every call gets a UserService on its own pooled session, closed when the call ends."""
 
+    def __init__(self, users_service_scope: ServiceScope[UserService] = user_service_scope):
+        self._users_service_scope = users_service_scope
+
+    @traced()
     async def CreateUser(self, request, context: grpc.aio.ServicerContext):
-        db_user = await self._users_service.create_user(UserCreateRequest())
+        async with self._users_service_scope() as users_service:
+            db_user = await users_service.create_user(UserCreateRequest())
         return users_pb2.CreateUserResponse(id=db_user)
+
+    @traced()
+    async def GetUsers(self, request, context: grpc.aio.ServicerContext):
+        """One keyset page of users, see GetAllUsersRequest."""
+        hot_logger.info("gRPC GetUsers called", after_id=request.after_id, page_size=request.page_size)
+        page_size = await self._page_size(request, context)
+        async with self._users_service_scope() as users_service:
+            user_ids = await users_service.get_user_ids(request.after_id, page_size)
+        # a full page may be followed by more users, the page after the last one is empty
+        next_after_id = user_ids[-1] if len(user_ids) == page_size else 0
+        return self._to_response(user_ids, next_after_id)
+
+    @traced()
+    async def StreamUsers(self, request, context: grpc.aio.ServicerContext):
+        """All users after `after_id` in id order, page_size per message, read through one server-side cursor."""
+        logger.info("gRPC StreamUsers called", after_id=request.after_id, page_size=request.page_size)
+        page_size = await self._page_size(request, context)
+        async with self._users_service_scope() as users_service:
+            async for user_ids in users_service.stream_user_ids(request.after_id, page_size):
+                yield self._to_response(user_ids, user_ids[-1])
+
+    @staticmethod
+    async def _page_size(request, context: grpc.aio.ServicerContext) -> int:
+        """The requested page size, the default one if unset and at most USERS_PAGE_MAX_SIZE."""
+        if request.page_size < 0:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "page_size must not be negative")
+        return min(request.page_size or settings.USERS_PAGE_SIZE, settings.USERS_PAGE_MAX_SIZE)
+
+    @staticmethod
+    def _to_response(user_ids: Sequence[int], next_after_id: int) -> users_pb2.GetAllUsersResponse:
+        return users_pb2.GetAllUsersResponse(
+            users=[users_pb2.User(id=user_id) for user_id in user_ids], next_after_id=next_after_id
+        )
@@ -25,7 +25,7 @@ _sym_db = _symbol_database.Default()
 from google.protobuf import timestamp_pb2 as google_dot_protobuf_dot_timestamp__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n&aibolit/grpc/generated/schedules.proto\x12\x08schedule\x1a\x1fgoogle/protobuf/timestamp.proto\"\xc6\x01\n\x15\x43reateScheduleRequest\x12\x17\n\x0fmedication_name\x18\x01 \x01(\t\x12\x11\n\tfrequency\x18\x02 \x01(\x05\x12\x1a\n\rduration_days\x18\x03 \x01(\x05H\x00\x88\x01\x01\x12\x33\n\nstart_date\x18\x04 \x01(\x0b\x32\x1a.google.protobuf.TimestampH\x01\x88\x01\x01\x12\x0f\n\x07user_id\x18\x05 \x01(\x05\x42\x10\n\x0e_duration_daysB\r\n\x0b_start_date\"-\n\x16\x43reateScheduleResponse\x12\x13\n\x0bschedule_id\x18\x01 \x01(\x05\")\n\x16GetAllSchedulesRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\"=\n\x17GetAllSchedulesResponse\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\x12\x11\n\tschedules\x18\x02 \x03(\x05\">\n\x16GetUserScheduleRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\x12\x13\n\x0bschedule_id\x18\x02 \x01(\x05\"\xa3\x02\n\x12MedicationSchedule\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x17\n\x0fmedication_name\x18\x02 \x01(\t\x12\x11\n\tfrequency\x18\x03 \x01(\x05\x12\x1a\n\rduration_days\x18\x04 \x01(\x05H\x00\x88\x01\x01\x12\x33\n\nstart_date\x18\x05 \x01(\x0b\x32\x1a.google.protobuf.TimestampH\x01\x88\x01\x01\x12\x31\n\x08\x65nd_date\x18\x06 \x01(\x0b\x32\x1a.google.protobuf.TimestampH\x02\x88\x01\x01\x12\x0f\n\x07user_id\x18\x07 \x01(\x05\x12\x12\n\ndaily_plan\x18\x08 \x03(\tB\x10\n\x0e_duration_daysB\r\n\x0b_start_dateB\x0b\n\t_end_date\",\n\x19GetUserNextTakingsRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\"\\\n\x16NextTakingsMedications\x12\x13\n\x0bschedule_id\x18\x01 \x01(\x05\x12\x15\n\rschedule_name\x18\x02 \x01(\t\x12\x16\n\x0eschedule_times\x18\x03 \x03(\t\"e\n\x1aGetUserNextTakingsResponse\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\x12\x36\n\x0cnext_takings\x18\x02 \x03(\x0b\x32 .schedule.NextTakingsMedications2\xf3\x02\n\x10SchedulesService\x12S\n\x0e\x43reateSchedule\x12\x1f.schedule.CreateScheduleRequest\x1a .schedule.CreateScheduleResponse\x12V\n\x0fGetAllSchedules\x12 .schedule.GetAllSchedulesRequest\x1a!.schedule.GetAllSchedulesResponse\x12Q\n\x0fGetUserSchedule\x12 .schedule.GetUserScheduleRequest\x1a\x1c.schedule.MedicationSchedule\x12_\n\x12GetUserNextTakings\x12#.schedule.GetUserNextTakingsRequest\x1a$.schedule.GetUserNextTakingsResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n&aibolit/grpc/generated/schedules.proto\x12\x08schedule\x1a\x1fgoogle/protobuf/timestamp.proto\"\xc6\x01\n\x15\x43reateScheduleRequest\x12\x17\n\x0fmedication_name\x18\x01 \x01(\t\x12\x11\n\tfrequency\x18\x02 \x01(\x05\x12\x1a\n\rduration_days\x18\x03 \x01(\x05H\x00\x88\x01\x01\x12\x33\n\nstart_date\x18\x04 \x01(\x0b\x32\x1a.google.protobuf.TimestampH\x01\x88\x01\x01\x12\x0f\n\x07user_id\x18\x05 \x01(\x05\x42\x10\n\x0e_duration_daysB\r\n\x0b_start_date\"-\n\x16\x43reateScheduleResponse\x12\x13\n\x0bschedule_id\x18\x01 \x01(\x05\"@\n\x17\x43reateSchedulesResponse\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\x12\x14\n\x0cschedule_ids\x18\x02 \x03(\x05\")\n\x16GetAllSchedulesRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\"=\n\x17GetAllSchedulesResponse\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\x12\x11\n\tschedules\x18\x02 \x03(\x05\"O\n\x16GetUserScheduleRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\x12\x13\n\x0bschedule_id\x18\x02 \x01(\x05\x12\x0f\n\x07\x63ompact\x18\x03 \x01(\x08\"\xbf\x02\n\x12MedicationSchedule\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x17\n\x0fmedication_name\x18\x02 \x01(\t\x12\x11\n\tfrequency\x18\x03 \x01(\x05\x12\x1a\n\rduration_days\x18\x04 \x01(\x05H\x00\x88\x01\x01\x12\x33\n\nstart_date\x18\x05 \x01(\x0b\x32\x1a.google.protobuf.TimestampH\x01\x88\x01\x01\x12\x31\n\x08\x65nd_date\x18\x06 \x01(\x0b\x32\x1a.google.protobuf.TimestampH\x02\x88\x01\x01\x12\x0f\n\x07user_id\x18\x07 \x01(\x05\x12\x12\n\ndaily_plan\x18\x08 \x03(\t\x12\x1a\n\x12\x64\x61ily_plan_minutes\x18\t \x03(\rB\x10\n\x0e_duration_daysB\r\n\x0b_start_dateB\x0b\n\t_end_date\"=\n\x19GetUserNextTakingsRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\x12\x0f\n\x07\x63ompact\x18\x02 \x01(\x08\"v\n\x16NextTakingsMedications\x12\x13\n\x0bschedule_id\x18\x01 \x01(\x05\x12\x15\n\rschedule_name\x18\x02 \x01(\t\x12\x16\n\x0eschedule_times\x18\x03 \x03(\t\x12\x18\n\x10schedule_minutes\x18\x04 \x03(\r\"e\n\x1aGetUserNextTakingsResponse\x12\x0f\n\x07user_id\x18\x01 \x01(\x05\x12\x36\n\x0cnext_takings\x18\x02 \x03(\x0b\x32 .schedule.NextTakingsMedications2\xb1\x04\n\x10SchedulesService\x12S\n\x0e\x43reateSchedule\x12\x1f.schedule.CreateScheduleRequest\x1a .schedule.CreateScheduleResponse\x12W\n\x0f\x43reateSchedules\x12\x1f.schedule.CreateScheduleRequest\x1a!.schedule.CreateSchedulesResponse(\x01\x12V\n\x0fGetAllSchedules\x12 .schedule.GetAllSchedulesRequest\x1a!.schedule.GetAllSchedulesResponse\x12Q\n\x0fGetUserSchedule\x12 .schedule.GetUserScheduleRequest\x1a\x1c.schedule.MedicationSchedule\x12_\n\x12GetUserNextTakings\x12#.schedule.GetUserNextTakingsRequest\x1a$.schedule.GetUserNextTakingsResponse\x12\x63\n\x14SubscribeNextTakings\x12#.schedule.GetUserNextTakingsRequest\x1a$.schedule.GetUserNextTakingsResponse0\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -36,20 +36,22 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_CREATESCHEDULEREQUEST']._serialized_end=284
   _globals['_CREATESCHEDULERESPONSE']._serialized_start=286
   _globals['_CREATESCHEDULERESPONSE']._serialized_end=331
-  _globals['_GETALLSCHEDULESREQUEST']._serialized_start=333
-  _globals['_GETALLSCHEDULESREQUEST']._serialized_end=374
-  _globals['_GETALLSCHEDULESRESPONSE']._serialized_start=376
-  _globals['_GETALLSCHEDULESRESPONSE']._serialized_end=437
-  _globals['_GETUSERSCHEDULEREQUEST']._serialized_start=439
-  _globals['_GETUSERSCHEDULEREQUEST']._serialized_end=501
-  _globals['_MEDICATIONSCHEDULE']._serialized_start=504
-  _globals['_MEDICATIONSCHEDULE']._serialized_end=795
-  _globals['_GETUSERNEXTTAKINGSREQUEST']._serialized_start=797
-  _globals['_GETUSERNEXTTAKINGSREQUEST']._serialized_end=841
-  _globals['_NEXTTAKINGSMEDICATIONS']._serialized_start=843
-  _globals['_NEXTTAKINGSMEDICATIONS']._serialized_end=935
-  _globals['_GETUSERNEXTTAKINGSRESPONSE']._serialized_start=937
-  _globals['_GETUSERNEXTTAKINGSRESPONSE']._serialized_end=1038
-  _globals['_SCHEDULESSERVICE']._serialized_start=1041
-  _globals['_SCHEDULESSERVICE']._serialized_end=1412
+  _globals['_CREATESCHEDULESRESPONSE']._serialized_start=333
+  _globals['_CREATESCHEDULESRESPONSE']._serialized_end=397
+  _globals['_GETALLSCHEDULESREQUEST']._serialized_start=399
+  _globals['_GETALLSCHEDULESREQUEST']._serialized_end=440
+  _globals['_GETALLSCHEDULESRESPONSE']._serialized_start=442
+  _globals['_GETALLSCHEDULESRESPONSE']._serialized_end=503
+  _globals['_GETUSERSCHEDULEREQUEST']._serialized_start=505
+  _globals['_GETUSERSCHEDULEREQUEST']._serialized_end=584
+  _globals['_MEDICATIONSCHEDULE']._serialized_start=587
+  _globals['_MEDICATIONSCHEDULE']._serialized_end=906
+  _globals['_GETUSERNEXTTAKINGSREQUEST']._serialized_start=908
+  _globals['_GETUSERNEXTTAKINGSREQUEST']._serialized_end=969
+  _globals['_NEXTTAKINGSMEDICATIONS']._serialized_start=971
+  _globals['_NEXTTAKINGSMEDICATIONS']._serialized_end=1089
+  _globals['_GETUSERNEXTTAKINGSRESPONSE']._serialized_start=1091
+  _globals['_GETUSERNEXTTAKINGSRESPONSE']._serialized_end=1192
+  _globals['_SCHEDULESSERVICE']._serialized_start=1195
+  _globals['_SCHEDULESSERVICE']._serialized_end=1756
 # @@protoc_insertion_point(module_scope)
@@ -18,14 +18,14 @@ except ImportError:
 if _version_not_supported:
     raise RuntimeError(
         f'The grpc package installed is at version {GRPC_VERSION},'
-        + f' but the generated code in aibolit/grpc/generated/schedules_pb2_grpc.py depends on'
+        + ' but the generated code in aibolit/grpc/generated/schedules_pb2_grpc.py depends on'
         + f' grpcio>={GRPC_GENERATED_VERSION}.'
         + f' Please upgrade your grpc module to grpcio>={GRPC_GENERATED_VERSION}'
         + f' or downgrade your generated code using grpcio-tools<={GRPC_VERSION}.'
     )
 
 
-class SchedulesServiceStub(object):
+class SchedulesServiceStub:
     """Missing associated documentation comment in .proto file."""
 
     def __init__(self, channel):
@@ -39,6 +39,11 @@ class SchedulesServiceStub(object):
                 request_serializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.CreateScheduleRequest.SerializeToString,
                 response_deserializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.CreateScheduleResponse.FromString,
                 _registered_method=True)
+        self.CreateSchedules = channel.stream_unary(
+                '/schedule.SchedulesService/CreateSchedules',
+                request_serializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.CreateScheduleRequest.SerializeToString,
+                response_deserializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.CreateSchedulesResponse.FromString,
+                _registered_method=True)
         self.GetAllSchedules = channel.unary_unary(
                 '/schedule.SchedulesService/GetAllSchedules',
                 request_serializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.GetAllSchedulesRequest.SerializeToString,
@@ -54,9 +59,14 @@ class SchedulesServiceStub(object):
                 request_serializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.GetUserNextTakingsRequest.SerializeToString,
                 response_deserializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.GetUserNextTakingsResponse.FromString,
                 _registered_method=True)
+        self.SubscribeNextTakings = channel.unary_stream(
+                '/schedule.SchedulesService/SubscribeNextTakings',
+                request_serializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.GetUserNextTakingsRequest.SerializeToString,
+                response_deserializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.GetUserNextTakingsResponse.FromString,
+                _registered_method=True)
 
 
-class SchedulesServiceServicer(object):
+class SchedulesServiceServicer:
     """Missing associated documentation comment in .proto file."""
 
     def CreateSchedule(self, request, context):
@@ -65,6 +75,12 @@ class SchedulesServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def CreateSchedules(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def GetAllSchedules(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -83,6 +99,12 @@ class SchedulesServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SubscribeNextTakings(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_SchedulesServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -91,6 +113,11 @@ def add_SchedulesServiceServicer_to_server(servicer, server):
                     request_deserializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.CreateScheduleRequest.FromString,
                     response_serializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.CreateScheduleResponse.SerializeToString,
             ),
+            'CreateSchedules': grpc.stream_unary_rpc_method_handler(
+                    servicer.CreateSchedules,
+                    request_deserializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.CreateScheduleRequest.FromString,
+                    response_serializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.CreateSchedulesResponse.SerializeToString,
+            ),
             'GetAllSchedules': grpc.unary_unary_rpc_method_handler(
                     servicer.GetAllSchedules,
                     request_deserializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.GetAllSchedulesRequest.FromString,
@@ -106,6 +133,11 @@ def add_SchedulesServiceServicer_to_server(servicer, server):
                     request_deserializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.GetUserNextTakingsRequest.FromString,
                     response_serializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.GetUserNextTakingsResponse.SerializeToString,
             ),
+            'SubscribeNextTakings': grpc.unary_stream_rpc_method_handler(
+                    servicer.SubscribeNextTakings,
+                    request_deserializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.GetUserNextTakingsRequest.FromString,
+                    response_serializer=aibolit_dot_grpc_dot_generated_dot_schedules__pb2.GetUserNextTakingsResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'schedule.SchedulesService', rpc_method_handlers)
@@ -114,7 +146,7 @@ def add_SchedulesServiceServicer_to_server(servicer, server):
 
 
  # This class is part of an EXPERIMENTAL API.
-class SchedulesService(object):
+class SchedulesService:
     """Missing associated documentation comment in .proto file."""
 
     @staticmethod
@@ -144,6 +176,33 @@ class SchedulesService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def CreateSchedules(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/schedule.SchedulesService/CreateSchedules',
+            aibolit_dot_grpc_dot_generated_dot_schedules__pb2.CreateScheduleRequest.SerializeToString,
+            aibolit_dot_grpc_dot_generated_dot_schedules__pb2.CreateSchedulesResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def GetAllSchedules(request,
             target,
@@ -224,3 +283,30 @@ class SchedulesService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def SubscribeNextTakings(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/schedule.SchedulesService/SubscribeNextTakings',
+            aibolit_dot_grpc_dot_generated_dot_schedules__pb2.GetUserNextTakingsRequest.SerializeToString,
+            aibolit_dot_grpc_dot_generated_dot_schedules__pb2.GetUserNextTakingsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\"aibolit/grpc/generated/users.proto\x12\x04user\"\x13\n\x11\x43reateUserRequest\" \n\x12\x43reateUserResponse\x12\n\n\x02id\x18\x01 \x01(\x05\"\x14\n\x12GetAllUsersRequest\"\x12\n\x04User\x12\n\n\x02id\x18\x01 \x01(\x05\"0\n\x13GetAllUsersResponse\x12\x19\n\x05users\x18\x01 \x03(\x0b\x32\n.user.User2\x8f\x01\n\x0bUserService\x12?\n\nCreateUser\x12\x17.user.CreateUserRequest\x1a\x18.user.CreateUserResponse\x12?\n\x08GetUsers\x12\x18.user.GetAllUsersRequest\x1a\x19.user.GetAllUsersResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\"aibolit/grpc/generated/users.proto\x12\x04user\"\x13\n\x11\x43reateUserRequest\" \n\x12\x43reateUserResponse\x12\n\n\x02id\x18\x01 \x01(\x05\"9\n\x12GetAllUsersRequest\x12\x10\n\x08\x61\x66ter_id\x18\x01 \x01(\x05\x12\x11\n\tpage_size\x18\x02 \x01(\x05\"\x12\n\x04User\x12\n\n\x02id\x18\x01 \x01(\x05\"G\n\x13GetAllUsersResponse\x12\x19\n\x05users\x18\x01 \x03(\x0b\x32\n.user.User\x12\x15\n\rnext_after_id\x18\x02 \x01(\x05\x32\xd5\x01\n\x0bUserService\x12?\n\nCreateUser\x12\x17.user.CreateUserRequest\x1a\x18.user.CreateUserResponse\x12?\n\x08GetUsers\x12\x18.user.GetAllUsersRequest\x1a\x19.user.GetAllUsersResponse\x12\x44\n\x0bStreamUsers\x12\x18.user.GetAllUsersRequest\x1a\x19.user.GetAllUsersResponse0\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -36,11 +36,11 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_CREATEUSERRESPONSE']._serialized_start=65
   _globals['_CREATEUSERRESPONSE']._serialized_end=97
   _globals['_GETALLUSERSREQUEST']._serialized_start=99
-  _globals['_GETALLUSERSREQUEST']._serialized_end=119
-  _globals['_USER']._serialized_start=121
-  _globals['_USER']._serialized_end=139
-  _globals['_GETALLUSERSRESPONSE']._serialized_start=141
-  _globals['_GETALLUSERSRESPONSE']._serialized_end=189
-  _globals['_USERSERVICE']._serialized_start=192
-  _globals['_USERSERVICE']._serialized_end=335
+  _globals['_GETALLUSERSREQUEST']._serialized_end=156
+  _globals['_USER']._serialized_start=158
+  _globals['_USER']._serialized_end=176
+  _globals['_GETALLUSERSRESPONSE']._serialized_start=178
+  _globals['_GETALLUSERSRESPONSE']._serialized_end=249
+  _globals['_USERSERVICE']._serialized_start=252
+  _globals['_USERSERVICE']._serialized_end=465
 # @@protoc_insertion_point(module_scope)
@@ -44,6 +44,11 @@ class UserServiceStub(object):
                 request_serializer=aibolit_dot_grpc_dot_generated_dot_users__pb2.GetAllUsersRequest.SerializeToString,
                 response_deserializer=aibolit_dot_grpc_dot_generated_dot_users__pb2.GetAllUsersResponse.FromString,
                 _registered_method=True)
+        self.StreamUsers = channel.unary_stream(
+                '/user.UserService/StreamUsers',
+                request_serializer=aibolit_dot_grpc_dot_generated_dot_users__pb2.GetAllUsersRequest.SerializeToString,
+                response_deserializer=aibolit_dot_grpc_dot_generated_dot_users__pb2.GetAllUsersResponse.FromString,
+                _registered_method=True)
 
 
 class UserServiceServicer(object):
@@ -61,6 +66,12 @@ class UserServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StreamUsers(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_UserServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -74,6 +85,11 @@ def add_UserServiceServicer_to_server(servicer, server):
                     request_deserializer=aibolit_dot_grpc_dot_generated_dot_users__pb2.GetAllUsersRequest.FromString,
                     response_serializer=aibolit_dot_grpc_dot_generated_dot_users__pb2.GetAllUsersResponse.SerializeToString,
             ),
+            'StreamUsers': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamUsers,
+                    request_deserializer=aibolit_dot_grpc_dot_generated_dot_users__pb2.GetAllUsersRequest.FromString,
+                    response_serializer=aibolit_dot_grpc_dot_generated_dot_users__pb2.GetAllUsersResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'user.UserService', rpc_method_handlers)
@@ -138,3 +154,30 @@ class UserService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def StreamUsers(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/user.UserService/StreamUsers',
+            aibolit_dot_grpc_dot_generated_dot_users__pb2.GetAllUsersRequest.SerializeToString,
+            aibolit_dot_grpc_dot_generated_dot_users__pb2.GetAllUsersResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -1,46 +1,46 @@
-from concurrent import futures
-import grpc
+import asyncio
 from aibolit.core.logger import configure_logging, get_logger
 from aibolit.core.config import settings
-from aibolit.core.database import get_db_grpc
-from aibolit.repositories.schedules import ScheduleRepo
-from aibolit.repositories.users import UserRepo
-from aibolit.services.schedules import ScheduleService
-from aibolit.services.users import UserService
+from aibolit.core.tracing import configure_tracing
 from aibolit.grpc.adapters.schedules import GrpcScheduleService
 from aibolit.grpc.generated.schedules_pb2_grpc import add_SchedulesServiceServicer_to_server
 from aibolit.grpc.generated.users_pb2_grpc import add_UserServiceServicer_to_server
 from aibolit.grpc.adapters.users import GrpcUserService
+from aibolit.grpc.server import create_server, server_options
+from aibolit.services.next_takings_hub import next_takings_hub
 
 configure_logging()
+configure_tracing()
 logger = get_logger(__name__)
 
 
 async def serve():
-    server = grpc.aio.server(futures.ThreadPoolExecutor(max_workers=10))
-
-    async with get_db_grpc() as session:
-        users_repo, schedules_repo = UserRepo(session), ScheduleRepo(session)
-        users_service, schedules_service = UserService(users_repo), ScheduleService(schedules_repo)
-
-        server = grpc.aio.server()
-        add_UserServiceServicer_to_server(GrpcUserService(users_service), server)
-        add_SchedulesServiceServicer_to_server(GrpcScheduleService(schedules_service, users_service), server)
-
-        server.add_insecure_port(f"[::]:{settings.GRPC_PORT}")
-        logger.info(f"gRPC server started on port {settings.GRPC_PORT}")
-        await server.start()
-        try:
-            await server.wait_for_termination()
-        except asyncio.CancelledError:
-            logger.info("Shutting down gRPC server...")
-            await server.stop(grace=5)
-            raise
+    server = create_server(settings)
+    add_UserServiceServicer_to_server(GrpcUserService(), server)
+    add_SchedulesServiceServicer_to_server(GrpcScheduleService(), server)
+
+    server.add_insecure_port(f"[::]:{settings.GRPC_PORT}")
+    logger.info(
+        f"gRPC server started on port {settings.GRPC_PORT}",
+        max_concurrent_rpcs=settings.GRPC_MAX_CONCURRENT_RPCS,
+        max_concurrent_streaming_rpcs=settings.GRPC_MAX_CONCURRENT_STREAMING_RPCS,
+        options=dict(server_options(settings)),
+        compression=settings.GRPC_COMPRESSION,
+        call_compression=settings.GRPC_CALL_COMPRESSION,
+    )
+    await server.start()
+    try:
+        await server.wait_for_termination()
+    except asyncio.CancelledError:
+        logger.info("Shutting down gRPC server...")
+        # ends the SubscribeNextTakings streams, otherwise they hold the server for the whole grace period
+        await next_takings_hub.stop()
+        await server.stop(grace=5)
+        raise
 
 
 if __name__ == "__main__":
     import sys
-    import asyncio
 
     try:
         asyncio.run(serve())
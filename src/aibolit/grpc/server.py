@@ -0,0 +1,359 @@
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import grpc
+import structlog
+
+from aibolit.core.config import Settings, settings
+from aibolit.core.logger import get_logger
+from aibolit.core.metrics import grpc_errors, grpc_handling_duration, grpc_in_flight
+from aibolit.core import profiling
+from aibolit.core.profiling import Profiler
+from aibolit.core.query_stats import QueryStats, finish_query_stats, start_query_stats
+from aibolit.core.tracing import SpanScope, root_span
+
+hot_logger = get_logger(__name__, hot=True)
+
+COMPRESSION: Dict[str, grpc.Compression] = {
+    "none": grpc.Compression.NoCompression,
+    "deflate": grpc.Compression.Deflate,
+    "gzip": grpc.Compression.Gzip,
+}
+
+
+def server_options(config: Settings = settings) -> List[Tuple[str, int]]:
+    """Channel arguments of the server from the GRPC_* settings."""
+    options = [
+        ("grpc.keepalive_time_ms", config.GRPC_KEEPALIVE_TIME_MS),
+        ("grpc.keepalive_timeout_ms", config.GRPC_KEEPALIVE_TIMEOUT_MS),
+        ("grpc.keepalive_permit_without_calls", int(config.GRPC_KEEPALIVE_PERMIT_WITHOUT_CALLS)),
+        ("grpc.http2.min_ping_interval_without_data_ms", config.GRPC_MIN_RECV_PING_INTERVAL_MS),
+        ("grpc.max_receive_message_length", config.GRPC_MAX_RECEIVE_MESSAGE_LENGTH),
+        ("grpc.max_send_message_length", config.GRPC_MAX_SEND_MESSAGE_LENGTH),
+        ("grpc.http2.bdp_probe", int(config.GRPC_HTTP2_BDP_PROBE)),
+    ]
+    if config.GRPC_MAX_CONCURRENT_STREAMS:
+        options.append(("grpc.max_concurrent_streams", config.GRPC_MAX_CONCURRENT_STREAMS))
+    if config.GRPC_HTTP2_STREAM_WINDOW:
+        options.append(("grpc.http2.lookahead_bytes", config.GRPC_HTTP2_STREAM_WINDOW))
+    return options
+
+
+def replace_behavior(handler: grpc.RpcMethodHandler, wrap_unary: Callable, wrap_streaming: Callable):
+    """`handler` with its behavior wrapped by `wrap_streaming` if it streams responses, by `wrap_unary` otherwise."""
+    if handler.response_streaming:
+        behavior_name = "stream_stream" if handler.request_streaming else "unary_stream"
+        return handler._replace(**{behavior_name: wrap_streaming(getattr(handler, behavior_name))})
+    behavior_name = "stream_unary" if handler.request_streaming else "unary_unary"
+    return handler._replace(**{behavior_name: wrap_unary(getattr(handler, behavior_name))})
+
+
+class WrappingInterceptor(grpc.aio.ServerInterceptor, ABC):
+    """
+    Base of interceptors wrapping the behavior of handlers. The wrapped handler is built once per method and reused
+    while the next handler in the chain stays the same.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: Dict[str, Tuple[grpc.RpcMethodHandler, grpc.RpcMethodHandler]] = {}
+
+    async def intercept_service(self, continuation, handler_call_details: grpc.HandlerCallDetails):
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return handler
+        method = handler_call_details.method
+        cached = self._handlers.get(method)
+        if cached is not None and cached[0] is handler:
+            return cached[1]
+        wrapped = self.wrap(method, handler)
+        self._handlers[method] = (handler, wrapped)
+        return wrapped
+
+    @abstractmethod
+    def wrap(self, method: str, handler: grpc.RpcMethodHandler) -> grpc.RpcMethodHandler:
+        """`handler` of `method` with its behavior wrapped, or `handler` itself if the method is left alone."""
+
+
+class CallCompressionInterceptor(WrappingInterceptor):
+    """Sets the compression of the responses of the methods in `compression`, overriding the server one."""
+
+    def __init__(self, compression: Dict[str, str]) -> None:
+        super().__init__()
+        self._compression = {method: COMPRESSION[name] for method, name in compression.items()}
+
+    def wrap(self, method: str, handler: grpc.RpcMethodHandler) -> grpc.RpcMethodHandler:
+        compression = self._compression.get(method)
+        if compression is None:
+            return handler
+
+        def wrap_streaming(behavior):
+            async def streaming(request, context: grpc.aio.ServicerContext):
+                context.set_compression(compression)
+                async for response in behavior(request, context):
+                    yield response
+
+            return streaming
+
+        def wrap_unary(behavior):
+            async def unary(request, context: grpc.aio.ServicerContext):
+                context.set_compression(compression)
+                return await behavior(request, context)
+
+            return unary
+
+        return replace_behavior(handler, wrap_unary, wrap_streaming)
+
+
+class ConcurrencyLimitInterceptor(WrappingInterceptor):
+    """
+    Rejects calls with RESOURCE_EXHAUSTED over `unary_limit` calls with a single response or over `streaming_limit`
+    server-streaming ones running at once, 0 for no limit. The limits are apart: a server-streaming call such as
+    SubscribeNextTakings lasts as long as its client wants, so idle streams would otherwise starve the short calls.
+    """
+
+    def __init__(self, unary_limit: int, streaming_limit: int) -> None:
+        super().__init__()
+        self._unary_limit = unary_limit
+        self._streaming_limit = streaming_limit
+        self.unary_calls = 0
+        self.streaming_calls = 0
+
+    def wrap(self, method: str, handler: grpc.RpcMethodHandler) -> grpc.RpcMethodHandler:
+        def wrap_streaming(behavior):
+            if not self._streaming_limit:
+                return behavior
+
+            async def streaming(request, context: grpc.aio.ServicerContext):
+                if self.streaming_calls >= self._streaming_limit:
+                    await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Concurrent streaming RPC limit exceeded")
+                self.streaming_calls += 1
+                try:
+                    async for response in behavior(request, context):
+                        yield response
+                finally:
+                    self.streaming_calls -= 1
+
+            return streaming
+
+        def wrap_unary(behavior):
+            if not self._unary_limit:
+                return behavior
+
+            async def unary(request, context: grpc.aio.ServicerContext):
+                if self.unary_calls >= self._unary_limit:
+                    await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Concurrent RPC limit exceeded")
+                self.unary_calls += 1
+                try:
+                    return await behavior(request, context)
+                finally:
+                    self.unary_calls -= 1
+
+            return unary
+
+        return replace_behavior(handler, wrap_unary, wrap_streaming)
+
+
+class MetricsInterceptor(WrappingInterceptor):
+    """
+    Records the handling time of every call by method, the calls in flight and the calls ended with a status other
+    than OK. Streaming calls are timed until their last response.
+    """
+
+    def wrap(self, method: str, handler: grpc.RpcMethodHandler) -> grpc.RpcMethodHandler:
+        duration = grpc_handling_duration.labels(method)
+        in_flight = grpc_in_flight.labels(method)
+
+        def record(context: grpc.aio.ServicerContext, start: float, failed: bool) -> None:
+            duration.observe(time.perf_counter() - start)
+            in_flight.dec()
+            code = context.code()
+            if failed and code in (None, grpc.StatusCode.OK):
+                code = grpc.StatusCode.UNKNOWN
+            if code is not None and code != grpc.StatusCode.OK:
+                grpc_errors.labels(method, getattr(code, "name", str(code))).inc()
+
+        def wrap_streaming(behavior):
+            async def streaming(request, context: grpc.aio.ServicerContext):
+                in_flight.inc()
+                start = time.perf_counter()
+                failed = True
+                try:
+                    async for response in behavior(request, context):
+                        yield response
+                    failed = False
+                finally:
+                    record(context, start, failed)
+
+            return streaming
+
+        def wrap_unary(behavior):
+            async def unary(request, context: grpc.aio.ServicerContext):
+                in_flight.inc()
+                start = time.perf_counter()
+                failed = True
+                try:
+                    response = await behavior(request, context)
+                    failed = False
+                    return response
+                finally:
+                    record(context, start, failed)
+
+            return unary
+
+        return replace_behavior(handler, wrap_unary, wrap_streaming)
+
+
+class CallContextInterceptor(WrappingInterceptor):
+    """
+    Binds the trace id of every call, from its x-trace-id metadata or a new one. With `query_stats`, counts the
+    statements it runs: logged with the call and checked against the query budget. With `tracing`, runs it in the
+    root span of its trace.
+    """
+
+    def __init__(self, query_stats: bool = True, tracing: bool = False) -> None:
+        super().__init__()
+        self._query_stats = query_stats
+        self._tracing = tracing
+
+    def wrap(self, method: str, handler: grpc.RpcMethodHandler) -> grpc.RpcMethodHandler:
+        query_stats = self._query_stats
+        tracing = self._tracing
+
+        def start(context: grpc.aio.ServicerContext) -> Tuple[Optional[QueryStats], Optional[SpanScope]]:
+            trace_id = None
+            for key, value in context.invocation_metadata() or ():
+                if key == "x-trace-id":
+                    trace_id = value
+                    break
+            trace_id = trace_id or str(uuid.uuid4())
+            structlog.contextvars.bind_contextvars(trace_id=trace_id)
+            call_span = root_span(method, trace_id, **{"rpc.method": method}) if tracing else None
+            if call_span is not None:
+                call_span.__enter__()
+            return (start_query_stats() if query_stats else None), call_span
+
+        def finish(
+            context: grpc.aio.ServicerContext, stats: Optional[QueryStats], call_span: Optional[SpanScope], error
+        ) -> None:
+            if stats is not None:
+                finish_query_stats(stats, method)
+                hot_logger.info("call_finished", method=method, **stats.fields())
+            if call_span is not None:
+                code = context.code()
+                call_span.span.set_attribute("rpc.grpc.status_code", getattr(code, "name", None) or "OK")
+                call_span.__exit__(type(error) if error else None, error, None)
+            structlog.contextvars.unbind_contextvars("trace_id")
+
+        def wrap_streaming(behavior):
+            async def streaming(request, context: grpc.aio.ServicerContext):
+                stats, call_span = start(context)
+                error = None
+                try:
+                    async for response in behavior(request, context):
+                        yield response
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    finish(context, stats, call_span, error)
+
+            return streaming
+
+        def wrap_unary(behavior):
+            async def unary(request, context: grpc.aio.ServicerContext):
+                stats, call_span = start(context)
+                error = None
+                try:
+                    return await behavior(request, context)
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    finish(context, stats, call_span, error)
+
+            return unary
+
+        return replace_behavior(handler, wrap_unary, wrap_streaming)
+
+
+class ProfilingInterceptor(WrappingInterceptor):
+    """Samples the stacks of the calls `profiler` wants, saved under the trace id bound by CallContextInterceptor."""
+
+    def __init__(self, profiler: Profiler) -> None:
+        super().__init__()
+        self._profiler = profiler
+
+    def wrap(self, method: str, handler: grpc.RpcMethodHandler) -> grpc.RpcMethodHandler:
+        profiler = self._profiler
+
+        def wanted(context: grpc.aio.ServicerContext) -> bool:
+            header = None
+            for key, value in context.invocation_metadata() or ():
+                if key == "x-profile":
+                    header = value.encode() if isinstance(value, str) else value
+                    break
+            return profiler.wanted(header)
+
+        def finish(stacks, started_at: float) -> None:
+            profiler.finish(stacks, structlog.contextvars.get_contextvars().get("trace_id"), method, started_at)
+
+        def wrap_streaming(behavior):
+            async def streaming(request, context: grpc.aio.ServicerContext):
+                if not wanted(context):
+                    async for response in behavior(request, context):
+                        yield response
+                    return
+                started_at = time.time()
+                stacks = profiler.start()
+                try:
+                    async for response in behavior(request, context):
+                        yield response
+                finally:
+                    finish(stacks, started_at)
+
+            return streaming
+
+        def wrap_unary(behavior):
+            async def unary(request, context: grpc.aio.ServicerContext):
+                if not wanted(context):
+                    return await behavior(request, context)
+                started_at = time.time()
+                stacks = profiler.start()
+                try:
+                    return await behavior(request, context)
+                finally:
+                    finish(stacks, started_at)
+
+            return unary
+
+        return replace_behavior(handler, wrap_unary, wrap_streaming)
+
+
+def create_server(config: Settings = settings, profiler: Optional[Profiler] = None, **kwargs: Any) -> grpc.aio.Server:
+    """
+    A server tuned by the GRPC_* settings, without services and ports. Calls are profiled by `profiler`, the one of
+    the app shared with the REST server by default.
+    """
+    interceptors: List[grpc.aio.ServerInterceptor] = []
+    if config.METRICS_ENABLED:
+        interceptors.append(MetricsInterceptor())
+    # after MetricsInterceptor, so that rejected calls are counted as errors
+    if config.GRPC_MAX_CONCURRENT_RPCS or config.GRPC_MAX_CONCURRENT_STREAMING_RPCS:
+        interceptors.append(
+            ConcurrencyLimitInterceptor(config.GRPC_MAX_CONCURRENT_RPCS, config.GRPC_MAX_CONCURRENT_STREAMING_RPCS)
+        )
+    interceptors.append(CallContextInterceptor(config.SQL_STATS_ENABLED, config.TRACING_ENABLED))
+    # after CallContextInterceptor, which binds the trace id
+    profiler = profiler or profiling.profiler
+    if profiler.enabled:
+        interceptors.append(ProfilingInterceptor(profiler))
+    if config.GRPC_CALL_COMPRESSION:
+        interceptors.append(CallCompressionInterceptor(config.GRPC_CALL_COMPRESSION))
+    return grpc.aio.server(
+        options=server_options(config),
+        compression=COMPRESSION[config.GRPC_COMPRESSION],
+        interceptors=interceptors or None,
+        **kwargs,
+    )
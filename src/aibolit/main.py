@@ -6,13 +6,20 @@ import uvicorn
 from fastapi import FastAPI
 
 from aibolit.core.logger import get_logger, configure_logging
-from aibolit.core.middleware import LoggingMiddleware
+from aibolit.core.middleware import LoggingMiddleware, MetricsMiddleware, ProfilingMiddleware, TracingMiddleware
+from aibolit.core.profiling import profiler
+from aibolit.core.tracing import configure_tracing
+from aibolit.transport.views.internal import metrics_router, router as internal_router
 from aibolit.transport.views.schedules import router as schedules_router
 from aibolit.transport.views.users import router as users_router
 from aibolit.core.database import engine
 from aibolit.core.config import settings
+from aibolit.core.pool_stats import PoolStatsReporter
+from aibolit.services.next_takings_hub import next_takings_hub
+from aibolit.services.reminders import reminder_scheduler
 
 configure_logging()
+configure_tracing()
 logger = get_logger(__name__)
 
 
@@ -21,10 +28,21 @@ async def lifespan(
     app: FastAPI,
 ) -> AsyncGenerator[dict[str, Any], None]:
     db_engine = engine
+    pool_stats_reporter = PoolStatsReporter(engine, settings.DB_POOL_STATS_LOG_INTERVAL)
+    pool_stats_reporter.start()
+    if settings.REMINDERS_ENABLED:
+        try:
+            await reminder_scheduler.start()
+        except Exception:
+            # reminders are not worth the API: it starts without them
+            logger.exception("Reminder scheduler not started")
     yield {
         "db_engine": engine,
     }
     logger.info(f"OUR FRIENDLY {app} SHUTDOWN")
+    await reminder_scheduler.stop()
+    await next_takings_hub.stop()
+    await pool_stats_reporter.stop()
     await db_engine.dispose()
 
 
@@ -34,9 +52,25 @@ def make_app() -> FastAPI:
         "It provides APIs to manage appointment schedules and time slots for taking medications."
     )
     app = FastAPI(lifespan=lifespan, debug=settings.DEBUG, title="AibolitCare API", description=description)
-    app.add_middleware(LoggingMiddleware)
+    # the last middleware added runs first, profiles and spans need the trace id of LoggingMiddleware
+    if profiler.enabled:
+        app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    if settings.TRACING_ENABLED:
+        app.add_middleware(TracingMiddleware)
+    app.add_middleware(
+        LoggingMiddleware,
+        sample_rate=settings.LOG_REQUESTS_SAMPLE_RATE,
+        slow_request_ms=settings.LOG_SLOW_REQUEST_MS,
+        error_status=settings.LOG_ERROR_STATUS,
+        query_stats=settings.SQL_STATS_ENABLED,
+    )
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
     app.include_router(schedules_router)
     app.include_router(users_router)
+    app.include_router(internal_router)
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics_router)
     return app
 
 
@@ -1,7 +1,7 @@
 from datetime import date
 from typing import Optional
 
-from sqlalchemy import ForeignKey, SmallInteger, String
+from sqlalchemy import ForeignKey, Index, SmallInteger, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql.schema import CheckConstraint
 
@@ -11,8 +11,8 @@ from aibolit.core.database import Base, intpk
 class MedicationScheduleOrm(Base):
     __tablename__ = "schedules"
     id: Mapped[intpk]
-    medication_name: Mapped[str] = mapped_column(String(255), index=True, nullable=False)
-    frequency: Mapped[int] = mapped_column(SmallInteger, index=True, nullable=False)
+    medication_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    frequency: Mapped[int] = mapped_column(SmallInteger, nullable=False)
     duration_days: Mapped[Optional[int]] = mapped_column(SmallInteger)
     start_date: Mapped[date] = mapped_column(default=date.today(), nullable=False)
     end_date: Mapped[Optional[date]]
@@ -23,4 +23,12 @@ class MedicationScheduleOrm(Base):
     __table_args__ = (
         CheckConstraint("duration_days > 0", name="check_correctness_duration_days"),
         CheckConstraint("frequency >= 1 AND frequency <= 15", name="check_correctness_frequency"),
+        # active schedules of a user; id and frequency make the ID lists and the due intake sweep index-only scans
+        Index(
+            "ix_schedules_user_id_start_date_end_date",
+            "user_id",
+            "start_date",
+            "end_date",
+            postgresql_include=["id", "frequency"],
+        ),
     )
@@ -1,44 +1,137 @@
 from datetime import date, timedelta
 from operator import or_
-from typing import Optional, Sequence
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, Row, Select, exists, insert, literal, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from aibolit.core.tracing import traced
 from aibolit.models.schedules import MedicationScheduleOrm
+from aibolit.models.users import UserOrm
 
 # from aibolit.schemas.schedules import MedicationScheduleCreateRequest
 from aibolit.schemas.openapi_generated import MedicationScheduleCreateRequest
 
+FOREIGN_KEY_VIOLATION = "23503"
+_CREATED_COLUMNS = (
+    MedicationScheduleOrm.id,
+    MedicationScheduleOrm.user_id,
+    MedicationScheduleOrm.frequency,
+    MedicationScheduleOrm.start_date,
+    MedicationScheduleOrm.end_date,
+)
+
+
+def _active_user_schedules(user_id: int) -> Tuple[ColumnElement[bool], ...]:
+    today = date.today()
+    return (
+        MedicationScheduleOrm.user_id == user_id,
+        MedicationScheduleOrm.start_date <= today,
+        or_(
+            MedicationScheduleOrm.end_date >= today,
+            MedicationScheduleOrm.end_date.is_(None),
+        ),
+    )
+
 
 class ScheduleRepo:
     def __init__(self, db: AsyncSession) -> None:
         self._db = db
 
-    async def create_schedule(self, schedule: MedicationScheduleCreateRequest) -> MedicationScheduleOrm:
-        schedule.start_date = date.today() if not schedule.start_date else schedule.start_date
-        end_date = schedule.start_date + timedelta(days=schedule.duration_days) if schedule.duration_days else None
-        db_schedule = MedicationScheduleOrm(end_date=end_date, **schedule.model_dump())
-        self._db.add(db_schedule)
+    @traced()
+    async def create_schedule(self, schedule: MedicationScheduleCreateRequest) -> Optional[Row]:
+        """
+        Insert the schedule with INSERT ... SELECT ... WHERE EXISTS (user) RETURNING, a single statement.
+        Returns the (id, user_id, frequency, start_date, end_date) row, None if the user does not exist
+        (also when it is deleted concurrently and the foreign key is violated).
+        """
+        values = self._schedule_values(schedule)
+        columns = MedicationScheduleOrm.__table__.c
+        try:
+            result = await self._db.execute(
+                insert(MedicationScheduleOrm)
+                .from_select(
+                    list(values),
+                    select(*(literal(value, columns[name].type) for name, value in values.items())).where(
+                        exists().where(UserOrm.id == schedule.user_id)
+                    ),
+                )
+                .returning(*_CREATED_COLUMNS)
+            )
+        except IntegrityError as e:
+            await self._db.rollback()
+            if getattr(e.orig, "pgcode", None) == FOREIGN_KEY_VIOLATION:
+                return None
+            raise
+        db_schedule = result.first()
         await self._db.commit()
-        await self._db.refresh(db_schedule)
         return db_schedule
 
+    @traced()
+    async def create_schedules(self, schedules: Sequence[MedicationScheduleCreateRequest]) -> Optional[Sequence[Row]]:
+        """
+        Insert all schedules with multi-row INSERT ... RETURNING in one transaction.
+        Returns (id, user_id, frequency, start_date, end_date) rows in the order of `schedules`,
+        None if their user does not exist (the foreign key is violated and nothing is inserted).
+        """
+        try:
+            result = await self._db.execute(
+                insert(MedicationScheduleOrm).returning(*_CREATED_COLUMNS, sort_by_parameter_order=True),
+                [self._schedule_values(schedule) for schedule in schedules],
+            )
+        except IntegrityError as e:
+            await self._db.rollback()
+            if getattr(e.orig, "pgcode", None) == FOREIGN_KEY_VIOLATION:
+                return None
+            raise
+        db_schedules = result.all()
+        await self._db.commit()
+        return db_schedules
+
+    @traced()
     async def get_all_user_schedules(self, user_id: int) -> Optional[Sequence[MedicationScheduleOrm]]:
+        db_request = await self._db.execute(self.all_user_schedules_query(user_id))
+        db_schedules = db_request.scalars().all()
+        return db_schedules
+
+    @traced()
+    async def get_all_user_schedule_ids(self, user_id: int) -> Sequence[int]:
+        db_request = await self._db.execute(self.all_user_schedule_ids_query(user_id))
+        return db_request.scalars().all()
+
+    @traced()
+    async def get_unexpired_user_schedules(self, user_id: int, day: date) -> Sequence[Row]:
+        """(id, medication_name, frequency, start_date, end_date) of the schedules of the user not expired on `day`."""
         db_request = await self._db.execute(
-            select(MedicationScheduleOrm)
+            select(
+                MedicationScheduleOrm.id,
+                MedicationScheduleOrm.medication_name,
+                MedicationScheduleOrm.frequency,
+                MedicationScheduleOrm.start_date,
+                MedicationScheduleOrm.end_date,
+            )
             .filter(MedicationScheduleOrm.user_id == user_id)
-            .filter(MedicationScheduleOrm.start_date <= date.today())
             .filter(
                 or_(
-                    MedicationScheduleOrm.end_date >= date.today(),
+                    MedicationScheduleOrm.end_date >= day,
                     MedicationScheduleOrm.end_date.is_(None),
                 ),
-            ),
+            )
         )
-        db_schedules = db_request.scalars().all()
-        return db_schedules
+        return db_request.all()
+
+    @staticmethod
+    def all_user_schedules_query(user_id: int) -> Select:
+        """Schedules of the user active today, served by ix_schedules_user_id_start_date_end_date."""
+        return select(MedicationScheduleOrm).filter(*_active_user_schedules(user_id))
 
+    @staticmethod
+    def all_user_schedule_ids_query(user_id: int) -> Select:
+        """IDs of the schedules of the user active today, an index-only scan without ORM rows."""
+        return select(MedicationScheduleOrm.id).filter(*_active_user_schedules(user_id))
+
+    @traced()
     async def get_user_schedule(self, schedule_id: int, user_id: int) -> Optional[MedicationScheduleOrm]:
         result = await self._db.execute(
             select(MedicationScheduleOrm)
@@ -47,3 +140,58 @@ class ScheduleRepo:
         )
         schedule = result.scalars().first()
         return schedule
+
+    @staticmethod
+    def _schedule_values(schedule: MedicationScheduleCreateRequest) -> Dict[str, Any]:
+        start_date = schedule.start_date or date.today()
+        end_date = start_date + timedelta(days=schedule.duration_days) if schedule.duration_days else None
+        return {**schedule.model_dump(), "start_date": start_date, "end_date": end_date}
+
+    async def stream_active_schedules(self, day: date, batch_size: int) -> AsyncIterator[Sequence[Row]]:
+        """
+        Stream (id, user_id, frequency) of all schedules active on `day` through a server-side cursor,
+        `batch_size` rows per fetch, so that memory does not grow with the table.
+        """
+        result = await self._db.stream(
+            select(MedicationScheduleOrm.id, MedicationScheduleOrm.user_id, MedicationScheduleOrm.frequency)
+            .filter(MedicationScheduleOrm.start_date <= day)
+            .filter(
+                or_(
+                    MedicationScheduleOrm.end_date >= day,
+                    MedicationScheduleOrm.end_date.is_(None),
+                ),
+            )
+            .execution_options(yield_per=batch_size)
+        )
+        try:
+            async for rows in result.partitions():
+                yield rows
+        finally:
+            await result.close()
+
+    async def stream_unexpired_schedules(self, day: date, batch_size: int) -> AsyncIterator[Sequence[Row]]:
+        """
+        Stream (id, user_id, frequency, start_date, end_date) of all schedules not expired on `day`,
+        including the ones that start later, through a server-side cursor, `batch_size` rows per fetch.
+        """
+        result = await self._db.stream(
+            select(
+                MedicationScheduleOrm.id,
+                MedicationScheduleOrm.user_id,
+                MedicationScheduleOrm.frequency,
+                MedicationScheduleOrm.start_date,
+                MedicationScheduleOrm.end_date,
+            )
+            .filter(
+                or_(
+                    MedicationScheduleOrm.end_date >= day,
+                    MedicationScheduleOrm.end_date.is_(None),
+                ),
+            )
+            .execution_options(yield_per=batch_size)
+        )
+        try:
+            async for rows in result.partitions():
+                yield rows
+        finally:
+            await result.close()
@@ -1,7 +1,8 @@
-from typing import Optional
-from sqlalchemy import select
+from typing import AsyncIterator, Optional, Sequence
+from sqlalchemy import Select, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from aibolit.core.tracing import traced
 from aibolit.models.users import UserOrm
 
 # from aibolit.schemas.users import UserCreateRequest
@@ -12,14 +13,38 @@ class UserRepo:
     def __init__(self, db: AsyncSession) -> None:
         self._db = db
 
-    async def create_user(self, user: UserCreateRequest) -> UserOrm:
-        db_user = UserOrm(**user.model_dump())
-        self._db.add(db_user)
+    @traced()
+    async def create_user(self, user: UserCreateRequest) -> int:
+        """Insert the user with INSERT ... RETURNING id, without reading the row back."""
+        result = await self._db.execute(insert(UserOrm).values(**user.model_dump()).returning(UserOrm.id))
+        user_id = result.scalar_one()
         await self._db.commit()
-        await self._db.refresh(db_user)
-        return db_user
+        return user_id
 
+    @traced()
     async def get_user_by_id(self, user_id: int) -> Optional[UserOrm]:
         filtering = await self._db.execute(select(UserOrm).filter(UserOrm.id == user_id))
         user = filtering.scalar_one_or_none()
         return user
+
+    @traced()
+    async def get_user_ids(self, after_id: int, limit: int) -> Sequence[int]:
+        """Keyset page: IDs of at most `limit` users with id > `after_id`, in id order, from the primary key index."""
+        result = await self._db.execute(self.user_ids_query(after_id).limit(limit))
+        return result.scalars().all()
+
+    async def stream_user_ids(self, after_id: int, batch_size: int) -> AsyncIterator[Sequence[int]]:
+        """
+        Stream IDs of the users with id > `after_id`, in id order, through a server-side cursor,
+        `batch_size` IDs per fetch, so that memory does not grow with the table.
+        """
+        result = await self._db.stream_scalars(self.user_ids_query(after_id).execution_options(yield_per=batch_size))
+        try:
+            async for user_ids in result.partitions():
+                yield user_ids
+        finally:
+            await result.close()
+
+    @staticmethod
+    def user_ids_query(after_id: int) -> Select:
+        return select(UserOrm.id).filter(UserOrm.id > after_id).order_by(UserOrm.id)
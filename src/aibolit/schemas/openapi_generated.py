@@ -1,6 +1,6 @@
 # generated by datamodel-codegen:
 #   filename:  openapi.json
-#   timestamp: 2025-05-28T18:00:01+00:00
+#   timestamp: 2026-10-18T11:58:36+00:00
 
 from __future__ import annotations
 
@@ -30,6 +30,26 @@ class MedicationSchedule(BaseModel):
     )
 
 
+class MedicationScheduleCompact(BaseModel):
+    medication_name: constr(max_length=255) = Field(..., title='Medication Name')
+    frequency: conint(lt=16, gt=0) = Field(..., examples=[7], title='Frequency')
+    duration_days: Optional[PositiveInt] = Field(
+        None, description='Duration in days, must be > 0, if set', examples=[7], title='Duration Days'
+    )
+    start_date: Optional[date] = Field(
+        None, description='today date by default', examples=['2025-12-31'], title='Start Date'
+    )
+    user_id: PositiveInt = Field(..., title='User Id')
+    id: PositiveInt = Field(..., title='Id')
+    end_date: Optional[date] = Field(None, description='Read Only!', examples=['2026-01-06'], title='End Date')
+    daily_plan_minutes: List[conint(ge=0, lt=1440)] = Field(
+        ...,
+        description='Minute of day of each reception time, a multiple of 15(Read Only)!',
+        examples=[[480, 630, 765, 900, 1050, 1185, 1320]],
+        title='Daily Plan Minutes',
+    )
+
+
 class MedicationScheduleCreateRequest(BaseModel):
     medication_name: constr(max_length=255) = Field(..., title='Medication Name')
     frequency: conint(lt=16, gt=0) = Field(..., examples=[7], title='Frequency')
@@ -51,12 +71,28 @@ class MedicationScheduleIdsResponse(BaseModel):
     schedules: List[PositiveInt] = Field(..., title='Schedules')
 
 
+class MedicationSchedulesCreateResponse(BaseModel):
+    user_id: PositiveInt = Field(..., title='User Id')
+    schedule_ids: List[PositiveInt] = Field(..., title='Schedule Ids')
+
+
 class NextTakingsMedications(BaseModel):
     schedule_id: PositiveInt = Field(..., title='Schedule Id')
     schedule_name: str = Field(..., title='Schedule Name')
     schedule_times: List[str] = Field(..., title='Schedule Times')
 
 
+class NextTakingsMedicationsCompact(BaseModel):
+    schedule_id: PositiveInt = Field(..., title='Schedule Id')
+    schedule_name: str = Field(..., title='Schedule Name')
+    schedule_minutes: List[conint(ge=0, lt=1440)] = Field(..., title='Schedule Minutes')
+
+
+class NextTakingsMedicationsCompactResponse(BaseModel):
+    user_id: PositiveInt = Field(..., title='User Id')
+    next_takings: List[NextTakingsMedicationsCompact] = Field(..., title='Next Takings')
+
+
 class NextTakingsMedicationsResponse(BaseModel):
     user_id: PositiveInt = Field(..., title='User Id')
     next_takings: List[NextTakingsMedications] = Field(..., title='Next Takings')
@@ -1,5 +1,5 @@
 from datetime import date
-from typing import List, Optional
+from typing import Annotated, List, Optional
 from pydantic import BaseModel, Field, PositiveInt, ConfigDict
 
 
@@ -22,6 +22,11 @@ class MedicationScheduleIdsResponse(BaseModel):
     schedules: List[PositiveInt]
 
 
+class MedicationSchedulesCreateResponse(BaseModel):
+    user_id: PositiveInt
+    schedule_ids: List[PositiveInt]
+
+
 class MedicationScheduleCreateRequest(MedicationScheduleBase): ...
 
 
@@ -45,6 +50,26 @@ class MedicationSchedule(MedicationScheduleBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class MedicationScheduleCompact(MedicationScheduleBase):
+    id: PositiveInt
+    end_date: Optional[date] = Field(
+        None,
+        examples=["2026-01-06"],
+        description="Read Only!",
+        json_schema_extra={"readOnly": True},
+    )
+    daily_plan_minutes: List[Annotated[int, Field(ge=0, lt=1440)]] = Field(
+        ...,
+        description="Minute of day of each reception time, a multiple of 15(Read Only)!",
+        examples=[[480, 630, 765, 900, 1050, 1185, 1320]],
+        title="Daily Plan Minutes",
+        json_schema_extra={"readOnly": True},
+    )
+
+    # sql alchemy support
+    model_config = ConfigDict(from_attributes=True)
+
+
 class NextTakingsMedications(BaseModel):
     schedule_id: PositiveInt
     schedule_name: str
@@ -54,3 +79,14 @@ class NextTakingsMedications(BaseModel):
 class NextTakingsMedicationsResponse(BaseModel):
     user_id: PositiveInt
     next_takings: List[NextTakingsMedications]
+
+
+class NextTakingsMedicationsCompact(BaseModel):
+    schedule_id: PositiveInt
+    schedule_name: str
+    schedule_minutes: List[Annotated[int, Field(ge=0, lt=1440)]] = Field(..., json_schema_extra={"readOnly": True})
+
+
+class NextTakingsMedicationsCompactResponse(BaseModel):
+    user_id: PositiveInt
+    next_takings: List[NextTakingsMedicationsCompact]
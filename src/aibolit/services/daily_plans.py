@@ -0,0 +1,117 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from sys import intern
+from typing import Dict, Optional, Sequence, Tuple
+
+from aibolit.core.config import settings
+
+MIN_FREQUENCY = 1
+MAX_FREQUENCY = 15
+
+DailyPlan = Tuple[str, ...]
+PlanMinutes = Tuple[int, ...]
+PlanConfig = Tuple[time, time, int]
+MinuteRange = Tuple[int, int]
+
+
+def round_to_next_interval(dt: datetime, interval: int) -> datetime:
+    rounded_minutes = (dt.minute + (interval - 1)) // interval * interval
+    if rounded_minutes == 60:
+        return dt.replace(minute=0, second=0) + timedelta(hours=1)
+    return dt.replace(minute=rounded_minutes, second=0)
+
+
+def build_daily_plan(frequency: int, day_start: time, day_end: time, rounding_interval: int) -> DailyPlan:
+    """
+    Build a tuple of time strings ("HH:MM") representing medication intake times.
+    Times are evenly distributed between day_start and day_end,
+    each rounded up to the nearest rounding_interval.
+    """
+    start_day = datetime.combine(date.today(), day_start)
+    end_day = datetime.combine(date.today(), day_end)
+    if frequency == 1:
+        return (intern(start_day.strftime("%H:%M")),)
+    interval = (end_day - start_day) / (frequency - 1)
+    return tuple(
+        intern(round_to_next_interval(start_day + i * interval, rounding_interval).strftime("%H:%M"))
+        for i in range(frequency)
+    )
+
+
+def to_minutes(time_str: str) -> int:
+    """Minute of day of an "HH:MM" string."""
+    hours, minutes = time_str.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class DailyPlanTable:
+    """
+    Daily plans for every allowed frequency (MIN_FREQUENCY..MAX_FREQUENCY).
+    Plans depend only on the frequency and the day bounds/rounding settings, so they are
+    built once per settings combination and rebuilt when any of those settings change.
+    Every plan is also kept as minutes of day, in the same order as its time strings.
+    """
+
+    def __init__(self) -> None:
+        self._config: Optional[PlanConfig] = None
+        self._plans: Tuple[DailyPlan, ...] = ()
+        self._minutes: Tuple[PlanMinutes, ...] = ()
+        self._sorted: Tuple[bool, ...] = ()
+        self._minute_of: Dict[str, int] = {}
+
+    def get(self, frequency: int) -> DailyPlan:
+        self._ensure_current()
+        return self._plans[frequency]
+
+    def minutes(self, frequency: int) -> PlanMinutes:
+        self._ensure_current()
+        return self._minutes[frequency]
+
+    def minutes_of(self, times: Sequence[str]) -> PlanMinutes:
+        """Minutes of day of times taken from the plans, looked up instead of parsed."""
+        self._ensure_current()
+        minute_of = self._minute_of
+        return tuple(minute_of[time_str] for time_str in times)
+
+    def select(self, frequency: int, ranges: Sequence[MinuteRange]) -> DailyPlan:
+        """
+        Times of the plan for `frequency` whose minute of day falls into one of the inclusive `ranges`.
+        Ranges must be ascending and disjoint; times are returned in plan order.
+        """
+        self._ensure_current()
+        times, minutes = self._plans[frequency], self._minutes[frequency]
+        # plans are not ascending only if the day bounds or rounding wrap past midnight
+        if not self._sorted[frequency]:
+            return tuple(
+                time_str
+                for time_str, minute in zip(times, minutes)
+                if any(low <= minute <= high for low, high in ranges)
+            )
+        selected: DailyPlan = ()
+        for low, high in ranges:
+            selected += times[bisect_left(minutes, low) : bisect_right(minutes, high)]
+        return selected
+
+    def _ensure_current(self) -> None:
+        config = (settings.TIME_DAY_START, settings.TIME_DAY_END, settings.TIME_ROUNDING_INTERVAL)
+        if config != self._config:
+            self._rebuild(config)
+
+    def _rebuild(self, config: PlanConfig) -> None:
+        # index 0 is kept empty so that plans are looked up by frequency directly
+        plans = ((),) + tuple(
+            build_daily_plan(frequency, *config) for frequency in range(MIN_FREQUENCY, MAX_FREQUENCY + 1)
+        )
+        minutes = tuple(tuple(to_minutes(time_str) for time_str in plan) for plan in plans)
+        self._plans = plans
+        self._minutes = minutes
+        self._sorted = tuple(list(plan_minutes) == sorted(plan_minutes) for plan_minutes in minutes)
+        self._minute_of = {
+            time_str: minute
+            for plan, plan_minutes in zip(plans, minutes)
+            for time_str, minute in zip(plan, plan_minutes)
+        }
+        self._config = config
+
+
+daily_plans = DailyPlanTable()
@@ -0,0 +1,28 @@
+from typing import Any, Callable, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def make_row_mapper(model: Type[ModelT], computed: Tuple[str, ...] = ()) -> Callable[..., ModelT]:
+    """
+    A function that builds `model` instances from ORM rows with a single validation of the field values, instead
+    of building the model from the row and validating it once more.
+    Fields listed in `computed` are not read from the row and are taken as keyword arguments of the function.
+    Loaded column values are read from the row __dict__, skipping the ORM descriptors, unless some column is
+    not loaded.
+    """
+    names = tuple(name for name in model.model_fields if name not in computed)
+    validate = model.model_validate
+
+    def map_row(row: Any, **computed_values: Any) -> ModelT:
+        loaded = row.__dict__
+        try:
+            values = {name: loaded[name] for name in names}
+        except KeyError:
+            values = {name: getattr(row, name) for name in names}
+        values.update(computed_values)
+        return validate(values)
+
+    return map_row
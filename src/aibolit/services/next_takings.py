@@ -0,0 +1,82 @@
+from datetime import datetime, time
+from typing import List, Tuple
+
+from aibolit.core.config import settings
+from aibolit.services.daily_plans import DailyPlan, DailyPlanTable, MinuteRange, daily_plans
+
+MINUTES_PER_DAY = 24 * 60
+_US_PER_MINUTE = 60 * 1_000_000
+_US_PER_DAY = MINUTES_PER_DAY * _US_PER_MINUTE
+
+# (user_id, schedule_id, "HH:MM")
+DueIntake = Tuple[int, int, str]
+# (schedule_id, schedule_name, schedule_times) of the schedules with active or upcoming intakes
+NextTakings = Tuple[Tuple[int, str, DailyPlan], ...]
+
+
+def _time_to_us(value: time) -> int:
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1_000_000 + value.microsecond
+
+
+def day_limits() -> MinuteRange:
+    """Minutes of day within TIME_DAY_START..TIME_DAY_END, inclusive."""
+    day_low = -(-_time_to_us(settings.TIME_DAY_START) // _US_PER_MINUTE)
+    day_high = _time_to_us(settings.TIME_DAY_END) // _US_PER_MINUTE
+    return day_low, day_high
+
+
+def due_range(start: datetime, minutes: int) -> MinuteRange:
+    """
+    Minutes of day within [start, start + `minutes`), inclusive, within the day limits.
+    The window is cut off at midnight, the rest of it belongs to the next day.
+    """
+    start_us = _time_to_us(start.time())
+    low = -(-start_us // _US_PER_MINUTE)
+    day_low, day_high = day_limits()
+    return max(low, day_low), min(low + minutes - 1, day_high, MINUTES_PER_DAY - 1)
+
+
+class NextTakingsWindow:
+    """
+    Intake times (minutes of day) that are active or upcoming at one moment, considering:
+    - Daily time limits (TIME_DAY_START/END)
+    - Active intake grace period (INTAKE_WINDOW)
+    - Upcoming intake window (NEXT_TAKINGS_PERIOD)
+    Windows crossing midnight are cut off at it: an intake whose grace period ends after midnight
+    is never active, and nothing is upcoming once the upcoming window ends after midnight.
+    """
+
+    def __init__(self, now: datetime, plans: DailyPlanTable = daily_plans) -> None:
+        self._plans = plans
+        self._ranges = self._build_ranges(_time_to_us(now.time()))
+
+    def contains(self, minute: int) -> bool:
+        return any(low <= minute <= high for low, high in self._ranges)
+
+    def select(self, frequency: int) -> DailyPlan:
+        """Active or upcoming intake times of the daily plan for `frequency`, in plan order."""
+        return self._plans.select(frequency, self._ranges)
+
+    @staticmethod
+    def _build_ranges(now_us: int) -> List[MinuteRange]:
+        now_floor, now_ceil = now_us // _US_PER_MINUTE, -(-now_us // _US_PER_MINUTE)
+        intake_window = settings.INTAKE_WINDOW % MINUTES_PER_DAY
+        upper_limit_us = (now_us + settings.NEXT_TAKINGS_PERIOD * _US_PER_MINUTE) % _US_PER_DAY
+        ranges = [
+            # active: taken no later than now and the grace period (not crossing midnight) is not over
+            (now_ceil - intake_window, min(now_floor, MINUTES_PER_DAY - 1 - intake_window)),
+            # upcoming: from now to the end of the upcoming window
+            (now_ceil, upper_limit_us // _US_PER_MINUTE),
+        ]
+        day_low, day_high = day_limits()
+
+        merged: List[MinuteRange] = []
+        for low, high in ranges:
+            low, high = max(low, day_low), min(high, day_high)
+            if low > high:
+                continue
+            if merged and low <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+            else:
+                merged.append((low, high))
+        return merged
@@ -0,0 +1,238 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from aibolit.core.logger import get_logger
+from aibolit.services.daily_plans import MAX_FREQUENCY, MIN_FREQUENCY, DailyPlan, DailyPlanTable, daily_plans
+from aibolit.services.next_takings import NextTakings, NextTakingsWindow
+
+logger = get_logger(__name__)
+
+# subscribed users whose next takings are rebuilt between two yields to the event loop
+REFRESH_BATCH_SIZE = 1000
+
+# the day and the times the window selects for every frequency, all next takings follow from it
+WindowKey = Tuple[date, Tuple[DailyPlan, ...]]
+
+
+class SubscribedSchedule(NamedTuple):
+    id: int
+    medication_name: str
+    frequency: int
+    start_date: date
+    end_date: Optional[date]
+
+
+ScheduleLoader = Callable[[int], Awaitable[Sequence[SubscribedSchedule]]]
+
+
+def window_key(now: datetime, plans: DailyPlanTable = daily_plans) -> WindowKey:
+    window = NextTakingsWindow(now, plans)
+    return now.date(), tuple(window.select(frequency) for frequency in range(MIN_FREQUENCY, MAX_FREQUENCY + 1))
+
+
+def next_takings(schedules: Dict[int, SubscribedSchedule], key: WindowKey) -> NextTakings:
+    """Next takings of `schedules` active on the day of `key`, in the order of `schedules`."""
+    today, selected = key
+    return tuple(
+        (schedule.id, schedule.medication_name, times)
+        for schedule in schedules.values()
+        if schedule.start_date <= today
+        and (schedule.end_date is None or schedule.end_date >= today)
+        and (times := selected[schedule.frequency - MIN_FREQUENCY])
+    )
+
+
+class NextTakingsSubscription:
+    """
+    Next takings of one user for one subscriber, read with `async for`.
+    Only the latest update is held: one not consumed yet is replaced by the newer, so a slow
+    subscriber skips to the current next takings instead of queueing stale ones.
+    """
+
+    def __init__(self, user_id: int) -> None:
+        self.user_id = user_id
+        self.skipped = 0
+        self._latest: NextTakings = ()
+        self._ready = asyncio.Event()
+        self._closed = False
+
+    def push(self, update: NextTakings) -> None:
+        if self._ready.is_set():
+            self.skipped += 1
+        self._latest = update
+        self._ready.set()
+
+    def close(self) -> None:
+        self._closed = True
+        self._ready.set()
+
+    def __aiter__(self) -> "NextTakingsSubscription":
+        return self
+
+    async def __anext__(self) -> NextTakings:
+        await self._ready.wait()
+        if self._closed:
+            raise StopAsyncIteration
+        self._ready.clear()
+        return self._latest
+
+
+class _UserSubscriptions:
+    __slots__ = ("loading", "loaded", "schedules", "subscriptions", "last")
+
+    def __init__(self, loading: "asyncio.Future[Sequence[SubscribedSchedule]]") -> None:
+        self.loading = loading
+        self.loaded = False
+        self.schedules: Dict[int, SubscribedSchedule] = {}
+        self.subscriptions: Set[NextTakingsSubscription] = set()
+        self.last: NextTakings = ()
+
+
+class NextTakingsHub:
+    """
+    Pushes next takings to subscribers of their users, all of them on one clock.
+    Unexpired schedules of a subscribed user are loaded once, by its first subscriber, and kept
+    in memory until the last one leaves. Every minute one tick builds a single NextTakingsWindow:
+    next takings depend only on what it selects for each frequency and on the day, so they are
+    rebuilt only for the users with a schedule of a frequency whose selection changed, for all
+    of them when the day changes (schedules start or expire), and pushed only to the subscribers
+    whose next takings differ. Schedules created in this process are pushed right away, see add_schedule.
+    The clock runs only while somebody is subscribed.
+    """
+
+    def __init__(self, plans: DailyPlanTable = daily_plans, clock: Optional[Callable[[], datetime]] = None) -> None:
+        self._plans = plans
+        self._clock = clock
+        self._users: Dict[int, _UserSubscriptions] = {}
+        # frequency -> users with a schedule of that frequency, by user_id
+        self._by_frequency: List[Dict[int, _UserSubscriptions]] = [{} for _ in range(MAX_FREQUENCY + 1)]
+        self._key: Optional[WindowKey] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def user_count(self) -> int:
+        return len(self._users)
+
+    @property
+    def subscription_count(self) -> int:
+        return sum(len(user.subscriptions) for user in self._users.values())
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int, load: ScheduleLoader) -> AsyncIterator[NextTakingsSubscription]:
+        """
+        Subscription to the next takings of the user, whose first update is the current next takings.
+        `load` reads the unexpired schedules of the user if nobody is subscribed to them yet.
+        """
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _UserSubscriptions(asyncio.ensure_future(load(user_id)))
+        subscription = NextTakingsSubscription(user_id)
+        user.subscriptions.add(subscription)
+        try:
+            try:
+                # shielded: the subscriber that started the load may leave before the others
+                schedules = await asyncio.shield(user.loading)
+            except Exception:
+                if self._users.get(user_id) is user:
+                    del self._users[user_id]
+                raise
+            if self._task is None or self._task.done():
+                # next takings follow the window of the last tick, stale if the clock stopped
+                self._key = window_key(self._now(), self._plans)
+                self._task = asyncio.create_task(self._run())
+            if not user.loaded:
+                # schedules created while loading are already there and are kept
+                user.schedules = {schedule.id: schedule for schedule in sorted(schedules)} | user.schedules
+                user.last = next_takings(user.schedules, self._key)
+                user.loaded = True
+                for schedule in user.schedules.values():
+                    self._by_frequency[schedule.frequency][user_id] = user
+            subscription.push(user.last)
+            yield subscription
+        finally:
+            subscription.close()
+            user.subscriptions.discard(subscription)
+            if not user.subscriptions and self._users.get(user_id) is user:
+                del self._users[user_id]
+                for schedule in user.schedules.values():
+                    self._by_frequency[schedule.frequency].pop(user_id, None)
+            if not self._users and self._task is not None:
+                # the clock stops with the last subscriber, the next one starts it again
+                self._task.cancel()
+                self._task = None
+
+    async def stop(self) -> None:
+        """End every subscription and stop the clock, on shutdown."""
+        for user in self._users.values():
+            for subscription in user.subscriptions:
+                subscription.close()
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def add_schedule(self, user_id: int, schedule: SubscribedSchedule) -> None:
+        """Push a newly created schedule to the subscribers of its user, a no-op without any."""
+        user = self._users.get(user_id)
+        if user is None:
+            return
+        user.schedules[schedule.id] = schedule
+        if user.loaded:
+            self._by_frequency[schedule.frequency][user_id] = user
+            self._publish(user, self._key)
+
+    async def refresh(self, now: datetime) -> int:
+        """Push the next takings that changed by `now`, returns the number of subscriptions pushed to."""
+        key = window_key(now, self._plans)
+        previous, self._key = self._key, key
+        if key == previous:
+            return 0
+        users: List[_UserSubscriptions]
+        if previous is None or previous[0] != key[0]:
+            users = list(self._users.values())
+        else:
+            changed: Dict[int, _UserSubscriptions] = {}
+            for frequency, (was, selected) in enumerate(zip(previous[1], key[1]), MIN_FREQUENCY):
+                if was != selected:
+                    changed.update(self._by_frequency[frequency])
+            users = list(changed.values())
+        pushed = 0
+        for start in range(0, len(users), REFRESH_BATCH_SIZE):
+            for user in users[start : start + REFRESH_BATCH_SIZE]:
+                if user.loaded:
+                    pushed += self._publish(user, key)
+            await asyncio.sleep(0)
+        return pushed
+
+    def _now(self) -> datetime:
+        return self._clock() if self._clock else datetime.now()
+
+    def _publish(self, user: _UserSubscriptions, key: WindowKey) -> int:
+        update = next_takings(user.schedules, key)
+        if update == user.last:
+            return 0
+        user.last = update
+        for subscription in user.subscriptions:
+            subscription.push(update)
+        return len(user.subscriptions)
+
+    async def _run(self) -> None:
+        while True:
+            now = self._now()
+            await asyncio.sleep(60 - now.second - now.microsecond / 1_000_000)
+            try:
+                pushed = await self.refresh(self._now())
+            except Exception:
+                logger.exception("Next takings refresh failed")
+                continue
+            if pushed:
+                logger.info("Next takings pushed", subscriptions=pushed, users=len(self._users))
+
+
+next_takings_hub = NextTakingsHub()
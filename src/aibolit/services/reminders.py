@@ -0,0 +1,220 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from sys import intern
+from typing import Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from aibolit.core.config import settings
+from aibolit.core.database import SessionLocal
+from aibolit.core.logger import get_logger
+from aibolit.repositories.schedules import ScheduleRepo
+from aibolit.services.daily_plans import DailyPlanTable, PlanMinutes, daily_plans
+from aibolit.services.next_takings import MINUTES_PER_DAY, DueIntake
+
+logger = get_logger(__name__)
+
+ReminderCallback = Callable[[List[DueIntake]], Awaitable[None]]
+
+_MINUTE_TIMES = tuple(intern(f"{minute // 60:02d}:{minute % 60:02d}") for minute in range(MINUTES_PER_DAY))
+
+
+class ReminderSchedule(NamedTuple):
+    id: int
+    user_id: int
+    frequency: int
+    start_date: date
+    end_date: Optional[date]
+
+
+class ReminderWheel:
+    """
+    Two-level timing wheel of intake slots.
+    The minute wheel has one slot per minute of day (schedule_id -> user_id) and turns every day.
+    The day wheel holds schedules that start later and expirations, keyed by date, and cascades them
+    into/out of the minute wheel when the day comes. Insert and cancel cost O(frequency),
+    a minute tick costs O(intakes due at that minute).
+    Slots follow the daily plans at the time a schedule is added.
+    """
+
+    def __init__(self, today: date, plans: DailyPlanTable = daily_plans) -> None:
+        self._today = today
+        self._plans = plans
+        self._minutes: List[Dict[int, int]] = [{} for _ in range(MINUTES_PER_DAY)]
+        # schedule_id -> (user_id, minutes of its slots)
+        self._slotted: Dict[int, Tuple[int, PlanMinutes]] = {}
+        self._starting: Dict[date, Dict[int, ReminderSchedule]] = {}
+        self._expiring: Dict[date, Dict[int, None]] = {}
+        # schedule_id -> (start date it is parked under, date it expires on)
+        self._days_by_schedule: Dict[int, Tuple[Optional[date], Optional[date]]] = {}
+        self._slot_count = 0
+
+    def __len__(self) -> int:
+        return self._slot_count
+
+    @property
+    def schedule_count(self) -> int:
+        return len(self._days_by_schedule)
+
+    def add(self, schedule: ReminderSchedule) -> None:
+        """Add or replace a schedule."""
+        self.cancel(schedule.id)
+        if schedule.end_date and schedule.end_date < self._today:
+            return
+        expires_on = schedule.end_date + timedelta(days=1) if schedule.end_date else None
+        if expires_on:
+            self._expiring.setdefault(expires_on, {})[schedule.id] = None
+        if schedule.start_date > self._today:
+            self._starting.setdefault(schedule.start_date, {})[schedule.id] = schedule
+            self._days_by_schedule[schedule.id] = (schedule.start_date, expires_on)
+            return
+        self._days_by_schedule[schedule.id] = (None, expires_on)
+        self._slot(schedule)
+
+    def cancel(self, schedule_id: int) -> None:
+        days = self._days_by_schedule.pop(schedule_id, None)
+        if days is None:
+            return
+        starts_on, expires_on = days
+        if starts_on:
+            del self._starting[starts_on][schedule_id]
+        if expires_on:
+            del self._expiring[expires_on][schedule_id]
+        self._unslot(schedule_id)
+
+    def due(self, minute: int) -> List[DueIntake]:
+        time_str = _MINUTE_TIMES[minute]
+        return [(user_id, schedule_id, time_str) for schedule_id, user_id in self._minutes[minute].items()]
+
+    def due_batches(self, minute: int, batch_size: int) -> Iterator[List[DueIntake]]:
+        """Intakes due at `minute` in batches, from a snapshot of the slot taken on the first batch."""
+        time_str = _MINUTE_TIMES[minute]
+        slot = self._minutes[minute]
+        # two flat lists instead of items(): no per-entry tuples for the garbage collector to scan
+        schedule_ids, user_ids = list(slot), list(slot.values())
+        for start in range(0, len(schedule_ids), batch_size):
+            end = start + batch_size
+            yield [
+                (user_id, schedule_id, time_str)
+                for schedule_id, user_id in zip(schedule_ids[start:end], user_ids[start:end])
+            ]
+
+    def advance_day(self, today: date) -> None:
+        """Turn the day wheel up to `today`: expire ended schedules and slot the ones starting."""
+        day = self._today
+        while day < today:
+            day += timedelta(days=1)
+            for schedule_id in self._expiring.pop(day, {}):
+                del self._days_by_schedule[schedule_id]
+                self._unslot(schedule_id)
+            for schedule in self._starting.pop(day, {}).values():
+                self._days_by_schedule[schedule.id] = (None, self._days_by_schedule[schedule.id][1])
+                self._slot(schedule)
+        self._today = today
+
+    def _slot(self, schedule: ReminderSchedule) -> None:
+        minutes = self._plans.minutes(schedule.frequency)
+        for minute in minutes:
+            self._minutes[minute][schedule.id] = schedule.user_id
+        self._slotted[schedule.id] = (schedule.user_id, minutes)
+        self._slot_count += len(minutes)
+
+    def _unslot(self, schedule_id: int) -> None:
+        slotted = self._slotted.pop(schedule_id, None)
+        if slotted is None:
+            return
+        _, minutes = slotted
+        for minute in minutes:
+            self._minutes[minute].pop(schedule_id, None)
+        self._slot_count -= len(minutes)
+
+
+async def log_due_reminders(intakes: List[DueIntake]) -> None:
+    logger.info("Reminders due", count=len(intakes))
+
+
+class ReminderScheduler:
+    """
+    Keeps a ReminderWheel of all unexpired schedules and calls `callback` with batches of intakes
+    when their time comes. Runs in-process on the event loop, one tick per minute.
+    Every process running it fires every reminder, so it must run in exactly one process of the deployment.
+    """
+
+    def __init__(self, callback: ReminderCallback = log_due_reminders) -> None:
+        self._callback = callback
+        self._wheel: Optional[ReminderWheel] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        now = datetime.now()
+        wheel = ReminderWheel(now.date())
+        async with SessionLocal() as session:
+            schedules = ScheduleRepo(session).stream_unexpired_schedules(
+                now.date(), settings.DUE_INTAKES_SWEEP_BATCH_SIZE
+            )
+            async for rows in schedules:
+                for row in rows:
+                    wheel.add(ReminderSchedule(*row))
+        self._wheel = wheel
+        self._task = asyncio.create_task(self._run(now.date(), now.hour * 60 + now.minute))
+        logger.info("Reminder scheduler started", schedules=wheel.schedule_count, slots=len(wheel))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task, self._wheel = None, None
+        logger.info("Reminder scheduler stopped")
+
+    def add_schedule(self, schedule: ReminderSchedule) -> None:
+        """Slot a newly created schedule, a no-op unless the scheduler is running."""
+        if self._wheel is not None:
+            self._wheel.add(schedule)
+
+    async def _run(self, day: date, minute: int) -> None:
+        # `minute` is the last one handled: intakes of the minute the scheduler started in are not sent
+        while True:
+            now = datetime.now()
+            await asyncio.sleep(60 - now.second - now.microsecond / 1_000_000)
+            day, minute = await self._tick(day, minute, datetime.now())
+
+    async def _tick(self, day: date, minute: int, now: datetime) -> Tuple[date, int]:
+        """Fire the minutes after `minute` of `day` up to `now`, the rest of `day` first when `now` is later."""
+        if now.date() != day:
+            minute = await self._fire_until(minute, MINUTES_PER_DAY - 1)
+            try:
+                self._wheel.advance_day(now.date())
+            except Exception:
+                # tried again on the next tick, the minutes of the new day wait until then
+                logger.exception("Reminder day not advanced", day=now.date().isoformat())
+                return day, minute
+            day, minute = now.date(), -1
+        return day, await self._fire_until(minute, now.hour * 60 + now.minute)
+
+    async def _fire_until(self, minute: int, last: int) -> int:
+        for due_minute in range(minute + 1, last + 1):
+            await self._fire(due_minute)
+        return max(minute, last)
+
+    async def _fire(self, minute: int) -> None:
+        try:
+            batches = self._wheel.due_batches(minute, settings.DUE_INTAKES_SWEEP_BATCH_SIZE)
+            for batch in batches:
+                try:
+                    await self._callback(batch)
+                except Exception:
+                    logger.exception("Reminder callback failed", minute=_MINUTE_TIMES[minute])
+                # every plan starts and ends at the same times, let requests through between big batches
+                await asyncio.sleep(0)
+        except Exception:
+            # the minute is skipped, the loop keeps going
+            logger.exception("Reminder minute not fired", minute=_MINUTE_TIMES[minute])
+
+
+reminder_scheduler = ReminderScheduler()
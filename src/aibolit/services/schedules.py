@@ -1,44 +1,122 @@
-from datetime import date, datetime, timedelta
-from typing import List
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional, Sequence, Union
 from aibolit.core.logger import get_logger
+from aibolit.core.tracing import span, traced
 from aibolit.models.schedules import MedicationScheduleOrm
 from aibolit.repositories.schedules import ScheduleRepo
+from aibolit.services.daily_plans import MAX_FREQUENCY, daily_plans
+from aibolit.services.mappers import make_row_mapper
+from aibolit.services.next_takings import DueIntake, NextTakings, NextTakingsWindow, due_range
+from aibolit.services.next_takings_hub import NextTakingsHub, SubscribedSchedule, next_takings_hub
+from aibolit.services.reminders import ReminderSchedule, reminder_scheduler
 
 from aibolit.schemas.openapi_generated import (
     # from aibolit.schemas.schedules import (
     MedicationSchedule,
+    MedicationScheduleCompact,
     MedicationScheduleCreateRequest,
     MedicationScheduleCreateResponse,
     MedicationScheduleIdsResponse,
+    MedicationSchedulesCreateResponse,
     NextTakingsMedications,
+    NextTakingsMedicationsCompact,
+    NextTakingsMedicationsCompactResponse,
     NextTakingsMedicationsResponse,
 )
 from aibolit.core.config import settings
-from aibolit.core.exceptions import ScheduleExpiredError, ScheduleNotFoundError, ScheduleNotStartedError
+from aibolit.core.exceptions import (
+    ScheduleBatchUserError,
+    ScheduleExpiredError,
+    ScheduleNotFoundError,
+    ScheduleNotStartedError,
+    UserNotFoundError,
+)
 
 logger = get_logger(__name__)
+hot_logger = get_logger(__name__, hot=True)
+
+schedule_mapper = make_row_mapper(MedicationSchedule, computed=("daily_plan",))
+compact_schedule_mapper = make_row_mapper(MedicationScheduleCompact, computed=("daily_plan_minutes",))
 
 
 class ScheduleService:
-    def __init__(self, schedules_repo: ScheduleRepo) -> None:
+    def __init__(self, schedules_repo: ScheduleRepo, next_takings: NextTakingsHub = next_takings_hub) -> None:
         self._schedules_repo = schedules_repo
+        self._next_takings = next_takings
 
+    @traced()
     async def create_schedule(self, schedule: MedicationScheduleCreateRequest) -> MedicationScheduleCreateResponse:
         logger.info("Creating schedule", user_id=schedule.user_id)
-        schedule = await self._schedules_repo.create_schedule(schedule)
-        logger.info(f"Schedule created with id={schedule.id}, for user={schedule.user_id}")
-        return MedicationScheduleCreateResponse(schedule_id=schedule.id)
+        db_schedule = await self._schedules_repo.create_schedule(schedule)
+        if db_schedule is None:
+            logger.warning("User not found", user_id=schedule.user_id)
+            raise UserNotFoundError(schedule.user_id)
+        logger.info("Schedule created", schedule_id=db_schedule.id, user_id=db_schedule.user_id)
+        self._schedule_created(db_schedule, schedule)
+        return MedicationScheduleCreateResponse(schedule_id=db_schedule.id)
+
+    @traced()
+    async def create_schedules(
+        self, schedules: Sequence[MedicationScheduleCreateRequest]
+    ) -> MedicationSchedulesCreateResponse:
+        """Create a batch of schedules of one user, see batch_user_id. IDs follow the order of `schedules`."""
+        user_id = self.batch_user_id(schedules)
+        logger.info("Creating schedules", user_id=user_id, count=len(schedules))
+        db_schedules = await self._schedules_repo.create_schedules(schedules)
+        if db_schedules is None:
+            logger.warning("User not found", user_id=user_id)
+            raise UserNotFoundError(user_id)
+        logger.info("Schedules created", user_id=user_id, count=len(db_schedules))
+        for db_schedule, schedule in zip(db_schedules, schedules):
+            self._schedule_created(db_schedule, schedule)
+        return MedicationSchedulesCreateResponse(
+            user_id=user_id, schedule_ids=[db_schedule.id for db_schedule in db_schedules]
+        )
+
+    def _schedule_created(self, db_schedule, schedule: MedicationScheduleCreateRequest) -> None:
+        reminder_scheduler.add_schedule(ReminderSchedule(*db_schedule))
+        self._next_takings.add_schedule(
+            db_schedule.user_id,
+            SubscribedSchedule(
+                db_schedule.id,
+                schedule.medication_name,
+                db_schedule.frequency,
+                db_schedule.start_date,
+                db_schedule.end_date,
+            ),
+        )
 
+    @staticmethod
+    def batch_user_id(schedules: Sequence[MedicationScheduleCreateRequest]) -> int:
+        """The user of a non-empty batch; raises ScheduleBatchUserError listing the schedules of other users."""
+        user_id = schedules[0].user_id
+        indexes = [index for index, schedule in enumerate(schedules) if schedule.user_id != user_id]
+        if indexes:
+            raise ScheduleBatchUserError(user_id, indexes)
+        return user_id
+
+    @traced()
     async def get_all_user_schedules(self, user_id: int) -> MedicationScheduleIdsResponse:
-        logger.info("Fetching all schedules for user", user_id=user_id)
-        db_schedules = await self._schedules_repo.get_all_user_schedules(user_id)
-        schedules_with_plan = self._schedules_with_plan(db_schedules)
-        schedules = [schedule.id for schedule in schedules_with_plan]
-        logger.info("Fetched user schedules", user_id=user_id, schedule_count=len(schedules))
+        hot_logger.info("Fetching all schedules for user", user_id=user_id)
+        schedules = list(await self._schedules_repo.get_all_user_schedule_ids(user_id))
+        hot_logger.info("Fetched user schedules", user_id=user_id, schedule_count=len(schedules))
         return MedicationScheduleIdsResponse(user_id=user_id, schedules=schedules)
 
-    async def get_user_schedule(self, user_id: int, schedule_id: int) -> MedicationSchedule:
-        logger.info("Fetching schedule", user_id=user_id, schedule_id=schedule_id)
+    @traced()
+    async def get_user_schedule(
+        self, user_id: int, schedule_id: int, compact: bool = False
+    ) -> Union[MedicationSchedule, MedicationScheduleCompact]:
+        """The schedule with its daily plan, as minutes of day instead of "HH:MM" strings if `compact`."""
+        db_schedule = await self.get_user_schedule_row(user_id, schedule_id)
+        if compact:
+            daily_plan_minutes = list(daily_plans.minutes(db_schedule.frequency))
+            return compact_schedule_mapper(db_schedule, daily_plan_minutes=daily_plan_minutes)
+        return self._one_schedule_with_plan(db_schedule)
+
+    @traced()
+    async def get_user_schedule_row(self, user_id: int, schedule_id: int) -> MedicationScheduleOrm:
+        """The schedule row checked as in get_user_schedule, for transports that map it themselves."""
+        hot_logger.info("Fetching schedule", user_id=user_id, schedule_id=schedule_id)
         db_schedule = await self._schedules_repo.get_user_schedule(schedule_id, user_id)
         if not db_schedule:
             logger.warning("Schedule not found", user_id=user_id, schedule_id=schedule_id)
@@ -48,71 +126,80 @@ class ScheduleService:
             raise ScheduleExpiredError(db_schedule.medication_name, db_schedule.end_date)
         if db_schedule.start_date > date.today():
             raise ScheduleNotStartedError(db_schedule.medication_name, db_schedule.start_date)
-        schedule = self._one_schedule_with_plan(db_schedule)
-        return schedule
+        return db_schedule
 
-    async def get_user_next_takings(self, user_id: int) -> NextTakingsMedicationsResponse:
-        logger.info("Fetching next takings", user_id=user_id)
-        user_db_schedules = await self._schedules_repo.get_all_user_schedules(user_id)
-        schedules = self._schedules_with_plan(user_db_schedules)
+    @traced()
+    async def get_user_next_takings(
+        self, user_id: int, compact: bool = False
+    ) -> Union[NextTakingsMedicationsResponse, NextTakingsMedicationsCompactResponse]:
+        """Next takings of the user, with intake times as minutes of day instead of "HH:MM" strings if `compact`."""
+        if compact:
+            compact_next_takings = [
+                NextTakingsMedicationsCompact(
+                    schedule_id=schedule_id,
+                    schedule_name=schedule_name,
+                    schedule_minutes=list(daily_plans.minutes_of(schedule_times)),
+                )
+                for schedule_id, schedule_name, schedule_times in await self.get_user_next_taking_rows(user_id)
+            ]
+            return NextTakingsMedicationsCompactResponse(user_id=user_id, next_takings=compact_next_takings)
         next_takings = [
             NextTakingsMedications(
-                schedule_id=next_taking.id,
-                schedule_name=next_taking.medication_name,
-                schedule_times=list(filter(self._is_within_timeframe, next_taking.daily_plan)),
+                schedule_id=schedule_id, schedule_name=schedule_name, schedule_times=list(schedule_times)
             )
-            for next_taking in schedules
-            if any(map(self._is_within_timeframe, next_taking.daily_plan))
+            for schedule_id, schedule_name, schedule_times in await self.get_user_next_taking_rows(user_id)
         ]
-        logger.info("Next takings determined", user_id=user_id, count=len(next_takings))
         return NextTakingsMedicationsResponse(user_id=user_id, next_takings=next_takings)
 
-    def _schedules_with_plan(self, db_schedules: List[MedicationScheduleOrm]) -> List[MedicationSchedule]:
-        return [self._one_schedule_with_plan(db_schedule) for db_schedule in db_schedules]
+    @traced()
+    async def get_user_next_taking_rows(self, user_id: int) -> NextTakings:
+        """Next takings as plain tuples, for transports that map them themselves."""
+        hot_logger.info("Fetching next takings", user_id=user_id)
+        user_db_schedules = await self._schedules_repo.get_all_user_schedules(user_id)
+        with span("select next takings", schedules=len(user_db_schedules)):
+            window = NextTakingsWindow(datetime.now())
+            next_takings = tuple(
+                (db_schedule.id, db_schedule.medication_name, schedule_times)
+                for db_schedule in user_db_schedules
+                if (schedule_times := window.select(db_schedule.frequency))
+            )
+        hot_logger.info("Next takings determined", user_id=user_id, count=len(next_takings))
+        return next_takings
 
-    def _one_schedule_with_plan(self, db_schedule) -> MedicationSchedule:
-        daily_plan = self._generate_daily_plan(db_schedule.frequency)
-        schedule = MedicationSchedule(**db_schedule.__dict__, daily_plan=daily_plan)
-        return MedicationSchedule.model_validate(schedule)
+    @traced()
+    async def get_subscribed_schedules(self, user_id: int) -> List[SubscribedSchedule]:
+        """Unexpired schedules of the user, including the ones that start later, for next takings subscriptions."""
+        db_schedules = await self._schedules_repo.get_unexpired_user_schedules(user_id, date.today())
+        return [SubscribedSchedule(*db_schedule) for db_schedule in db_schedules]
 
-    def _generate_daily_plan(self, frequency: int) -> List[str]:
+    async def sweep_due_intakes(
+        self, start: datetime, minutes: int, batch_size: Optional[int] = None
+    ) -> AsyncIterator[List[DueIntake]]:
         """
-        Generate a list of time strings ("HH:MM") representing medication intake times.
-        Times are evenly distributed between TIME_DAY_START and TIME_DAY_END (from settings),
-        each rounded up to the nearest TIME_ROUNDING_INTERVAL.
+        Yield batches of intakes due within [start, start + `minutes`) for all users, reading every
+        schedule active on that day in one streaming pass instead of one query per user.
+        The window is cut off at midnight. Batches hold at most `batch_size` intakes.
         """
-        start_day = datetime.combine(date.today(), settings.TIME_DAY_START)
-        end_day = datetime.combine(date.today(), settings.TIME_DAY_END)
-        if frequency == 1:
-            return [start_day.strftime("%H:%M")]
-        interval = (end_day - start_day) / (frequency - 1)
-        times = [self._round_to_next_interval(start_day + i * interval).strftime("%H:%M") for i in range(frequency)]
-        return times
-
-    @staticmethod
-    def _round_to_next_interval(dt: datetime) -> datetime:
-        interval = settings.TIME_ROUNDING_INTERVAL
-        minutes = dt.minute
-        rounded_minutes = (minutes + (interval - 1)) // interval * interval
-        if rounded_minutes == 60:
-            return dt.replace(minute=0, second=0) + timedelta(hours=1)
-        return dt.replace(minute=rounded_minutes, second=0)
+        batch_size = batch_size or settings.DUE_INTAKES_SWEEP_BATCH_SIZE
+        # plans depend only on the frequency, so due times are picked once per frequency for the whole sweep
+        window = [due_range(start, minutes)]
+        due_by_frequency = [daily_plans.select(frequency, window) for frequency in range(MAX_FREQUENCY + 1)]
+        logger.info("Sweeping due intakes", start=start.isoformat(), minutes=minutes)
+        batch: List[DueIntake] = []
+        total = 0
+        async for rows in self._schedules_repo.stream_active_schedules(start.date(), batch_size):
+            for schedule_id, user_id, frequency in rows:
+                for time_str in due_by_frequency[frequency]:
+                    batch.append((user_id, schedule_id, time_str))
+                while len(batch) >= batch_size:
+                    yield batch[:batch_size]
+                    total += batch_size
+                    batch = batch[batch_size:]
+        if batch:
+            yield batch
+            total += len(batch)
+        logger.info("Due intakes swept", start=start.isoformat(), minutes=minutes, count=total)
 
-    @staticmethod
-    def _is_within_timeframe(time_str: str) -> bool:
-        """Check if medication intake time is within allowed timeframe considering:
-        - Daily time limits (TIME_DAY_START/END)
-        - Active intake grace period (INTAKE_WINDOW)
-        - Upcoming intake window (NEXT_TAKINGS_PERIOD)
-        """
-        current_datetime = datetime.now()
-        current_time = current_datetime.time()
-        target_datetime = datetime.strptime(time_str, "%H:%M")
-        window_end_time = (target_datetime + timedelta(minutes=settings.INTAKE_WINDOW)).time()
-        time_upper_limit = (current_datetime + timedelta(minutes=settings.NEXT_TAKINGS_PERIOD)).time()
-        target_time = target_datetime.time()
-
-        is_within_day_limits = settings.TIME_DAY_START <= target_time <= settings.TIME_DAY_END
-        is_upcoming = current_time <= target_time <= time_upper_limit
-        is_active = target_time <= current_time <= window_end_time
-        return is_within_day_limits and (is_upcoming or is_active)
+    def _one_schedule_with_plan(self, db_schedule) -> MedicationSchedule:
+        daily_plan = list(daily_plans.get(db_schedule.frequency))
+        return schedule_mapper(db_schedule, daily_plan=daily_plan)
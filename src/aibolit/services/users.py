@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import AsyncIterator, List, Optional, Sequence
 
 
 from aibolit.repositories.users import UserRepo
@@ -6,22 +6,43 @@ from aibolit.repositories.users import UserRepo
 # from aibolit.schemas.users import User, UserCreateRequest
 from aibolit.schemas.openapi_generated import UserCreateResponse as User, UserCreateRequest
 from aibolit.core.logger import get_logger
+from aibolit.core.tracing import traced
 
 logger = get_logger(__name__)
+hot_logger = get_logger(__name__, hot=True)
 
 
 class UserService:
     def __init__(self, users_repo: UserRepo) -> None:
         self._users_repo = users_repo
 
+    @traced()
     async def create_user(self, user: UserCreateRequest) -> int:
         logger.info("Creating user")
-        db_user = await self._users_repo.create_user(user)
-        logger.info(f"User with id={db_user.id} was created")
-        return db_user.id
+        user_id = await self._users_repo.create_user(user)
+        logger.info("User created", user_id=user_id)
+        return user_id
 
+    @traced()
     async def get_user_by_id(self, user_id: int) -> Optional[User]:
-        logger.info(f"Get user with id={user_id}")
+        hot_logger.info("Fetching user", user_id=user_id)
         db_user = await self._users_repo.get_user_by_id(user_id)
         user = User.model_validate(db_user.__dict__) if db_user else None
         return user
+
+    @traced()
+    async def get_user_ids(self, after_id: int, page_size: int) -> List[int]:
+        hot_logger.info("Fetching users page", after_id=after_id, page_size=page_size)
+        user_ids = list(await self._users_repo.get_user_ids(after_id, page_size))
+        hot_logger.info("Fetched users page", after_id=after_id, count=len(user_ids))
+        return user_ids
+
+    @traced()
+    async def stream_user_ids(self, after_id: int, batch_size: int) -> AsyncIterator[Sequence[int]]:
+        """IDs of the users with id > `after_id` in id order, `batch_size` at a time, in constant memory."""
+        logger.info("Streaming users", after_id=after_id, batch_size=batch_size)
+        count = 0
+        async for user_ids in self._users_repo.stream_user_ids(after_id, batch_size):
+            count += len(user_ids)
+            yield user_ids
+        logger.info("Users streamed", after_id=after_id, count=count)
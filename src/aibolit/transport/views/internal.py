@@ -0,0 +1,57 @@
+import hmac
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from aibolit.core.config import settings
+from aibolit.core.database import engine
+from aibolit.core.metrics import registry
+from aibolit.core.pool_stats import pool_stats
+from aibolit.core.profiling import profiler
+
+metrics_router = APIRouter(include_in_schema=False)
+
+
+def _bearer_token(authorization: Optional[str]) -> Optional[bytes]:
+    scheme, _, token = (authorization or "").partition(" ")
+    return token.encode() if scheme.lower() == "bearer" else None
+
+
+def require_internal_token(authorization: Optional[str] = Header(None)) -> None:
+    """Lets through only requests with an "Authorization: Bearer <INTERNAL_TOKEN>" header, none if it is not set."""
+    token, expected = _bearer_token(authorization), settings.INTERNAL_TOKEN.encode()
+    if token is None or not expected or not hmac.compare_digest(token, expected):
+        raise HTTPException(403, "A valid INTERNAL_TOKEN is required")
+
+
+def require_profile_token(authorization: Optional[str] = Header(None)) -> None:
+    """Lets through only requests with an "Authorization: Bearer <PROFILE_TOKEN>" header, none if it is not set."""
+    if not profiler.authorized(_bearer_token(authorization)):
+        raise HTTPException(403, "A valid PROFILE_TOKEN is required")
+
+
+router = APIRouter(prefix="/internal", include_in_schema=False)
+
+
+@router.get("/pool", dependencies=[Depends(require_internal_token)])
+async def get_pool_stats() -> Dict[str, Any]:
+    return pool_stats(engine)
+
+
+@router.get("/profiles", dependencies=[Depends(require_profile_token)])
+async def get_profiles() -> List[Dict[str, Any]]:
+    return [profile._asdict() for profile in profiler.recent()]
+
+
+@router.get("/profiles/{trace_id}", response_class=PlainTextResponse, dependencies=[Depends(require_profile_token)])
+def get_profile(trace_id: str) -> PlainTextResponse:
+    folded = profiler.read(trace_id)
+    if folded is None:
+        raise HTTPException(404, f"No profile of trace {trace_id}")
+    return PlainTextResponse(folded)
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,15 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Union
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from typing_extensions import Annotated
-from aibolit.core.dependencies import get_user_service, get_schedule_service
-from aibolit.core.exceptions import ScheduleNotFoundError, ScheduleNotStartedError, ScheduleExpiredError
-from aibolit.services.users import UserService
+from aibolit.core.config import settings
+from aibolit.core.dependencies import get_schedule_service
+from aibolit.core.tracing import traced
+from aibolit.core.exceptions import (
+    ScheduleBatchUserError,
+    ScheduleNotFoundError,
+    ScheduleNotStartedError,
+    ScheduleExpiredError,
+    UserNotFoundError,
+)
 
 # from aibolit.schemas.schedules import (
 from aibolit.schemas.openapi_generated import (
     MedicationScheduleCreateResponse,
     MedicationScheduleCreateRequest,
     MedicationScheduleIdsResponse,
+    MedicationSchedulesCreateResponse,
     MedicationSchedule,
+    MedicationScheduleCompact,
+    NextTakingsMedicationsCompactResponse,
     NextTakingsMedicationsResponse,
 )
 from aibolit.services.schedules import ScheduleService
@@ -18,19 +30,39 @@ router = APIRouter()
 
 
 @router.post("/schedule", status_code=201, response_model=MedicationScheduleCreateResponse)
+@traced()
 async def create_schedule(
     schedule: MedicationScheduleCreateRequest,
     schedule_service: Annotated[ScheduleService, Depends(get_schedule_service)],
-    user_service: Annotated[UserService, Depends(get_user_service)],
 ) -> MedicationScheduleCreateResponse:
-    user_exists = await user_service.get_user_by_id(schedule.user_id)
-    if not user_exists:
-        raise HTTPException(status_code=404, detail=f"User with id={schedule.user_id} not found")
-    schedule = await schedule_service.create_schedule(schedule)
-    return schedule
+    try:
+        return await schedule_service.create_schedule(schedule)
+    except UserNotFoundError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+
+@router.post("/schedules:batch", status_code=201, response_model=MedicationSchedulesCreateResponse)
+@traced()
+async def create_schedules(
+    schedules: Annotated[
+        List[MedicationScheduleCreateRequest], Body(min_length=1, max_length=settings.SCHEDULES_BATCH_MAX_SIZE)
+    ],
+    schedule_service: Annotated[ScheduleService, Depends(get_schedule_service)],
+) -> MedicationSchedulesCreateResponse:
+    try:
+        return await schedule_service.create_schedules(schedules)
+    except ScheduleBatchUserError as e:
+        detail = [
+            {"type": "value_error", "loc": ["body", index, "user_id"], "msg": str(e), "input": schedules[index].user_id}
+            for index in e.indexes
+        ]
+        raise HTTPException(status_code=e.status_code, detail=detail)
+    except UserNotFoundError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
 
 
 @router.get("/schedules", response_model=MedicationScheduleIdsResponse)
+@traced()
 async def get_all_schedules(
     user_id: int,
     schedule_service: Annotated[ScheduleService, Depends(get_schedule_service)],
@@ -38,23 +70,31 @@ async def get_all_schedules(
     return await schedule_service.get_all_user_schedules(user_id)
 
 
-@router.get("/schedule", response_model=MedicationSchedule)
+@router.get("/schedule", response_model=Union[MedicationSchedule, MedicationScheduleCompact])
+@traced()
 async def get_user_schedule(
     schedule_id: int,
     user_id: int,
     schedule_service: Annotated[ScheduleService, Depends(get_schedule_service)],
-) -> MedicationSchedule:
+    compact: Annotated[bool, Query(description="Daily plan as minutes of day instead of HH:MM")] = False,
+) -> Union[MedicationSchedule, MedicationScheduleCompact]:
     try:
-        user_schedule = await schedule_service.get_user_schedule(user_id=user_id, schedule_id=schedule_id)
+        user_schedule = await schedule_service.get_user_schedule(
+            user_id=user_id, schedule_id=schedule_id, compact=compact
+        )
         return user_schedule
     except (ScheduleExpiredError, ScheduleNotFoundError, ScheduleNotStartedError) as e:
         raise HTTPException(status_code=e.status_code, detail=str(e))
 
 
 #
-@router.get("/next_takings", response_model=NextTakingsMedicationsResponse)
+@router.get(
+    "/next_takings", response_model=Union[NextTakingsMedicationsResponse, NextTakingsMedicationsCompactResponse]
+)
+@traced()
 async def get_user_next_takings(
     user_id: int,
     schedule_service: Annotated[ScheduleService, Depends(get_schedule_service)],
-) -> NextTakingsMedicationsResponse:
-    return await schedule_service.get_user_next_takings(user_id)
+    compact: Annotated[bool, Query(description="Intake times as minutes of day instead of HH:MM")] = False,
+) -> Union[NextTakingsMedicationsResponse, NextTakingsMedicationsCompactResponse]:
+    return await schedule_service.get_user_next_takings(user_id, compact=compact)
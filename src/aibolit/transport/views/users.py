@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 from typing_extensions import Annotated
 
 from aibolit.core.dependencies import get_user_service
+from aibolit.core.tracing import traced
 from aibolit.services.users import UserService
 
 # from aibolit.schemas.users import UserCreateRequest, UserCreateResponse
@@ -11,6 +12,7 @@ router = APIRouter()
 
 
 @router.post("/users", status_code=201, response_model=UserCreateResponse)
+@traced()
 async def create_user(user: UserCreateRequest, user_service: Annotated[UserService, Depends(get_user_service)]):
     new_user_id = await user_service.create_user(user)
     return UserCreateResponse(id=new_user_id)
@@ -1,5 +1,8 @@
 import logging
+from contextlib import nullcontext
+from datetime import date, datetime, time
 import grpc
+import pytest
 import pytest_asyncio
 from httpx import AsyncClient
 from httpx import ASGITransport
@@ -12,6 +15,7 @@ from aibolit.core.database import Base, get_db
 from aibolit.repositories.schedules import ScheduleRepo
 from aibolit.repositories.users import UserRepo
 from aibolit.main import make_app
+from aibolit.services.next_takings_hub import NextTakingsHub
 from aibolit.services.users import UserService
 from aibolit.services.schedules import ScheduleService
 from aibolit.grpc.adapters.schedules import GrpcScheduleService
@@ -50,14 +54,23 @@ async def async_client(get_testing_db):
 
 
 @pytest_asyncio.fixture
-async def grpc_test_channel(get_testing_db: AsyncSession):
+async def next_takings_hub():
+    """A hub of the test's own, whose clock is stopped at 07:59:59 today."""
+    hub = NextTakingsHub(clock=lambda: datetime.combine(date.today(), time(7, 59, 59)))
+    yield hub
+    await hub.stop()
+
+
+@pytest_asyncio.fixture
+async def grpc_test_channel(get_testing_db: AsyncSession, next_takings_hub: NextTakingsHub):
     users_repo, schedules_repo = UserRepo(get_testing_db), ScheduleRepo(get_testing_db)
-    users_service, schedules_service = UserService(users_repo), ScheduleService(schedules_repo)
+    users_service = UserService(users_repo)
+    schedules_service = ScheduleService(schedules_repo, next_takings_hub)
 
     server = grpc.aio.server()
-    users_pb2_grpc.add_UserServiceServicer_to_server(GrpcUserService(users_service), server)
+    users_pb2_grpc.add_UserServiceServicer_to_server(GrpcUserService(lambda: nullcontext(users_service)), server)
     schedules_pb2_grpc.add_SchedulesServiceServicer_to_server(
-        GrpcScheduleService(schedules_service, users_service), server
+        GrpcScheduleService(lambda: nullcontext(schedules_service), next_takings_hub), server
     )
     port = server.add_insecure_port("[::]:0")
     await server.start()
@@ -80,6 +93,30 @@ async def stub_for_users(grpc_test_channel):
     return users_pb2_grpc.UserServiceStub(grpc_test_channel)
 
 
+class RecordingLogger:
+    """Stands in for the structlog logger of a module, records the event and fields of calls at every level."""
+
+    def __init__(self):
+        self.events = []
+
+    def info(self, event, **kw):
+        self.events.append((event, kw))
+
+    debug = warning = error = exception = info
+
+
+@pytest.fixture
+def record_logs(monkeypatch):
+    """Replaces the `logger` of a module by a RecordingLogger, returns its list of (event, fields)."""
+
+    def record(module):
+        recording = RecordingLogger()
+        monkeypatch.setattr(module, "logger", recording)
+        return recording.events
+
+    return record
+
+
 @pytest_asyncio.fixture(autouse=True)
 async def suppress_logs():
     """Fixture to suppress logs during tests"""
@@ -0,0 +1,147 @@
+import logging
+import queue
+from datetime import datetime, timezone
+
+import pytest
+import structlog
+
+from aibolit.core.config import settings
+from aibolit.core.logger import (
+    LOG_RECORD_SWITCHES,
+    BoundedQueueHandler,
+    LevelGate,
+    RenderingQueueListener,
+    configure_log_records,
+    get_logger,
+    iso_timestamp,
+    profile_processors,
+    restore_log_records,
+)
+
+
+def make_record(msg, level=logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 1, msg, None, None)
+
+
+def queued_messages(log_queue: queue.Queue):
+    messages = []
+    while not log_queue.empty():
+        messages.append(log_queue.get_nowait().msg)
+    return messages
+
+
+def test_drop_new_reports_drops_once_there_is_room():
+    log_queue = queue.Queue(maxsize=2)
+    handler = BoundedQueueHandler(log_queue, "drop_new")
+    for number in range(4):
+        handler.emit(make_record(f"record {number}"))
+    assert 2 == handler.dropped
+    assert ["record 0", "record 1"] == queued_messages(log_queue)
+    handler.emit(make_record("record 4"))
+    assert ["record 4", "2 log records dropped"] == queued_messages(log_queue)
+    assert 0 == handler.dropped
+
+
+def test_drop_oldest_keeps_newest():
+    log_queue = queue.Queue(maxsize=2)
+    handler = BoundedQueueHandler(log_queue, "drop_oldest")
+    for number in range(3):
+        handler.emit(make_record(f"record {number}"))
+    assert ["record 1", "record 2"] == queued_messages(log_queue)
+    # the report of the drop waits for room
+    assert 1 == handler.dropped
+
+
+def test_headroom_is_left_to_warnings_and_errors():
+    log_queue = queue.Queue(maxsize=3)
+    handler = BoundedQueueHandler(log_queue, "drop_new", headroom=1)
+    handler.emit(make_record("error", logging.ERROR))
+    for number in range(3):
+        handler.emit(make_record(f"info {number}"))
+    assert ["error", "info 0"] == [record.msg for record in log_queue.queue]
+    assert 2 == handler.dropped
+    handler.emit(make_record("warning", logging.WARNING))
+    assert ["error", "info 0", "warning"] == queued_messages(log_queue)
+    handler.emit(make_record("info 3"))
+    assert ["info 3", "2 log records dropped"] == queued_messages(log_queue)
+
+
+@pytest.mark.parametrize("policy", ["drop_new", "drop_oldest"])
+def test_warnings_are_dropped_instead_of_waiting_once_the_queue_is_full(policy):
+    log_queue = queue.Queue(maxsize=2)
+    handler = BoundedQueueHandler(log_queue, policy, headroom=1)
+    for number in range(3):
+        handler.emit(make_record(f"warning {number}", logging.WARNING))
+    assert ["warning 0", "warning 1"] == queued_messages(log_queue)
+    assert 1 == handler.dropped
+
+
+def test_drop_oldest_makes_room_for_warnings():
+    log_queue = queue.Queue(maxsize=2)
+    handler = BoundedQueueHandler(log_queue, "drop_oldest")
+    handler.emit(make_record("info 0"))
+    handler.emit(make_record("info 1"))
+    handler.emit(make_record("error", logging.ERROR))
+    assert ["info 1", "error"] == queued_messages(log_queue)
+
+
+def test_listener_renders_structlog_and_foreign_records():
+    formatter = structlog.stdlib.ProcessorFormatter(
+        processors=[structlog.stdlib.ProcessorFormatter.remove_processors_meta, structlog.processors.JSONRenderer()],
+    )
+    listener = RenderingQueueListener(queue.Queue(), formatter)
+    record = make_record({"event": "hello", "user_id": 1})
+    record._logger, record._name = None, "info"
+    assert '{"event": "hello", "user_id": 1}' == listener.prepare(record).getMessage()
+    foreign = BoundedQueueHandler(queue.Queue()).prepare(
+        logging.LogRecord("x", logging.INFO, "", 1, "a %s", (1,), None)
+    )
+    assert '{"event": "a 1"}' == listener.prepare(foreign).getMessage()
+
+
+def test_level_gate():
+    gate = LevelGate(lambda logger, method_name, event_dict: {**event_dict, "gated": True}, logging.WARNING)
+    assert {"event": "a"} == gate(None, "info", {"event": "a"})
+    assert {"event": "a", "gated": True} == gate(None, "warning", {"event": "a"})
+    assert {"event": "a", "gated": True} == gate(None, "exception", {"event": "a"})
+
+
+def test_iso_timestamp_matches_time_stamper():
+    event_dict = structlog.processors.TimeStamper(utc=True)(None, "info", {})
+    expected = datetime.fromtimestamp(event_dict["timestamp"], timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    assert expected == iso_timestamp(None, "info", event_dict)["timestamp"]
+    assert {"timestamp": "1970-01-01T00:00:01.500000Z"} == iso_timestamp(None, "info", {"timestamp": 1.5})
+    assert {"timestamp": "1970-01-01T00:00:01.000000Z"} == iso_timestamp(None, "info", {"timestamp": 1.0})
+    assert {"timestamp": "formatted"} == iso_timestamp(None, "info", {"timestamp": "formatted"})
+
+
+def test_log_record_switches_are_restored():
+    defaults = [getattr(logging, name) for name in LOG_RECORD_SWITCHES]
+    configure_log_records("minimal")
+    configure_log_records("production")
+    assert not any(getattr(logging, name) for name in LOG_RECORD_SWITCHES)
+    restore_log_records()
+    assert defaults == [getattr(logging, name) for name in LOG_RECORD_SWITCHES]
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        profile_processors("verbose")
+
+
+def test_hot_logger_filtered_by_hot_path_level(monkeypatch):
+    assert get_logger("hot", hot=True).bind().is_enabled_for(logging.INFO)
+    monkeypatch.setattr(settings, "LOG_HOT_PATH_LEVEL", "WARNING")
+    hot_logger = get_logger("hot", hot=True).bind()
+    assert not hot_logger.is_enabled_for(logging.INFO)
+    assert hot_logger.is_enabled_for(logging.WARNING)
+    assert get_logger("not hot").bind().is_enabled_for(logging.INFO)
+
+
+def test_processors_merge_bound_trace_id():
+    structlog.contextvars.bind_contextvars(trace_id="abc")
+    try:
+        event_dict = profile_processors("minimal")[0](None, "info", {"event": "a"})
+    finally:
+        structlog.contextvars.clear_contextvars()
+    assert "abc" == event_dict["trace_id"]
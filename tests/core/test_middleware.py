@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from structlog.contextvars import get_contextvars
+
+from aibolit.core import middleware
+from aibolit.core.middleware import LoggingMiddleware
+from aibolit.core.query_stats import _current_stats
+
+
+@pytest.fixture
+def logged(record_logs):
+    return record_logs(middleware)
+
+
+async def trace(request):
+    return JSONResponse(get_contextvars())
+
+
+async def status(request):
+    return Response(status_code=int(request.path_params["status_code"]))
+
+
+async def slow(request):
+    await asyncio.sleep(0.02)
+    return Response()
+
+
+async def queries(request):
+    for _ in range(int(request.query_params["count"])):
+        _current_stats.get().record("SELECT 1", 0.001)
+    return Response()
+
+
+async def fail(request):
+    raise RuntimeError("boom")
+
+
+def make_client(**kwargs) -> AsyncClient:
+    routes = [
+        Route("/trace", trace),
+        Route("/status/{status_code}", status),
+        Route("/slow", slow),
+        Route("/fail", fail),
+        Route("/queries", queries),
+    ]
+    app = Starlette(routes=routes, middleware=[Middleware(LoggingMiddleware, **kwargs)])
+    return AsyncClient(transport=ASGITransport(app=app, raise_app_exceptions=False), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_logs_every_request_and_binds_trace_id(logged):
+    async with make_client() as client:
+        response = await client.get("/trace", params={"a": "1"}, headers={"X-TRACE-ID": "abc", "Cookie": "x=1"})
+    assert {"trace_id": "abc"} == response.json()
+    assert ["request_received", "response_sent"] == [event for event, _ in logged]
+    request = logged[0][1]
+    assert "http://test/trace?a=1" == request["url"]
+    assert {"a": "1"} == request["query_params"]
+    assert "abc" == request["headers"]["x-trace-id"]
+    assert "cookie" not in request["headers"]
+    assert 200 == logged[1][1]["status_code"]
+    assert {} == get_contextvars()
+
+
+@pytest.mark.asyncio
+async def test_unsampled_requests_logged_on_errors_and_slowness(logged):
+    async with make_client(sample_rate=0, slow_request_ms=10, error_status=500) as client:
+        await client.get("/status/200")
+        await client.get("/status/404")
+        assert [] == logged
+        await client.get("/status/503")
+        assert ["request_received", "response_sent"] == [event for event, _ in logged]
+        assert 503 == logged[1][1]["status_code"]
+        logged.clear()
+        await client.get("/slow")
+        assert ["request_received", "response_sent"] == [event for event, _ in logged]
+        logged.clear()
+        response = await client.get("/fail")
+    assert 500 == response.status_code
+    assert ["request_received", "unhandled_exception"] == [event for event, _ in logged]
+    assert "boom" == logged[1][1]["error"]
+
+
+@pytest.mark.asyncio
+async def test_adds_query_stats_to_response(logged):
+    async with make_client(query_stats=True) as client:
+        await client.get("/queries", params={"count": 3})
+    assert {"db_queries": 3, "db_time_ms": 3.0}.items() <= logged[1][1].items()
+    assert None is _current_stats.get()
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.util import greenlet_spawn
+
+from aibolit.core.pool_stats import TimedAsyncAdaptedQueuePool, WaitHistogram, checkout_wait
+
+
+class FakeConnection:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_wait_histogram():
+    histogram = WaitHistogram(buckets_ms=(1, 10, 100))
+    for wait_ms in (0.5, 1, 3, 50, 500):
+        histogram.observe(wait_ms)
+    histogram.observe_timeout()
+    snapshot = histogram.snapshot()
+    assert {"1": 2, "10": 3, "100": 4, "+Inf": 5} == snapshot["buckets_ms"]
+    assert 5 == snapshot["count"]
+    assert 554.5 == snapshot["sum_ms"]
+    assert 500 == snapshot["max_ms"]
+    assert 1 == snapshot["timeouts"]
+
+
+@pytest.mark.asyncio
+async def test_timed_pool_records_checkout_waits():
+    checkout_wait.reset()
+    pool = TimedAsyncAdaptedQueuePool(FakeConnection, pool_size=1, max_overflow=0, timeout=0.05)
+
+    def checkout_twice():
+        connection = pool.connect()
+        with pytest.raises(PoolTimeoutError):
+            pool.connect()
+        return connection
+
+    connection = await greenlet_spawn(checkout_twice)
+    assert 1 == pool.checkedout()
+    await greenlet_spawn(connection.close)
+    await asyncio.sleep(0)
+
+    snapshot = checkout_wait.snapshot()
+    assert 1 == snapshot["count"]
+    assert 1 == snapshot["timeouts"]
@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import Response
+from starlette.routing import Route
+
+from aibolit.core.config import settings
+from aibolit.core.middleware import LoggingMiddleware, ProfilingMiddleware
+from aibolit.core.profiling import WAITING, Profiler
+from aibolit.transport.views import internal
+
+
+def spin(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def handler() -> None:
+    spin(0.03)
+    await asyncio.sleep(0.03)
+
+
+async def saved(profiler: Profiler) -> None:
+    await asyncio.gather(*profiler._tasks)
+
+
+@pytest.mark.asyncio
+async def test_samples_running_and_waiting_stacks(tmp_path):
+    profiler = Profiler(tmp_path, token="secret", interval_ms=1)
+    stacks = profiler.start()
+    await handler()
+    profiler.finish(stacks, "trace/1", "GET /test", time.time())
+    await saved(profiler)
+    running = [stack for stack in stacks if stack.split(";")[-1].startswith("spin ")]
+    waiting = [stack for stack in stacks if stack.endswith(WAITING)]
+    assert running and waiting
+    assert all("handler (" in stack for stack in running + waiting)
+    [info] = profiler.recent()
+    assert ("trace_1", "GET /test") == (info.trace_id, info.endpoint)
+    folded = profiler.read("trace_1")
+    assert folded == (tmp_path / "trace_1.folded").read_text()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded.splitlines())
+
+
+@pytest.mark.asyncio
+async def test_keeps_last_profiles(tmp_path):
+    profiler = Profiler(tmp_path, token="secret", keep=2)
+    for number in range(3):
+        profiler.finish(profiler.start(), f"trace-{number}", "GET /test", time.time())
+        await saved(profiler)
+    assert ["trace-2", "trace-1"] == [info.trace_id for info in profiler.recent()]
+    assert ["trace-1.folded", "trace-2.folded"] == sorted(path.name for path in tmp_path.iterdir())
+    assert None is profiler.read("trace-0")
+
+
+def test_wanted():
+    profiler = Profiler(None, token="secret")
+    assert profiler.enabled
+    assert profiler.wanted(b"secret")
+    assert not profiler.wanted(b"secrets")
+    assert not profiler.wanted(None)
+    assert profiler.authorized(b"secret")
+    assert not profiler.authorized(b"")
+    assert not Profiler(None).authorized(b"")
+    assert not Profiler(None).enabled
+    assert Profiler(None, sample_rate=1).wanted(None)
+
+
+async def endpoint(request):
+    await handler()
+    return Response()
+
+
+@pytest.mark.asyncio
+async def test_profiling_middleware(tmp_path):
+    profiler = Profiler(tmp_path, token="secret")
+    app = Starlette(
+        routes=[Route("/items/{item_id}", endpoint)],
+        middleware=[Middleware(LoggingMiddleware, sample_rate=0), Middleware(ProfilingMiddleware, profiler=profiler)],
+    )
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/items/1", headers={"X-Trace-Id": "abc"})
+        await client.get("/items/2", headers={"X-Trace-Id": "def", "X-Profile": "secret"})
+    await saved(profiler)
+    [info] = profiler.recent()
+    assert ("def", "GET /items/{item_id}") == (info.trace_id, info.endpoint)
+    assert info.samples > 0
+
+
+def test_internal_endpoints_require_token(monkeypatch):
+    dependencies = {
+        route.path: [depends.dependency for depends in route.dependencies] for route in internal.router.routes
+    }
+    assert {
+        "/internal/pool": [internal.require_internal_token],
+        "/internal/profiles": [internal.require_profile_token],
+        "/internal/profiles/{trace_id}": [internal.require_profile_token],
+    } == dependencies
+    monkeypatch.setattr(internal, "profiler", Profiler(None, token="secret"))
+    internal.require_profile_token("Bearer secret")
+    internal.require_profile_token("bearer secret")
+    for authorization in (None, "", "secret", "Bearer secrets", "Basic secret"):
+        with pytest.raises(HTTPException) as exc_info:
+            internal.require_profile_token(authorization)
+        assert 403 == exc_info.value.status_code
+    monkeypatch.setattr(internal, "profiler", Profiler(None, sample_rate=1))
+    with pytest.raises(HTTPException):
+        internal.require_profile_token("Bearer ")
+
+
+def test_pool_stats_require_internal_token(monkeypatch):
+    monkeypatch.setattr(settings, "INTERNAL_TOKEN", "")
+    with pytest.raises(HTTPException):
+        internal.require_internal_token("Bearer ")
+    monkeypatch.setattr(settings, "INTERNAL_TOKEN", "internal")
+    internal.require_internal_token("Bearer internal")
+    for authorization in (None, "internal", "Bearer secret", "Basic internal"):
+        with pytest.raises(HTTPException) as exc_info:
+            internal.require_internal_token(authorization)
+        assert 403 == exc_info.value.status_code
@@ -0,0 +1,181 @@
+import json
+import threading
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import Response
+from starlette.routing import Route
+
+from aibolit.core import tracing
+from aibolit.core.config import settings
+from aibolit.core.middleware import LoggingMiddleware, TracingMiddleware
+from aibolit.core.tracing import (
+    BatchSpanProcessor,
+    OtlpJsonFileExporter,
+    SpanExporter,
+    otlp_trace_id,
+    root_span,
+    span,
+    traced,
+)
+
+TRACE_ID = "0af7651916cd43dd8448eb211c80319c"
+
+
+class RecordingProcessor:
+    def __init__(self):
+        self.spans = []
+
+    def on_end(self, span):
+        self.spans.append(span)
+
+
+class RecordingExporter(SpanExporter):
+    def __init__(self):
+        self.batches = []
+        self.shut_down = False
+
+    def export(self, spans):
+        self.batches.append([span.name for span in spans])
+
+    def shutdown(self):
+        self.shut_down = True
+
+
+class BlockingExporter(RecordingExporter):
+    def __init__(self):
+        super().__init__()
+        self.exporting = threading.Event()
+        self.release = threading.Event()
+
+    def export(self, spans):
+        self.exporting.set()
+        self.release.wait(5)
+        super().export(spans)
+
+
+@pytest.fixture
+def ended(monkeypatch):
+    monkeypatch.setattr(settings, "TRACING_ENABLED", True)
+    processor = RecordingProcessor()
+    monkeypatch.setattr(tracing, "_processor", processor)
+    return processor.spans
+
+
+@pytest.mark.asyncio
+async def test_traced_calls_nest_in_current_span(ended):
+    @traced("repo")
+    async def load():
+        return 1
+
+    @traced()
+    async def serve():
+        with span("render", rows=2):
+            pass
+        return await load()
+
+    assert 1 == await serve()
+    assert [] == ended
+
+    with root_span("GET /users", TRACE_ID) as root:
+        await serve()
+    serve_span = next(span for span in ended if span.name.endswith("serve"))
+    assert ["render", "repo", serve_span.name, "GET /users"] == [span.name for span in ended]
+    assert {TRACE_ID} == {span.trace_id for span in ended}
+    assert [serve_span.span_id, serve_span.span_id, root.span_id, None] == [span.parent_id for span in ended]
+    assert {"rows": 2} == ended[0].attributes
+
+
+@pytest.mark.asyncio
+async def test_traced_records_errors_and_async_generators(ended):
+    @traced("stream")
+    async def stream():
+        yield 1
+        yield 2
+
+    @traced("fail")
+    def fail():
+        raise ValueError("boom")
+
+    with root_span("call", TRACE_ID) as root:
+        assert [1, 2] == [item async for item in stream()]
+        with pytest.raises(ValueError):
+            fail()
+    stream_span, fail_span, _ = ended
+    assert root.span_id == stream_span.parent_id
+    assert "ValueError: boom" == fail_span.error
+
+
+def test_disabled_tracing_leaves_functions_as_they_are(monkeypatch):
+    monkeypatch.setattr(settings, "TRACING_ENABLED", False)
+
+    def load():
+        pass
+
+    assert load is traced()(load)
+    with span("render") as current:
+        assert current is None
+
+
+def test_otlp_trace_id():
+    assert TRACE_ID == otlp_trace_id("0af76519-16cd-43dd-8448-eb211c80319c")
+    assert 32 == len(otlp_trace_id("client-trace-1"))
+    assert otlp_trace_id("client-trace-1") == otlp_trace_id("client-trace-1")
+
+
+def test_batch_processor_exports_to_otlp_json_file(ended, tmp_path):
+    path = tmp_path / "spans.jsonl"
+    processor = BatchSpanProcessor(OtlpJsonFileExporter(path, service_name="test"), batch_size=2, interval_s=60)
+    with root_span("call", "client-trace-1") as root:
+        with span("query", statement="SELECT 1"):
+            pass
+    for recorded in ended:
+        processor.on_end(recorded)
+    processor.shutdown()
+
+    (request,) = map(json.loads, path.read_text().splitlines())
+    (resource_spans,) = request["resourceSpans"]
+    assert {"key": "service.name", "value": {"stringValue": "test"}} in resource_spans["resource"]["attributes"]
+    query, call = resource_spans["scopeSpans"][0]["spans"]
+    assert f"{root.span_id:016x}" == call["spanId"] == query["parentSpanId"]
+    assert otlp_trace_id("client-trace-1") == call["traceId"] == query["traceId"]
+    assert {"key": "statement", "value": {"stringValue": "SELECT 1"}} in query["attributes"]
+
+
+def test_batch_processor_drops_spans_over_queue_size(ended):
+    exporter = BlockingExporter()
+    processor = BatchSpanProcessor(exporter, max_queue_size=1, batch_size=1, interval_s=60)
+    for name in ("first", "second", "third"):
+        with root_span(name, TRACE_ID):
+            pass
+    processor.on_end(ended[0])
+    assert exporter.exporting.wait(5)
+    processor.on_end(ended[1])
+    processor.on_end(ended[2])
+    assert 1 == processor.dropped
+    exporter.release.set()
+    processor.shutdown()
+    assert [["first"], ["second"]] == exporter.batches
+    assert exporter.shut_down
+
+
+@pytest.mark.asyncio
+async def test_middleware_runs_request_in_root_span(ended):
+    @traced("view")
+    async def view(request):
+        return Response(status_code=201)
+
+    app = Starlette(
+        routes=[Route("/users/{user_id}", view)],
+        middleware=[Middleware(LoggingMiddleware), Middleware(TracingMiddleware)],
+    )
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/users/1", headers={"X-TRACE-ID": TRACE_ID})
+    assert 201 == response.status_code
+    view_span, request_span = ended
+    assert "GET /users/{user_id}" == request_span.name
+    assert {"http.method": "GET", "http.route": "/users/{user_id}", "http.status_code": 201} == request_span.attributes
+    assert TRACE_ID == request_span.trace_id
+    assert request_span.span_id == view_span.parent_id
@@ -0,0 +1,59 @@
+from datetime import date, datetime, time
+
+from google.protobuf.json_format import MessageToDict
+from google.protobuf.timestamp_pb2 import Timestamp
+
+from aibolit.grpc.adapters.mappers import date_to_timestamp, next_takings_to_proto, schedule_to_proto
+from aibolit.models.schedules import MedicationScheduleOrm
+from aibolit.models.users import UserOrm  # noqa: F401
+
+
+def test_date_to_timestamp():
+    for value in (date(1970, 1, 1), date(1969, 12, 31), date(2025, 1, 11), date(2999, 12, 31)):
+        expected = Timestamp()
+        expected.FromDatetime(datetime.combine(value, time.min))
+        assert expected == date_to_timestamp(value)
+    assert None is date_to_timestamp(None)
+
+
+def test_schedule_to_proto_without_end_date():
+    db_schedule = MedicationScheduleOrm(
+        id=1, medication_name="Pill", frequency=2, start_date=date(2025, 1, 1), end_date=None, user_id=3
+    )
+    response = MessageToDict(schedule_to_proto(db_schedule, ("08:00", "22:00")), preserving_proto_field_name=True)
+    expected_data = {
+        "id": 1,
+        "medication_name": "Pill",
+        "frequency": 2,
+        "start_date": "2025-01-01T00:00:00Z",
+        "user_id": 3,
+        "daily_plan": ["08:00", "22:00"],
+    }
+    assert expected_data == response
+
+
+def test_next_takings_to_proto():
+    response = next_takings_to_proto(3, ((1, "Pill", ("08:00", "09:00")), (2, "Pill 2", ("08:00",))))
+    expected_data = {
+        "user_id": 3,
+        "next_takings": [
+            {"schedule_id": 1, "schedule_name": "Pill", "schedule_times": ["08:00", "09:00"]},
+            {"schedule_id": 2, "schedule_name": "Pill 2", "schedule_times": ["08:00"]},
+        ],
+    }
+    assert expected_data == MessageToDict(response, preserving_proto_field_name=True)
+
+
+def test_compact_to_proto():
+    db_schedule = MedicationScheduleOrm(
+        id=1, medication_name="Pill", frequency=2, start_date=date(2025, 1, 1), end_date=None, user_id=3
+    )
+    schedule = schedule_to_proto(db_schedule, daily_plan_minutes=(480, 1320))
+    assert [] == list(schedule.daily_plan)
+    assert [480, 1320] == list(schedule.daily_plan_minutes)
+    response = next_takings_to_proto(3, ((1, "Pill", ("08:00", "09:00")),), compact=True)
+    expected_data = {
+        "user_id": 3,
+        "next_takings": [{"schedule_id": 1, "schedule_name": "Pill", "schedule_minutes": [480, 540]}],
+    }
+    assert expected_data == MessageToDict(response, preserving_proto_field_name=True)
@@ -138,6 +138,47 @@ async def test_create_schedule_with_old_start_date(stub_for_schedules, created_u
     assert 1 == response.schedule_id
 
 
+async def schedule_requests(*items):
+    for item in items:
+        yield schedules_pb2.CreateScheduleRequest(**item)
+
+
+@pytest.mark.asyncio
+async def test_create_schedules(stub_for_schedules, created_user):
+    response = await stub_for_schedules.CreateSchedules(
+        schedule_requests(
+            {"user_id": 1, "medication_name": "Pill", "frequency": 15, "duration_days": 10},
+            {"user_id": 1, "medication_name": "Pill 2", "frequency": 3},
+        )
+    )
+    assert 1 == response.user_id
+    assert [1, 2] == response.schedule_ids
+
+
+@pytest.mark.asyncio
+async def test_create_schedules_with_invalid_items(stub_for_schedules, created_user):
+    with pytest.raises(grpc.aio.AioRpcError) as exc_info:
+        await stub_for_schedules.CreateSchedules(
+            schedule_requests(
+                {"user_id": 1, "medication_name": "Pill", "frequency": 16},
+                {"user_id": 1, "medication_name": "Pill 2", "frequency": 3},
+                {"user_id": 2, "medication_name": "Pill 3", "frequency": 3},
+            )
+        )
+    assert grpc.StatusCode.INVALID_ARGUMENT == exc_info.value.code()
+    assert "schedules[0].frequency: Input should be less than 16" == exc_info.value.details()
+
+
+@pytest.mark.asyncio
+async def test_create_schedules_with_non_existent_user(stub_for_schedules):
+    with pytest.raises(grpc.aio.AioRpcError) as exc_info:
+        await stub_for_schedules.CreateSchedules(
+            schedule_requests({"user_id": 1, "medication_name": "Pill", "frequency": 15})
+        )
+    assert grpc.StatusCode.NOT_FOUND == exc_info.value.code()
+    assert "User with id=1 not found" == exc_info.value.details()
+
+
 @pytest.mark.asyncio
 async def test_get_all_user_schedules(stub_for_schedules, created_schedule):
     request = schedules_pb2.GetAllSchedulesRequest(user_id=1)
@@ -199,6 +240,36 @@ async def test_get_user_next_takings(stub_for_schedules, created_schedule):
     assert expected_data == response
 
 
+@pytest.mark.freeze_time("2025-01-01 7:59:59")
+@pytest.mark.asyncio
+async def test_get_user_compact_schedule_and_next_takings(stub_for_schedules, created_schedule):
+    request = schedules_pb2.GetUserScheduleRequest(user_id=1, schedule_id=1, compact=True)
+    schedule = await stub_for_schedules.GetUserSchedule(request)
+    assert [] == list(schedule.daily_plan)
+    assert list(range(480, 1321, 60)) == list(schedule.daily_plan_minutes)
+    request = schedules_pb2.GetUserNextTakingsRequest(user_id=1, compact=True)
+    response = MessageToDict(await stub_for_schedules.GetUserNextTakings(request), preserving_proto_field_name=True)
+    expected_data = {
+        "user_id": 1,
+        "next_takings": [{"schedule_id": 1, "schedule_name": "Pill", "schedule_minutes": [480, 540]}],
+    }
+    assert expected_data == response
+
+
+@pytest.mark.asyncio
+async def test_subscribe_next_takings(stub_for_schedules, created_schedule):
+    call = stub_for_schedules.SubscribeNextTakings(schedules_pb2.GetUserNextTakingsRequest(user_id=1))
+    first = MessageToDict(await call.read(), preserving_proto_field_name=True)
+    data_schedule2 = {"user_id": 1, "medication_name": "Pill 2", "frequency": 1, "duration_days": 10}
+    await stub_for_schedules.CreateSchedule(schedules_pb2.CreateScheduleRequest(**data_schedule2))
+    second = MessageToDict(await call.read(), preserving_proto_field_name=True)
+    call.cancel()
+    pill = {"schedule_id": 1, "schedule_name": "Pill", "schedule_times": ["08:00", "09:00"]}
+    pill_2 = {"schedule_id": 2, "schedule_name": "Pill 2", "schedule_times": ["08:00"]}
+    assert {"user_id": 1, "next_takings": [pill]} == first
+    assert {"user_id": 1, "next_takings": [pill, pill_2]} == second
+
+
 @pytest.mark.asyncio
 async def test_get_future_next_takings(stub_for_schedules, created_future_schedule):
     request = schedules_pb2.GetUserNextTakingsRequest(user_id=1)
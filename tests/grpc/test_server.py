@@ -0,0 +1,202 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import grpc
+import pytest
+from structlog.contextvars import get_contextvars
+
+from aibolit.core.config import Settings
+from aibolit.core.metrics import grpc_errors, grpc_handling_duration, grpc_in_flight
+from aibolit.core.profiling import Profiler
+from aibolit.core.query_stats import _current_stats
+from aibolit.grpc.adapters.users import GrpcUserService
+from aibolit.grpc.generated import users_pb2, users_pb2_grpc
+from aibolit.grpc.server import CallCompressionInterceptor, create_server, server_options
+
+STREAM_USERS = "/user.UserService/StreamUsers"
+
+
+class FakeUserService:
+    async def get_user_ids(self, after_id, page_size):
+        return list(range(after_id + 1, after_id + page_size + 1))
+
+    async def stream_user_ids(self, after_id, batch_size):
+        yield list(range(after_id + 1, after_id + batch_size + 1))
+
+
+@asynccontextmanager
+async def fake_user_service_scope():
+    yield FakeUserService()
+
+
+class FakeContext:
+    compression = None
+
+    def set_compression(self, compression):
+        self.compression = compression
+
+
+def test_server_options():
+    config = Settings(GRPC_KEEPALIVE_TIME_MS=30_000, GRPC_MAX_CONCURRENT_STREAMS=50, GRPC_HTTP2_STREAM_WINDOW=1 << 20)
+    options = dict(server_options(config))
+    assert 30_000 == options["grpc.keepalive_time_ms"]
+    assert 50 == options["grpc.max_concurrent_streams"]
+    assert 1 << 20 == options["grpc.http2.lookahead_bytes"]
+    assert 1 == options["grpc.http2.bdp_probe"]
+    # grpc defaults are left to grpc
+    assert "grpc.max_concurrent_streams" not in dict(server_options(Settings()))
+
+
+@pytest.mark.asyncio
+async def test_call_compression_interceptor():
+    handler = grpc.unary_stream_rpc_method_handler(GrpcUserService(fake_user_service_scope).StreamUsers)
+
+    async def continuation(handler_call_details):
+        return handler
+
+    interceptor = CallCompressionInterceptor({STREAM_USERS: "gzip"})
+    details = SimpleNamespace(method=STREAM_USERS, invocation_metadata=())
+    intercepted = await interceptor.intercept_service(continuation, details)
+    context = FakeContext()
+    responses = [response async for response in intercepted.unary_stream(users_pb2.GetAllUsersRequest(), context)]
+    assert grpc.Compression.Gzip == context.compression
+    assert 1000 == len(responses[0].users)
+    details.method = "/user.UserService/GetUsers"
+    assert handler is await interceptor.intercept_service(continuation, details)
+
+
+@pytest.mark.asyncio
+async def test_create_server_with_compression():
+    config = Settings(GRPC_COMPRESSION="deflate", GRPC_CALL_COMPRESSION={STREAM_USERS: "gzip"})
+    server = create_server(config)
+    users_pb2_grpc.add_UserServiceServicer_to_server(GrpcUserService(fake_user_service_scope), server)
+    port = server.add_insecure_port("localhost:0")
+    await server.start()
+    try:
+        async with grpc.aio.insecure_channel(f"localhost:{port}") as channel:
+            stub = users_pb2_grpc.UserServiceStub(channel)
+            page = await stub.GetUsers(users_pb2.GetAllUsersRequest(page_size=10))
+            streamed = [response async for response in stub.StreamUsers(users_pb2.GetAllUsersRequest(page_size=10))]
+    finally:
+        await server.stop(0)
+    assert list(range(1, 11)) == [user.id for user in page.users]
+    assert [10] == [response.next_after_id for response in streamed]
+
+
+@pytest.mark.asyncio
+async def test_metrics_interceptor():
+    server = create_server(Settings(METRICS_ENABLED=True))
+    users_pb2_grpc.add_UserServiceServicer_to_server(GrpcUserService(fake_user_service_scope), server)
+    port = server.add_insecure_port("localhost:0")
+    get_users = "/user.UserService/GetUsers"
+    calls = sum(grpc_handling_duration.labels(get_users).counts)
+    errors = grpc_errors.labels(get_users, "INVALID_ARGUMENT").value
+    await server.start()
+    try:
+        async with grpc.aio.insecure_channel(f"localhost:{port}") as channel:
+            stub = users_pb2_grpc.UserServiceStub(channel)
+            await stub.GetUsers(users_pb2.GetAllUsersRequest(page_size=10))
+            with pytest.raises(grpc.aio.AioRpcError):
+                await stub.GetUsers(users_pb2.GetAllUsersRequest(page_size=-1))
+            [response async for response in stub.StreamUsers(users_pb2.GetAllUsersRequest(page_size=10))]
+    finally:
+        await server.stop(0)
+    assert calls + 2 == sum(grpc_handling_duration.labels(get_users).counts)
+    assert errors + 1 == grpc_errors.labels(get_users, "INVALID_ARGUMENT").value
+    assert 1 <= sum(grpc_handling_duration.labels(STREAM_USERS).counts)
+    assert 0 == grpc_in_flight.labels(get_users).value
+
+
+class TracingUserService(FakeUserService):
+    def __init__(self):
+        self.seen = []
+
+    async def get_user_ids(self, after_id, page_size):
+        self.seen.append((get_contextvars().get("trace_id"), _current_stats.get()))
+        return await super().get_user_ids(after_id, page_size)
+
+
+@pytest.mark.asyncio
+async def test_query_stats_interceptor_binds_trace_id():
+    service = TracingUserService()
+
+    @asynccontextmanager
+    async def service_scope():
+        yield service
+
+    server = create_server(Settings(SQL_STATS_ENABLED=True))
+    users_pb2_grpc.add_UserServiceServicer_to_server(GrpcUserService(service_scope), server)
+    port = server.add_insecure_port("localhost:0")
+    await server.start()
+    try:
+        async with grpc.aio.insecure_channel(f"localhost:{port}") as channel:
+            stub = users_pb2_grpc.UserServiceStub(channel)
+            await stub.GetUsers(users_pb2.GetAllUsersRequest(page_size=1), metadata=(("x-trace-id", "abc"),))
+            await stub.GetUsers(users_pb2.GetAllUsersRequest(page_size=1))
+    finally:
+        await server.stop(0)
+    (first_trace_id, first_stats), (second_trace_id, second_stats) = service.seen
+    assert "abc" == first_trace_id
+    assert second_trace_id not in (None, "abc")
+    assert first_stats is not None and first_stats is not second_stats
+
+
+@pytest.mark.asyncio
+async def test_profiling_interceptor(tmp_path):
+    profiler = Profiler(tmp_path, token="secret")
+    server = create_server(Settings(SQL_STATS_ENABLED=True), profiler=profiler)
+    users_pb2_grpc.add_UserServiceServicer_to_server(GrpcUserService(fake_user_service_scope), server)
+    port = server.add_insecure_port("localhost:0")
+    await server.start()
+    try:
+        async with grpc.aio.insecure_channel(f"localhost:{port}") as channel:
+            stub = users_pb2_grpc.UserServiceStub(channel)
+            await stub.GetUsers(users_pb2.GetAllUsersRequest(page_size=1))
+            metadata = (("x-trace-id", "abc"), ("x-profile", "secret"))
+            [
+                response
+                async for response in stub.StreamUsers(users_pb2.GetAllUsersRequest(page_size=1), metadata=metadata)
+            ]
+    finally:
+        await server.stop(0)
+    await asyncio.gather(*profiler._tasks)
+    assert [("abc", STREAM_USERS)] == [(info.trace_id, info.endpoint) for info in profiler.recent()]
+
+
+class HeldStreamUserService(FakeUserService):
+    def __init__(self):
+        self.release = asyncio.Event()
+
+    async def stream_user_ids(self, after_id, batch_size):
+        yield [after_id + 1]
+        await self.release.wait()
+
+
+@pytest.mark.asyncio
+async def test_open_streams_do_not_count_towards_unary_limit():
+    service = HeldStreamUserService()
+
+    @asynccontextmanager
+    async def service_scope():
+        yield service
+
+    server = create_server(Settings(GRPC_MAX_CONCURRENT_RPCS=1, GRPC_MAX_CONCURRENT_STREAMING_RPCS=1))
+    users_pb2_grpc.add_UserServiceServicer_to_server(GrpcUserService(service_scope), server)
+    port = server.add_insecure_port("localhost:0")
+    await server.start()
+    try:
+        async with grpc.aio.insecure_channel(f"localhost:{port}") as channel:
+            stub = users_pb2_grpc.UserServiceStub(channel)
+            held = stub.StreamUsers(users_pb2.GetAllUsersRequest(page_size=1))
+            await held.read()
+            for _ in range(2):
+                await stub.GetUsers(users_pb2.GetAllUsersRequest(page_size=1))
+            with pytest.raises(grpc.aio.AioRpcError) as exc_info:
+                await stub.StreamUsers(users_pb2.GetAllUsersRequest(page_size=1)).read()
+            assert grpc.StatusCode.RESOURCE_EXHAUSTED == exc_info.value.code()
+            service.release.set()
+            assert grpc.aio.EOF == await held.read()
+            await stub.StreamUsers(users_pb2.GetAllUsersRequest(page_size=1)).read()
+    finally:
+        await server.stop(0)
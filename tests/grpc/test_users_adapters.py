@@ -1,3 +1,4 @@
+import grpc
 import pytest
 from aibolit.grpc.generated import users_pb2
 
@@ -7,3 +8,34 @@ async def test_create_user(stub_for_users):
     request = users_pb2.CreateUserRequest()
     response = await stub_for_users.CreateUser(request)
     assert 1 == response.id
+
+
+@pytest.mark.asyncio
+async def test_get_users_pages(stub_for_users):
+    for _ in range(5):
+        await stub_for_users.CreateUser(users_pb2.CreateUserRequest())
+    pages, after_id = [], 0
+    while True:
+        response = await stub_for_users.GetUsers(users_pb2.GetAllUsersRequest(after_id=after_id, page_size=2))
+        pages.append([user.id for user in response.users])
+        after_id = response.next_after_id
+        if not after_id:
+            break
+    assert [[1, 2], [3, 4], [5]] == pages
+
+
+@pytest.mark.asyncio
+async def test_stream_users(stub_for_users):
+    for _ in range(5):
+        await stub_for_users.CreateUser(users_pb2.CreateUserRequest())
+    request = users_pb2.GetAllUsersRequest(after_id=1, page_size=3)
+    responses = [response async for response in stub_for_users.StreamUsers(request)]
+    assert [[2, 3, 4], [5]] == [[user.id for user in response.users] for response in responses]
+    assert [4, 5] == [response.next_after_id for response in responses]
+
+
+@pytest.mark.asyncio
+async def test_get_users_with_negative_page_size(stub_for_users):
+    with pytest.raises(grpc.aio.AioRpcError) as exc_info:
+        await stub_for_users.GetUsers(users_pb2.GetAllUsersRequest(page_size=-1))
+    assert grpc.StatusCode.INVALID_ARGUMENT == exc_info.value.code()
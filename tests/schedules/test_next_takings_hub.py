@@ -0,0 +1,122 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from aibolit.services.next_takings_hub import NextTakingsHub, SubscribedSchedule
+
+TODAY = date(2025, 5, 12)
+
+
+def schedule(schedule_id, frequency=3, start_date=TODAY, end_date=None, name="Pill"):
+    return SubscribedSchedule(schedule_id, name, frequency, start_date, end_date)
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def loader(*schedules):
+    loads = []
+
+    async def load(user_id):
+        loads.append(user_id)
+        return list(schedules)
+
+    return load, loads
+
+
+@pytest.mark.asyncio
+async def test_subscribe_sends_current_next_takings_and_loads_once():
+    hub = NextTakingsHub(clock=Clock(datetime(2025, 5, 12, 14, 0)))
+    load, loads = loader(schedule(2, frequency=2), schedule(1))
+    async with hub.subscribe(1, load) as first, hub.subscribe(1, load) as second:
+        assert ((1, "Pill", ("15:00",)),) == await anext(first)
+        assert ((1, "Pill", ("15:00",)),) == await anext(second)
+        assert [1] == loads
+        assert (1, 2) == (hub.user_count, hub.subscription_count)
+    assert (0, 0) == (hub.user_count, hub.subscription_count)
+
+
+@pytest.mark.asyncio
+async def test_refresh_pushes_only_changed_next_takings():
+    clock = Clock(datetime(2025, 5, 12, 12, 30))
+    hub = NextTakingsHub(clock=clock)
+    async with hub.subscribe(1, loader(schedule(1))[0]) as subscription:
+        assert () == await anext(subscription)
+        assert 0 == await hub.refresh(datetime(2025, 5, 12, 12, 30))
+        assert 0 == await hub.refresh(datetime(2025, 5, 12, 12, 31))
+        assert 1 == await hub.refresh(datetime(2025, 5, 12, 13, 0))
+        assert ((1, "Pill", ("15:00",)),) == await anext(subscription)
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_gets_only_latest_update():
+    hub = NextTakingsHub(clock=Clock(datetime(2025, 5, 12, 12, 30)))
+    async with hub.subscribe(1, loader(schedule(1))[0]) as subscription:
+        await hub.refresh(datetime(2025, 5, 12, 13, 0))
+        await hub.refresh(datetime(2025, 5, 12, 15, 31))
+        assert () == await anext(subscription)
+        assert 2 == subscription.skipped
+
+
+@pytest.mark.asyncio
+async def test_add_schedule_pushes_to_subscribers_of_user():
+    hub = NextTakingsHub(clock=Clock(datetime(2025, 5, 12, 7, 45)))
+    hub.add_schedule(1, schedule(1))
+    async with hub.subscribe(1, loader()[0]) as subscription:
+        assert () == await anext(subscription)
+        hub.add_schedule(2, schedule(2))
+        hub.add_schedule(1, schedule(3, name="Syrup"))
+        assert ((3, "Syrup", ("08:00",)),) == await anext(subscription)
+
+
+@pytest.mark.asyncio
+async def test_refresh_on_new_day_starts_and_expires_schedules():
+    hub = NextTakingsHub(clock=Clock(datetime(2025, 5, 12, 7, 45)))
+    tomorrow = TODAY + timedelta(days=1)
+    schedules = schedule(1, end_date=TODAY), schedule(2, start_date=tomorrow, name="Syrup")
+    async with hub.subscribe(1, loader(*schedules)[0]) as subscription:
+        assert ((1, "Pill", ("08:00",)),) == await anext(subscription)
+        assert 1 == await hub.refresh(datetime(2025, 5, 13, 7, 45))
+        assert ((2, "Syrup", ("08:00",)),) == await anext(subscription)
+
+
+@pytest.mark.asyncio
+async def test_failed_load_is_not_kept():
+    hub = NextTakingsHub(clock=Clock(datetime(2025, 5, 12, 7, 45)))
+
+    async def load(user_id):
+        raise RuntimeError("database is down")
+
+    with pytest.raises(RuntimeError):
+        async with hub.subscribe(1, load):
+            pass
+    assert 0 == hub.user_count
+    async with hub.subscribe(1, loader(schedule(1))[0]) as subscription:
+        assert ((1, "Pill", ("08:00",)),) == await anext(subscription)
+
+
+@pytest.mark.asyncio
+async def test_clock_stops_with_last_subscriber():
+    hub = NextTakingsHub(clock=Clock(datetime(2025, 5, 12, 7, 45)))
+    async with hub.subscribe(1, loader(schedule(1))[0]), hub.subscribe(2, loader(schedule(2))[0]):
+        clock = hub._task
+        assert not clock.done()
+    await asyncio.sleep(0)
+    assert clock.cancelled()
+    assert hub._task is None
+
+
+@pytest.mark.asyncio
+async def test_stop_ends_subscriptions():
+    hub = NextTakingsHub(clock=Clock(datetime(2025, 5, 12, 7, 45)))
+    async with hub.subscribe(1, loader(schedule(1))[0]) as subscription:
+        assert ((1, "Pill", ("08:00",)),) == await anext(subscription)
+        await hub.stop()
+        assert [] == [update async for update in subscription]
+        assert hub._task is None
@@ -0,0 +1,115 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from aibolit.core.config import settings
+from aibolit.services.reminders import ReminderScheduler, ReminderSchedule, ReminderWheel
+
+TODAY = date(2025, 5, 12)
+
+
+def schedule(schedule_id, frequency=2, start_date=TODAY, end_date=None, user_id=1):
+    return ReminderSchedule(schedule_id, user_id, frequency, start_date, end_date)
+
+
+def test_add_slots_every_plan_time():
+    wheel = ReminderWheel(TODAY)
+    wheel.add(schedule(1, frequency=3))
+    wheel.add(schedule(2, frequency=2, user_id=5))
+    assert 5 == len(wheel)
+    assert [(1, 1, "08:00"), (5, 2, "08:00")] == wheel.due(8 * 60)
+    assert [(1, 1, "15:00")] == wheel.due(15 * 60)
+    assert [] == wheel.due(15 * 60 + 1)
+
+
+def test_cancel_and_replace():
+    wheel = ReminderWheel(TODAY)
+    wheel.add(schedule(1, frequency=3))
+    wheel.add(schedule(1, frequency=1))
+    assert 1 == len(wheel)
+    assert [] == wheel.due(15 * 60)
+    wheel.cancel(1)
+    wheel.cancel(1)
+    assert 0 == len(wheel)
+    assert [] == wheel.due(8 * 60)
+
+
+def test_expired_schedule_is_not_added():
+    wheel = ReminderWheel(TODAY)
+    wheel.add(schedule(1, end_date=TODAY - timedelta(days=1)))
+    assert 0 == len(wheel)
+    assert 0 == wheel.schedule_count
+
+
+def test_advance_day_expires_and_starts_schedules():
+    wheel = ReminderWheel(TODAY)
+    wheel.add(schedule(1, end_date=TODAY))
+    wheel.add(schedule(2, start_date=TODAY + timedelta(days=2), end_date=TODAY + timedelta(days=3)))
+    assert [(1, 1, "08:00")] == wheel.due(8 * 60)
+
+    wheel.advance_day(TODAY + timedelta(days=1))
+    assert [] == wheel.due(8 * 60)
+    assert 1 == wheel.schedule_count
+
+    wheel.advance_day(TODAY + timedelta(days=3))
+    assert [(1, 2, "08:00")] == wheel.due(8 * 60)
+
+    wheel.advance_day(TODAY + timedelta(days=4))
+    assert 0 == len(wheel)
+    assert 0 == wheel.schedule_count
+
+
+def test_cancel_parked_schedule():
+    wheel = ReminderWheel(TODAY)
+    wheel.add(schedule(1, start_date=TODAY + timedelta(days=1), end_date=TODAY + timedelta(days=2)))
+    wheel.cancel(1)
+    wheel.advance_day(TODAY + timedelta(days=1))
+    assert [] == wheel.due(8 * 60)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_fires_callback_in_batches(monkeypatch):
+    monkeypatch.setattr(settings, "DUE_INTAKES_SWEEP_BATCH_SIZE", 2)
+    batches = []
+
+    async def callback(intakes):
+        batches.append(intakes)
+
+    scheduler = ReminderScheduler(callback)
+    scheduler._wheel = ReminderWheel(TODAY)
+    for schedule_id in range(1, 4):
+        scheduler.add_schedule(schedule(schedule_id, user_id=schedule_id))
+    await scheduler._fire(22 * 60)
+    assert [[(1, 1, "22:00"), (2, 2, "22:00")], [(3, 3, "22:00")]] == batches
+
+
+@pytest.mark.asyncio
+async def test_scheduler_fires_rest_of_day_before_midnight():
+    fired = []
+
+    async def callback(intakes):
+        fired.extend(intakes)
+
+    scheduler = ReminderScheduler(callback)
+    scheduler._wheel = ReminderWheel(TODAY)
+    scheduler.add_schedule(schedule(1, frequency=2))
+    scheduler.add_schedule(schedule(2, frequency=1, start_date=TODAY + timedelta(days=1)))
+    day, minute = await scheduler._tick(TODAY, 21 * 60 + 59, datetime.combine(TODAY + timedelta(days=1), time(8, 1)))
+    assert (TODAY + timedelta(days=1), 8 * 60 + 1) == (day, minute)
+    assert [(1, 1, "22:00"), (1, 1, "08:00"), (1, 2, "08:00")] == fired
+
+
+@pytest.mark.asyncio
+async def test_scheduler_survives_day_wheel_errors(monkeypatch):
+    scheduler = ReminderScheduler()
+    scheduler._wheel = ReminderWheel(TODAY)
+
+    def fail(today):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(scheduler._wheel, "advance_day", fail)
+    now = datetime.combine(TODAY + timedelta(days=1), time(0, 5))
+    assert (TODAY, 24 * 60 - 1) == await scheduler._tick(TODAY, 23 * 60, now)
+    monkeypatch.undo()
+    monkeypatch.setattr(scheduler._wheel, "due_batches", fail)
+    assert (TODAY + timedelta(days=1), 5) == await scheduler._tick(TODAY, 24 * 60 - 1, now)
@@ -0,0 +1,119 @@
+from datetime import date, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from aibolit.repositories.schedules import ScheduleRepo
+from aibolit.repositories.users import UserRepo
+from aibolit.schemas.openapi_generated import MedicationScheduleCreateRequest, UserCreateRequest
+
+
+@pytest_asyncio.fixture
+async def created_schedules(get_testing_db: AsyncSession):
+    users_repo, schedules_repo = UserRepo(get_testing_db), ScheduleRepo(get_testing_db)
+    for _ in range(2):
+        await users_repo.create_user(UserCreateRequest())
+    schedules = [
+        {"medication_name": "Active", "frequency": 3, "user_id": 1},
+        {"medication_name": "Active 2", "frequency": 15, "duration_days": 10, "user_id": 2},
+        {"medication_name": "Future", "frequency": 3, "start_date": date.today() + timedelta(days=1), "user_id": 1},
+        {
+            "medication_name": "Expired",
+            "frequency": 3,
+            "duration_days": 1,
+            "start_date": date.today() - timedelta(days=5),
+            "user_id": 2,
+        },
+    ]
+    for schedule in schedules:
+        await schedules_repo.create_schedule(MedicationScheduleCreateRequest(**schedule))
+
+
+@pytest.mark.asyncio
+async def test_create_schedule(get_testing_db: AsyncSession):
+    users_repo, schedules_repo = UserRepo(get_testing_db), ScheduleRepo(get_testing_db)
+    assert 1 == await users_repo.create_user(UserCreateRequest())
+    schedule = MedicationScheduleCreateRequest(medication_name="Pill", frequency=3, duration_days=2, user_id=1)
+    db_schedule = await schedules_repo.create_schedule(schedule)
+    assert (1, 1, 3, date.today(), date.today() + timedelta(days=2)) == tuple(db_schedule)
+
+
+@pytest.mark.asyncio
+async def test_create_schedule_for_non_existent_user(get_testing_db: AsyncSession):
+    schedules_repo = ScheduleRepo(get_testing_db)
+    schedule = MedicationScheduleCreateRequest(medication_name="Pill", frequency=3, user_id=1)
+    assert None is await schedules_repo.create_schedule(schedule)
+    assert None is await schedules_repo.create_schedules([schedule, schedule])
+    assert [] == list(await schedules_repo.get_all_user_schedule_ids(1))
+
+
+class UserDeletedSession:
+    """A session whose user is deleted between the EXISTS check and the insert of the schedule."""
+
+    def __init__(self):
+        self.rolled_back = False
+
+    async def execute(self, *args, **kwargs):
+        orig = type("ForeignKeyViolationError", (Exception,), {"pgcode": "23503"})()
+        raise IntegrityError("INSERT INTO schedules", None, orig)
+
+    async def rollback(self):
+        self.rolled_back = True
+
+
+@pytest.mark.asyncio
+async def test_create_schedule_for_concurrently_deleted_user():
+    session = UserDeletedSession()
+    schedules_repo = ScheduleRepo(session)  # type: ignore[arg-type]
+    schedule = MedicationScheduleCreateRequest(medication_name="Pill", frequency=3, user_id=1)
+    assert None is await schedules_repo.create_schedule(schedule)
+    assert session.rolled_back
+
+
+@pytest.mark.asyncio
+async def test_get_unexpired_user_schedules(get_testing_db: AsyncSession, created_schedules):
+    schedules_repo = ScheduleRepo(get_testing_db)
+    rows = await schedules_repo.get_unexpired_user_schedules(1, date.today())
+    assert [(1, "Active"), (3, "Future")] == sorted((row.id, row.medication_name) for row in rows)
+    assert [2] == [row.id for row in await schedules_repo.get_unexpired_user_schedules(2, date.today())]
+
+
+@pytest.mark.asyncio
+async def test_stream_active_schedules(get_testing_db: AsyncSession, created_schedules):
+    schedules_repo = ScheduleRepo(get_testing_db)
+    partitions = [rows async for rows in schedules_repo.stream_active_schedules(date.today(), batch_size=1)]
+    assert [1, 1] == [len(rows) for rows in partitions]
+    assert [(1, 1, 3), (2, 2, 15)] == sorted(tuple(row) for rows in partitions for row in rows)
+
+
+@pytest.mark.asyncio
+async def test_get_all_user_schedule_ids(get_testing_db: AsyncSession, created_schedules):
+    schedules_repo = ScheduleRepo(get_testing_db)
+    assert [1] == list(await schedules_repo.get_all_user_schedule_ids(1))
+    assert [2] == list(await schedules_repo.get_all_user_schedule_ids(2))
+
+
+@pytest.mark.asyncio
+async def test_all_user_schedules_query_uses_index(get_testing_db: AsyncSession):
+    await get_testing_db.execute(text("INSERT INTO users (id) SELECT generate_series(1, 1000)"))
+    await get_testing_db.execute(
+        text(
+            "INSERT INTO schedules (medication_name, frequency, duration_days, start_date, end_date, user_id) "
+            "SELECT 'Medication ' || n, n % 15 + 1, NULL, CURRENT_DATE - n % 30, "
+            "CASE WHEN n % 2 = 0 THEN NULL ELSE CURRENT_DATE + n % 30 - 15 END, n % 1000 + 1 "
+            "FROM generate_series(1, 20000) AS n"
+        )
+    )
+    await get_testing_db.commit()
+    await get_testing_db.execute(text("ANALYZE schedules"))
+
+    query = ScheduleRepo.all_user_schedules_query(user_id=42)
+    compiled = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    plan = "\n".join((await get_testing_db.execute(text(f"EXPLAIN {compiled}"))).scalars())
+
+    assert "ix_schedules_user_id_start_date_end_date" in plan
+    assert "Seq Scan" not in plan
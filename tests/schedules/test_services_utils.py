@@ -1,7 +1,20 @@
-from datetime import datetime
+from datetime import date, datetime, time, timedelta
 from freezegun import freeze_time
 import pytest
-from aibolit.services.schedules import ScheduleService
+from aibolit.core.config import settings
+from aibolit.core.exceptions import ScheduleBatchUserError
+from aibolit.models.schedules import MedicationScheduleOrm
+from aibolit.models.users import UserOrm  # noqa: F401
+from aibolit.schemas.openapi_generated import MedicationSchedule, MedicationScheduleCreateRequest
+from aibolit.services.daily_plans import (
+    MAX_FREQUENCY,
+    MIN_FREQUENCY,
+    DailyPlanTable,
+    round_to_next_interval,
+    to_minutes,
+)
+from aibolit.services.next_takings import NextTakingsWindow
+from aibolit.services.schedules import ScheduleService, schedule_mapper
 
 
 daily_plans = {
@@ -67,18 +80,151 @@ is_within_timeframe_data = [
 
 @pytest.mark.parametrize("frequency, expected_result", daily_plans_data)
 def test_generate_daily_plan(frequency, expected_result):
-    service = ScheduleService(schedules_repo=None)
-    result = service._generate_daily_plan(frequency)
-    assert expected_result == result
+    assert expected_result == list(DailyPlanTable().get(frequency))
+
+
+def test_daily_plans_are_cached():
+    table = DailyPlanTable()
+    assert table.get(7) is table.get(7)
+
+
+def test_daily_plan_minutes_of():
+    table = DailyPlanTable()
+    assert table.minutes(15) == table.minutes_of(table.get(15))
+    assert (480, 1320) == table.minutes_of(("08:00", "22:00"))
+
+
+def test_daily_plans_rebuilt_on_settings_change(monkeypatch):
+    table = DailyPlanTable()
+    assert ("08:00", "22:00") == table.get(2)
+    monkeypatch.setattr(settings, "TIME_DAY_START", time(9, 0))
+    monkeypatch.setattr(settings, "TIME_DAY_END", time(21, 0))
+    assert ("09:00", "21:00") == table.get(2)
+    monkeypatch.setattr(settings, "TIME_ROUNDING_INTERVAL", 30)
+    assert ("09:00", "12:00", "15:00", "18:00", "21:00") == table.get(5)
 
 
 @pytest.mark.parametrize("input_dt, expected_dt", round_to_next_interval_data)
 def test_round_to_next_interval(input_dt: datetime, expected_dt: datetime):
-    assert ScheduleService._round_to_next_interval(input_dt) == expected_dt
+    assert round_to_next_interval(input_dt, settings.TIME_ROUNDING_INTERVAL) == expected_dt
 
 
 @pytest.mark.parametrize("now_time, dose_time, expected", is_within_timeframe_data)
 def test_is_within_timeframe(now_time: str, dose_time: str, expected: bool):
     frozen_dt = datetime.strptime(f"2025-05-12 {now_time}", "%Y-%m-%d %H:%M")
     with freeze_time(frozen_dt):
-        assert ScheduleService._is_within_timeframe(dose_time) == expected
+        assert NextTakingsWindow(datetime.now()).contains(to_minutes(dose_time)) == expected
+
+
+def legacy_is_within_timeframe(time_str: str, current_datetime: datetime) -> bool:
+    """The datetime-based check that NextTakingsWindow replaces"""
+    current_time = current_datetime.time()
+    target_datetime = datetime.strptime(time_str, "%H:%M")
+    window_end_time = (target_datetime + timedelta(minutes=settings.INTAKE_WINDOW)).time()
+    time_upper_limit = (current_datetime + timedelta(minutes=settings.NEXT_TAKINGS_PERIOD)).time()
+    target_time = target_datetime.time()
+
+    is_within_day_limits = settings.TIME_DAY_START <= target_time <= settings.TIME_DAY_END
+    is_upcoming = current_time <= target_time <= time_upper_limit
+    is_active = target_time <= current_time <= window_end_time
+    return is_within_day_limits and (is_upcoming or is_active)
+
+
+timeframe_settings_data = [
+    {},
+    {"TIME_DAY_START": time(20, 0), "TIME_DAY_END": time(23, 50), "INTAKE_WINDOW": 45},
+    {"TIME_DAY_START": time(0, 0), "TIME_DAY_END": time(23, 59), "NEXT_TAKINGS_PERIOD": 300},
+    {"TIME_DAY_START": time(6, 0, 30), "TIME_DAY_END": time(21, 59, 59), "TIME_ROUNDING_INTERVAL": 10},
+]
+
+
+@pytest.mark.parametrize("overrides", timeframe_settings_data)
+def test_next_takings_window_matches_legacy_check(monkeypatch, overrides):
+    for name, value in overrides.items():
+        monkeypatch.setattr(settings, name, value)
+    table = DailyPlanTable()
+    day = datetime(2025, 5, 12)
+    for minute in range(0, 24 * 60, 7):
+        for offset in (timedelta(), timedelta(seconds=30), timedelta(seconds=59, microseconds=999999)):
+            now = day + timedelta(minutes=minute) + offset
+            window = NextTakingsWindow(now, plans=table)
+            for frequency in range(MIN_FREQUENCY, MAX_FREQUENCY + 1):
+                plan = table.get(frequency)
+                expected = tuple(time_str for time_str in plan if legacy_is_within_timeframe(time_str, now))
+                assert expected == window.select(frequency), (now, frequency)
+
+
+db_schedules_data = [
+    MedicationScheduleOrm(
+        id=1,
+        medication_name="Финастерид",
+        frequency=1,
+        duration_days=5,
+        start_date=date(2025, 5, 12),
+        end_date=date(2025, 5, 17),
+        user_id=1,
+    ),
+    MedicationScheduleOrm(
+        id=2,
+        medication_name="Фенибут",
+        frequency=15,
+        duration_days=None,
+        start_date=date(2025, 5, 12),
+        end_date=None,
+        user_id=3,
+    ),
+]
+
+
+@pytest.mark.parametrize("db_schedule", db_schedules_data)
+def test_schedule_mapper_matches_validation(db_schedule: MedicationScheduleOrm):
+    daily_plan = list(DailyPlanTable().get(db_schedule.frequency))
+    validated = MedicationSchedule.model_validate(MedicationSchedule(**db_schedule.__dict__, daily_plan=daily_plan))
+    mapped = schedule_mapper(db_schedule, daily_plan=daily_plan)
+    assert type(validated) is type(mapped)
+    assert validated == mapped
+    assert validated.model_fields_set == mapped.model_fields_set
+    assert validated.model_dump_json() == mapped.model_dump_json()
+
+
+class StreamingScheduleRepo:
+    def __init__(self, rows):
+        self._rows = rows
+
+    async def stream_active_schedules(self, day, batch_size):
+        for start in range(0, len(self._rows), batch_size):
+            yield self._rows[start : start + batch_size]
+
+
+sweep_due_intakes_data = [
+    (
+        datetime(2025, 5, 12, 8, 0),
+        120,
+        [(10, 1, "08:00"), (10, 1, "09:00"), (11, 2, "08:00"), (10, 3, "08:00")],
+    ),
+    (datetime(2025, 5, 12, 8, 0, 1), 60, [(10, 1, "09:00")]),
+    (datetime(2025, 5, 12, 21, 30), 120, [(10, 1, "22:00"), (11, 2, "22:00"), (10, 3, "22:00")]),
+    (datetime(2025, 5, 12, 22, 1), 600, []),
+]
+
+
+@pytest.mark.parametrize("start, minutes, expected", sweep_due_intakes_data)
+@pytest.mark.asyncio
+async def test_sweep_due_intakes(start: datetime, minutes: int, expected):
+    # (schedule_id, user_id, frequency)
+    rows = [(1, 10, 15), (2, 11, 2), (3, 10, 8)]
+    service = ScheduleService(StreamingScheduleRepo(rows))
+    batches = [batch async for batch in service.sweep_due_intakes(start, minutes, batch_size=2)]
+    assert all(0 < len(batch) <= 2 for batch in batches)
+    assert expected == [intake for batch in batches for intake in batch]
+
+
+def test_batch_user_id():
+    schedules = [
+        MedicationScheduleCreateRequest(medication_name="Pill", frequency=1, user_id=user_id)
+        for user_id in (3, 3, 4, 3, 5)
+    ]
+    assert 3 == ScheduleService.batch_user_id(schedules[:2])
+    with pytest.raises(ScheduleBatchUserError) as exc_info:
+        ScheduleService.batch_user_id(schedules)
+    assert [2, 4] == exc_info.value.indexes
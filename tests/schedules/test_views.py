@@ -309,6 +309,67 @@ async def test_post_schedule_with_special_symbols_in_med_name(async_client, get_
         assert get_response.json()["medication_name"] == i
 
 
+@pytest.mark.asyncio
+async def test_post_schedules_batch(async_client: AsyncClient, get_testing_db: AsyncSession, created_user):
+    data = [
+        {"medication_name": "Финастерид", "frequency": 1, "duration_days": 5, "user_id": 1},
+        {"medication_name": "Фенибут", "frequency": 10, "user_id": 1},
+        {"medication_name": "Вайбкодинг", "frequency": 8, "start_date": "2999-01-01", "user_id": 1},
+    ]
+    response = await async_client.post("/schedules:batch", json=data)
+    assert 201 == response.status_code
+    assert {"user_id": 1, "schedule_ids": [1, 2, 3]} == response.json()
+
+    db_schedules = await get_testing_db.execute(
+        select(models.MedicationScheduleOrm).order_by(models.MedicationScheduleOrm.id)
+    )
+    assert ["Финастерид", "Фенибут", "Вайбкодинг"] == [schedule.medication_name for schedule in db_schedules.scalars()]
+
+
+@pytest.mark.asyncio
+async def test_post_schedules_batch_with_invalid_items(
+    async_client: AsyncClient, get_testing_db: AsyncSession, created_user
+):
+    data = [
+        {"medication_name": "Финастерид", "frequency": 1, "user_id": 1},
+        {"medication_name": "Фенибут", "frequency": 16, "user_id": 1},
+        {"medication_name": "Вайбкодинг", "frequency": 8, "duration_days": -1, "user_id": 1},
+    ]
+    response = await async_client.post("/schedules:batch", json=data)
+    assert 422 == response.status_code
+    errors = response.json()["detail"]
+    assert [["body", 1, "frequency"], ["body", 2, "duration_days"]] == [error["loc"] for error in errors]
+
+    db_schedules = await get_testing_db.execute(select(models.MedicationScheduleOrm))
+    assert [] == db_schedules.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_post_schedules_batch_for_several_users(async_client: AsyncClient, created_user):
+    await async_client.post("/users", json={})
+    data = [
+        {"medication_name": "Финастерид", "frequency": 1, "user_id": 1},
+        {"medication_name": "Фенибут", "frequency": 10, "user_id": 2},
+    ]
+    response = await async_client.post("/schedules:batch", json=data)
+    assert 422 == response.status_code
+    assert [["body", 1, "user_id"]] == [error["loc"] for error in response.json()["detail"]]
+
+
+@pytest.mark.asyncio
+async def test_post_schedules_batch_for_non_existent_user(async_client: AsyncClient):
+    data = [{"medication_name": "Финастерид", "frequency": 1, "user_id": 1}]
+    response = await async_client.post("/schedules:batch", json=data)
+    assert 404 == response.status_code
+    assert {"detail": "User with id=1 not found"} == response.json()
+
+
+@pytest.mark.asyncio
+async def test_post_empty_schedules_batch(async_client: AsyncClient, created_user):
+    response = await async_client.post("/schedules:batch", json=[])
+    assert 422 == response.status_code
+
+
 @pytest.mark.asyncio
 async def test_get_future_schedule(async_client: AsyncClient, created_user):
     data = {
@@ -576,6 +637,22 @@ async def test_get_next_takings(async_client: AsyncClient, created_schedule):
     assert expected_data == response.json()
 
 
+@pytest.mark.freeze_time("2025-01-01 7:00", real_asyncio=True)
+@pytest.mark.asyncio
+async def test_get_compact_schedule_and_next_takings(async_client: AsyncClient, created_schedule):
+    params = {"user_id": 1, "schedule_id": 1, "compact": True}
+    response = await async_client.get("/schedule", params=params)
+    assert 200 == response.status_code
+    assert "daily_plan" not in response.json()
+    assert [480, 600, 720, 840, 960, 1080, 1200, 1320] == response.json()["daily_plan_minutes"]
+    response = await async_client.get("/next_takings", params={"user_id": 1, "compact": True})
+    expected_data = {
+        "user_id": 1,
+        "next_takings": [{"schedule_id": 1, "schedule_name": "Вайбкодинг", "schedule_minutes": [480]}],
+    }
+    assert expected_data == response.json()
+
+
 @pytest.mark.freeze_time("2025-01-01 7:59:59", real_asyncio=True)
 @pytest.mark.asyncio
 async def test_get_next_takings_one_minute_before_first_intake(async_client: AsyncClient, created_schedule):